@@ -2,29 +2,27 @@
 Credit agent for credit limit queries and increase requests
 """
 
+import json
+from datetime import datetime
 from utils.session_manager import SessionManager
-from langchain_groq import ChatGroq
-from tools.credit_tools import check_credit_limit, request_credit_increase
-from config import GROQ_API_KEY, GROQ_MODEL
+from tools.credit_tools import check_credit_limit, request_credit_increase, get_credit_request_history
+from utils.llm_client import invoke_llm
+from utils.tracing import traced
 
 class CreditAgent:
     """Agent responsible for credit limit operations"""
 
-    def __init__(self):
-        self.llm = ChatGroq(
-            api_key=GROQ_API_KEY,
-            model_name=GROQ_MODEL,
-            temperature=0,
-        )
-
-        self.tools = [check_credit_limit, request_credit_increase]
-        
-        self.runnable = self.llm.bind_tools(self.tools)
+    def __init__(self, orchestrator):
+        # Peer agents are reached through the shared orchestrator
+        self.orchestrator = orchestrator
+        self.tools = [check_credit_limit, request_credit_increase, get_credit_request_history]
 
         self.system_prompt = (
             "Você é um assistente de crédito do Banco Ágil. "
-            "Identifique a intenção: consulta de limite ou solicitação de aumento. "
-            "Para CONSULTA, use 'check_credit_limit'. Para AUMENTO, use 'request_credit_increase' quando o valor estiver informado; "
+            "Identifique a intenção: consulta de limite, solicitação de aumento ou histórico de pedidos. "
+            "Para CONSULTA, use 'check_credit_limit'. "
+            "Para perguntas sobre pedidos de aumento anteriores (último pedido, status de pedidos), use 'get_credit_request_history'. "
+            "Para AUMENTO, use 'request_credit_increase' quando o valor estiver informado; "
             "se não estiver, pergunte: 'Qual valor de limite você gostaria?'. "
             "Atualização de score NÃO é feita por aqui: se o cliente solicitar atualizar score, responda exatamente com "
             "'ROTA_ENTREVISTA|Para atualizar seu score, precisamos realizar uma entrevista rápida.' "
@@ -52,17 +50,15 @@ class CreditAgent:
         ==========================
         """
 
+    @traced("agent.credit.process")
     def process(self, message: str, session_manager: SessionManager) -> str:
         """Process message in credit agent"""
 
         print(f"[CreditAgent] Received message: {message}")
 
         if "entrevista" in message.lower():
-            from agents.interview_agent import InterviewAgent
             print("[CreditAgent] Routing: handle_interview")
-            session_manager.switch_agent("entrevista")
-            agent = InterviewAgent()
-            return agent.process(message, session_manager)
+            return self.orchestrator.hand_off("entrevista", message, session_manager)
 
         try:
             context = self._build_context(session_manager)
@@ -70,75 +66,28 @@ class CreditAgent:
 
             try:
                 history = session_manager.get_session_history()
-                print(f"[CreditAgent] Session history: {history}")
                 for msg in history:
                     full_input.append((msg.get("role"), msg.get("content")))
             except Exception as e:
                 print(f"[CreditAgent] Error reading history: {e}")
             full_input.append(("user", message))
 
-            print(f"[CreditAgent] Full input: {full_input}")
-
-            result = self.runnable.invoke(full_input)
-
-            print(f"[CreditAgent] LLM result: {result}")
+            result = invoke_llm("credit.tools", full_input, session_manager, tools=self.tools)
             if result.content:
                 should_route, clean_response = self._should_route_to_interview(result.content)
                 if should_route:
                     print("[CreditAgent] Routing to InterviewAgent via marker")
-                    session_manager.switch_agent("entrevista")
-                    interview_agent = InterviewAgent()
-                    return interview_agent.process(message, session_manager)
+                    return self.orchestrator.hand_off("entrevista", message, session_manager)
                 return clean_response
 
             tool_calls = result.additional_kwargs.get("tool_calls")
             if tool_calls:
-                import json
-                tc = tool_calls[0]
-                fn = tc.get("function", {})
-                name = fn.get("name")
-                args = json.loads(fn.get("arguments", "{}"))
-
-                if name == "check_credit_limit":
-                    out = check_credit_limit.invoke({"cpf": args.get("cpf", session_manager.customer_cpf)})
-                    try:
-                        data = json.loads(out)
-                        if data.get("error"):
-                            return f"Desculpe, não foi possível consultar: {data['error']}"
-                        return (
-                            f"Seu limite atual é R$ {data['limite_credito']:.2f} e seu score é {data['score']:.0f}. "
-                            f"Posso ajudá-lo com solicitação de aumento?"
-                        )
-                    except Exception:
-                        return str(out)
-
-                if name == "request_credit_increase":
-                    out = request_credit_increase.invoke({
-                        "cpf": args.get("cpf", session_manager.customer_cpf),
-                        "requested_limit": args.get("requested_limit")
-                    })
-                    try:
-                        data = json.loads(out)
-                        if data.get("error"):
-                            return f"Não foi possível processar o aumento: {data['error']}"
-                        if data.get("status") == "rejeitado":
-                            print(f"[CreditAgent] Rejected increase request")
-                            reject_response = self.llm.invoke([
-                                ("system", 
-                                "Você é um assistente de crédito do Banco Ágil. "
-                                "O cliente requisitou um aumento no limite dele e o aumento de limite foi negado."
-                                "Responde de uma forma amigavel sem saudacao, pois a conversa ja esta acontecendo, que o cliente entenda que o pedido dele foi negado (exemplifique), e que seja necessario fazer uma entrevista, AGORA, somente seguir o fluxo para reavaliar o status do seu pedido"
-                                "Sem oferecer nada fora do escopo, que e uma entrevista"
-                                "Exemplifique ao usuario que se ele deseja fazer a entrevista ele PRECISA digitar a palavra entrevista"
-                                ),
-                            ])
-                            return reject_response.content
-                        return (
-                            f"Aumento aprovado! Seu novo limite é R$ {data['limite_atual']:.2f}. "
-                            f"Deseja mais alguma ajuda?"
-                        )
-                    except Exception:
-                        return str(out)
+                fn = tool_calls[0].get("function", {})
+                response = self.handle_tool_call(
+                    fn.get("name"), json.loads(fn.get("arguments", "{}")), session_manager
+                )
+                if response is not None:
+                    return response
 
             return "Para prosseguir, você pode consultar seu limite ou solicitar um aumento informando o valor desejado."
 
@@ -149,3 +98,85 @@ class CreditAgent:
         except Exception as e:
             print(f"Credit agent unexpected error: {e}")
             return "Desculpe, ocorreu um erro ao processar sua solicitação. Por favor, tente novamente."
+
+    @traced("agent.credit.handle_tool_call")
+    def handle_tool_call(self, name: str, args: dict, session_manager: SessionManager) -> str | None:
+        """
+        Execute a credit tool call chosen by the model and phrase the answer.
+        Returns None when the tool is not a credit tool.
+        """
+
+        if name == "check_credit_limit":
+            out = check_credit_limit.invoke({"cpf": args.get("cpf", session_manager.customer_cpf)})
+            try:
+                data = json.loads(out)
+                if data.get("error"):
+                    return f"Desculpe, não foi possível consultar: {data['error']}"
+                return (
+                    f"Seu limite atual é R$ {data['limite_credito']:.2f} e seu score é {data['score']:.0f}. "
+                    f"Posso ajudá-lo com solicitação de aumento?"
+                )
+            except Exception:
+                return str(out)
+
+        if name == "get_credit_request_history":
+            # Only ever the authenticated customer's own history
+            out = get_credit_request_history.invoke({
+                "cpf": session_manager.customer_cpf,
+                "limit": args.get("limit") or 5,
+            })
+            try:
+                data = json.loads(out)
+                if data.get("error"):
+                    return f"Desculpe, não foi possível consultar seus pedidos: {data['error']}"
+                return self._format_request_history(data["pedidos"])
+            except Exception:
+                return str(out)
+
+        if name == "request_credit_increase":
+            out = request_credit_increase.invoke({
+                "cpf": args.get("cpf", session_manager.customer_cpf),
+                "requested_limit": args.get("requested_limit")
+            })
+            try:
+                data = json.loads(out)
+                if data.get("error"):
+                    return f"Não foi possível processar o aumento: {data['error']}"
+                if data.get("status") == "rejeitado":
+                    print(f"[CreditAgent] Rejected increase request")
+                    reject_response = invoke_llm("credit.rejection", [
+                        ("system", 
+                        "Você é um assistente de crédito do Banco Ágil. "
+                        "O cliente requisitou um aumento no limite dele e o aumento de limite foi negado."
+                        "Responde de uma forma amigavel sem saudacao, pois a conversa ja esta acontecendo, que o cliente entenda que o pedido dele foi negado (exemplifique), e que seja necessario fazer uma entrevista, AGORA, somente seguir o fluxo para reavaliar o status do seu pedido"
+                        "Sem oferecer nada fora do escopo, que e uma entrevista"
+                        "Exemplifique ao usuario que se ele deseja fazer a entrevista ele PRECISA digitar a palavra entrevista"
+                        ),
+                    ], session_manager)
+                    return reject_response.content
+                return (
+                    f"Aumento aprovado! Seu novo limite é R$ {data['limite_atual']:.2f}. "
+                    f"Deseja mais alguma ajuda?"
+                )
+            except Exception:
+                return str(out)
+
+        return None
+
+    def _format_request_history(self, requests: list) -> str:
+        """Phrase the customer's recent increase requests, newest first"""
+        if not requests:
+            return "Não encontrei pedidos de aumento de limite para você. Deseja solicitar um agora?"
+
+        lines = []
+        for item in requests:
+            try:
+                when = datetime.fromisoformat(item["data_hora_solicitacao"]).strftime("%d/%m/%Y %H:%M")
+            except (TypeError, ValueError):
+                when = item["data_hora_solicitacao"]
+            lines.append(
+                f"• {when}: de R$ {item['limite_atual']:.2f} para R$ {item['novo_limite_solicitado']:.2f} "
+                f"({item['status_pedido']})"
+            )
+        heading = "Seu último pedido de aumento:" if len(requests) == 1 else f"Seus {len(requests)} pedidos de aumento mais recentes:"
+        return heading + "\n" + "\n".join(lines) + "\n\nPosso ajudá-lo com mais alguma coisa?"
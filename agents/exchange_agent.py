@@ -2,34 +2,33 @@
 Exchange agent for currency quotation
 """
 
-from langchain_groq import ChatGroq
-from tools.exchange_tools import get_exchange_rate
-from config import GROQ_API_KEY, GROQ_MODEL
+import json
+from tools.exchange_tools import get_exchange_rate, convert_currency, get_exchange_rate_history
 from utils.session_manager import SessionManager
+from utils.llm_client import invoke_llm
+from utils.tracing import traced
 
 class ExchangeAgent:
     """Agent responsible for currency exchange rates"""
     
-    def __init__(self):
-        self.llm = ChatGroq(
-            api_key=GROQ_API_KEY,
-            model_name=GROQ_MODEL,
-            temperature=0,
-        )
+    def __init__(self, orchestrator):
+        # Peer agents are reached through the shared orchestrator
+        self.orchestrator = orchestrator
+        self.tools = [get_exchange_rate, convert_currency, get_exchange_rate_history]
 
-        self.tools = [get_exchange_rate]
-        
-        self.runnable = self.llm.bind_tools(self.tools)
-        
         self.system_prompt = (
             "Você é um assistente de câmbio do Banco Ágil. "
             "Identifique a moeda desejada e SEMPRE use a ferramenta 'get_exchange_rate' "
             "quando houver uma moeda válida. NUNCA chute; se a mensagem for ambígua, "
             "solicite o código ISO em maiúsculas (USD, EUR, GBP, JPY, ARS). "
             "Ao chamar a ferramenta, passe apenas o código da moeda. "
+            "Para converter um valor entre moedas (ex.: 500 euros em dólares ou em reais), use 'convert_currency'. "
+            "Para perguntas sobre variação no tempo (ex.: como o dólar variou este mês), use 'get_exchange_rate_history' "
+            "com o número de dias do período. "
             "Se o cliente quiser falar sobre crédito (limite, aumento, score), responda APENAS com a palavra 'credito'."
         )
 
+    @traced("agent.exchange.process")
     def process(self, message: str, session_manager: SessionManager) -> str:
         """Process message in exchange agent"""
         
@@ -45,40 +44,21 @@ class ExchangeAgent:
                 full_input.append(("system", self.system_prompt))
                 full_input.append(("user", message))
 
-            result = self.runnable.invoke(full_input)
+            result = invoke_llm("exchange.tools", full_input, session_manager, tools=self.tools)
 
             if result.content:
                 intent = result.content.strip().lower()
                 if intent == "credito":
                     print("Exchange agent intent redirect: credito")
-                    from agents.credit_agent import CreditAgent
-                    session_manager.switch_agent("credito")
-                    agent = CreditAgent()
-                    return agent.process(message, session_manager)
+                    return self.orchestrator.hand_off("credito", message, session_manager)
 
             if result.content == "" and result.additional_kwargs.get("tool_calls"):
-                tool_call = result.additional_kwargs.get("tool_calls")[0]
-                fn = tool_call.get("function", {})
-                if fn.get("name") == "get_exchange_rate":
-                    import json
-                    args = json.loads(fn.get("arguments", "{}"))
-                    code = args.get("currency_code")
-                    rate_value = get_exchange_rate.invoke({"currency_code": code})
-                    try:
-                        val = float(rate_value)
-                        prompt = [
-                            ("system", "Você é um assistente do Banco Ágil."),
-                            (
-                                "system",
-                                f"Com base na cotação informada, 1 {code} = {val:.4f} BRL. "
-                                "Gere uma resposta curta, amigável e clara em PT-BR, "
-                                "explicando a cotação e oferecendo ajuda para consultar outra moeda."
-                            ),
-                        ]
-                        personalized = self.llm.invoke(prompt).content
-                        return personalized + "\n\nDeseja consultar outra moeda ou posso ajudá-lo com algo mais?"
-                    except Exception:
-                        return str(rate_value)
+                fn = result.additional_kwargs.get("tool_calls")[0].get("function", {})
+                response = self.handle_tool_call(
+                    fn.get("name"), json.loads(fn.get("arguments", "{}")), session_manager
+                )
+                if response is not None:
+                    return response
 
             content = result.content or (
                 "Para prosseguir, informe o código da moeda em maiúsculas (USD, EUR, GBP, JPY, ARS)."
@@ -90,3 +70,80 @@ class ExchangeAgent:
                 "Desculpe, não foi possível consultar a cotação no momento. "
                 f"Erro: {str(e)}\n\nPor favor, tente novamente ou posso ajudá-lo com outro serviço?"
             )
+
+    @traced("agent.exchange.handle_tool_call")
+    def handle_tool_call(self, name: str, args: dict, session_manager: SessionManager) -> str | None:
+        """
+        Execute an exchange tool call chosen by the model and phrase the answer.
+        Returns None when the tool is not an exchange tool.
+        """
+
+        if name == "get_exchange_rate":
+            code = args.get("currency_code")
+            rate_value = get_exchange_rate.invoke({"currency_code": code})
+            try:
+                val = float(rate_value)
+                prompt = [
+                    ("system", "Você é um assistente do Banco Ágil."),
+                    (
+                        "system",
+                        f"Com base na cotação informada, 1 {code} = {val:.4f} BRL. "
+                        "Gere uma resposta curta, amigável e clara em PT-BR, "
+                        "explicando a cotação e oferecendo ajuda para consultar outra moeda."
+                    ),
+                ]
+                personalized = invoke_llm("exchange.phrasing", prompt, session_manager).content
+                return personalized + "\n\nDeseja consultar outra moeda ou posso ajudá-lo com algo mais?"
+            except Exception:
+                return str(rate_value)
+
+        if name == "convert_currency":
+            out = convert_currency.invoke({
+                "amount": args.get("amount"),
+                "from_currency": args.get("from_currency", ""),
+                "to_currency": args.get("to_currency", "BRL"),
+            })
+            try:
+                data = json.loads(out)
+                if data.get("error"):
+                    return data["error"]
+                prompt = [
+                    ("system", "Você é um assistente do Banco Ágil."),
+                    (
+                        "system",
+                        f"Com base na cotação de {data['date']}, {data['amount']:.2f} {data['from']} = "
+                        f"{data['converted']:.2f} {data['to']} (1 {data['from']} = {data['rate']:.4f} {data['to']}). "
+                        "Gere uma resposta curta, amigável e clara em PT-BR com a conversão."
+                    ),
+                ]
+                personalized = invoke_llm("exchange.phrasing", prompt, session_manager).content
+                return personalized + "\n\nDeseja converter outro valor ou posso ajudá-lo com algo mais?"
+            except Exception:
+                return str(out)
+
+        if name == "get_exchange_rate_history":
+            out = get_exchange_rate_history.invoke({
+                "currency_code": args.get("currency_code", ""),
+                "days": args.get("days", 30),
+            })
+            try:
+                data = json.loads(out)
+                if data.get("error"):
+                    return data["error"]
+                prompt = [
+                    ("system", "Você é um assistente do Banco Ágil."),
+                    (
+                        "system",
+                        f"Histórico de {data['currency']} em BRL de {data['start']} a {data['end']} "
+                        f"({data['count']} cotações): inicial {data['first']:.4f}, final {data['last']:.4f}, "
+                        f"mínima {data['min']:.4f} em {data['min_date']}, máxima {data['max']:.4f} em {data['max_date']}, "
+                        f"média {data['avg']:.4f}, variação {data['change_pct']:+.2f}%. "
+                        "Gere uma resposta curta, amigável e clara em PT-BR resumindo a variação."
+                    ),
+                ]
+                personalized = invoke_llm("exchange.phrasing", prompt, session_manager).content
+                return personalized + "\n\nDeseja consultar outra moeda ou posso ajudá-lo com algo mais?"
+            except Exception:
+                return str(out)
+
+        return None
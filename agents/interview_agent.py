@@ -4,18 +4,19 @@ Interview agent for credit score recalculation
 
 import re
 import json
-from langchain_groq import ChatGroq
 from tools.credit_tools import update_customer_score
 from utils.session_manager import SessionManager
-from config import GROQ_API_KEY, GROQ_MODEL
+from utils.llm_client import invoke_llm
+from utils.tracing import traced
+from utils.credit_scoring import calculate_score
 
 class InterviewAgent:
     """Agent responsible for conducting credit score interview"""
 
-    def __init__(self):
-        self.llm = ChatGroq(api_key=GROQ_API_KEY, model_name=GROQ_MODEL, temperature=0)
+    def __init__(self, orchestrator):
+        # Peer agents are reached through the shared orchestrator
+        self.orchestrator = orchestrator
         self.tools = [update_customer_score]
-        self.runnable = self.llm.bind_tools(self.tools)
 
         self.system_prompt = (
             "Você é um assistente de entrevista de crédito do Banco Ágil. "
@@ -28,6 +29,7 @@ class InterviewAgent:
             "Ao concluir, SOMENTE chame 'update_customer_score' se o novo score for MAIOR que o atual; nunca diminua o score."
         )
     
+    @traced("agent.interview.process")
     def process(self, message: str, session_manager: SessionManager) -> str:
         """Process message in interview agent"""
 
@@ -240,10 +242,8 @@ class InterviewAgent:
                 full_input.append(("system", f"Pergunte especificamente sobre: {force_field}"))
 
             full_input.append(("user", message))
-            print(f"[InterviewAgent] ask_next full_input: {full_input}")
 
-            result = self.llm.invoke(full_input)
-            print(f"[InterviewAgent] ask_next result: {result}")
+            result = invoke_llm("interview.ask_next", full_input, session_manager)
 
             return result.content or "Por favor, informe o dado solicitado."
         except Exception:
@@ -318,43 +318,4 @@ class InterviewAgent:
     
     def _calculate_score(self, data: dict) -> float:
         """Calculate credit score based on interview data"""
-        
-        # Weights
-        peso_renda = 30
-        peso_emprego = {
-            "formal": 300,
-            "autônomo": 200,
-            "desempregado": 0
-        }
-        peso_dependentes = {
-            0: 100,
-            1: 80,
-            2: 60,
-            "3+": 30
-        }
-        peso_dividas = {
-            "sim": -100,
-            "não": 100
-        }
-
-        {'renda_mensal': 6000.0, 'tipo_emprego': 'autônomo', 'despesas_fixas': 3500.0, 'num_dependentes': 0, 'tem_dividas': 'não'}
-        
-        # Extract data
-        renda = data.get("renda_mensal", 0)
-        despesas = data.get("despesas_fixas", 0)
-        tipo_emprego = data.get("tipo_emprego", "desempregado")
-        num_dependentes = data.get("num_dependentes", 0)
-        tem_dividas = data.get("tem_dividas", "sim")
-        
-        # Calculate score
-        score = (
-            (renda / (despesas + 1)) * peso_renda +
-            peso_emprego.get(tipo_emprego, 0) +
-            peso_dependentes.get(num_dependentes, 0) +
-            peso_dividas.get(tem_dividas, 0)
-        )
-        
-        # Ensure score is between 0 and 1000
-        score = max(0, min(1000, score))
-        
-        return round(score, 2)
+        return calculate_score(data)
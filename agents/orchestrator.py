@@ -2,40 +2,147 @@
 Main orchestrator for routing messages to appropriate agents
 """
 
+import time
+from typing import Callable, Optional
 from agents.triage_agent import TriageAgent
 from agents.credit_agent import CreditAgent
 from agents.interview_agent import InterviewAgent
 from agents.exchange_agent import ExchangeAgent
 from utils.session_manager import SessionManager
+from utils.tracing import span
+from utils.metrics import TURNS, TURN_SECONDS
+from utils.admission import admit, get_bulkhead, BulkheadFull
+from utils.idempotency import default_turn_id, turn_scope
+from utils.faq_cache import faq_lookup
 
 
 class AgentOrchestrator:
-    """Simple orchestrator that routes messages to the appropriate agent"""
+    """
+    Simple orchestrator that routes messages to the appropriate agent.
+
+    Holds no per-user state: everything a turn needs lives in the SessionManager
+    passed to process_message, and the agents only keep prompts and tool lists,
+    so one instance can serve every session concurrently.
+    """
     
     def __init__(self):
-        self.triage_agent: TriageAgent = TriageAgent()
-        self.credit_agent: CreditAgent = CreditAgent()
-        self.interview_agent: InterviewAgent = InterviewAgent()
-        self.exchange_agent: ExchangeAgent = ExchangeAgent()
+        self.triage_agent: TriageAgent = TriageAgent(self)
+        self.credit_agent: CreditAgent = CreditAgent(self)
+        self.interview_agent: InterviewAgent = InterviewAgent(self)
+        self.exchange_agent: ExchangeAgent = ExchangeAgent(self)
         
-    def process_message(self, message: str, session_manager: SessionManager) -> str:
+    def process_message(
+        self,
+        message: str,
+        session_manager: SessionManager,
+        admitted: bool = False,
+        turn_id: Optional[str] = None,
+    ) -> str:
         """
         Process user message and route to appropriate agent
         
         Args:
             message: User's message
             session_manager: Session state manager
+            admitted: True when the caller already ran the admission checks
+            turn_id: Client-supplied id of the turn (e.g. an Idempotency-Key);
+                a retried turn reusing it replays side-effecting tool results
+                instead of repeating them. Defaults to the previous turn's id when
+                the message repeats it (default_turn_id), so a UI retry of a
+                failed turn reuses it.
             
         Returns:
             Agent's response
         """
 
+        session_manager.touch()
+        if not admitted:
+            rejection = admit(session_manager)
+            if rejection is not None:
+                return rejection.message
+        if turn_id is None:
+            turn_id, session_manager.last_turn_key = default_turn_id(message, session_manager.last_turn_key)
+        else:
+            session_manager.last_turn_key = []
+        session_manager.usage.start_turn()
+        agent = session_manager.current_agent
+        TURNS.labels(agent=agent).inc()
+        start = time.perf_counter()
+        with span(
+            "turn",
+            **{"session.id": session_manager.session_id, "agent.entry": session_manager.current_agent},
+        ) as turn_span, turn_scope(session_manager.session_id, turn_id):
+            try:
+                return self._route(message, session_manager)
+            finally:
+                TURN_SECONDS.labels(agent=agent).observe(time.perf_counter() - start)
+                session_manager.last_turn_usage = session_manager.usage.turn_summary()
+                usage = session_manager.last_turn_usage
+                turn_span.set_attributes(**{
+                    "agent.exit": session_manager.current_agent,
+                    "turn.number": usage["turn"],
+                    "llm.calls": usage["calls"],
+                    "llm.prompt_tokens": usage["prompt_tokens"],
+                    "llm.completion_tokens": usage["completion_tokens"],
+                })
+                print(
+                    f"[Orchestrator] Turn {usage['turn']} usage: calls={usage['calls']} "
+                    f"prompt={usage['prompt_tokens']} completion={usage['completion_tokens']} "
+                    f"latency={usage['latency_ms']:.0f}ms"
+                )
+
+    def _route(self, message: str, session_manager: SessionManager) -> str:
+        """Dispatch the message to the session's current agent"""
+
         current_agent = session_manager.current_agent
         print(f"Current agent: {current_agent}")
 
         if self._is_goodbye_message(message):
             return self._handle_goodbye(session_manager)
 
+        # Generic questions are answered from the FAQ without any model call,
+        # only before authentication: afterwards a close match is far more
+        # likely a request (an increase, a score update) the agents must act on
+        if current_agent == "triagem" and not session_manager.authenticated:
+            with span("faq.lookup") as faq_span:
+                hit = faq_lookup(message)
+                faq_span.set_attribute("faq.hit", hit is not None)
+            if hit is not None:
+                print(f"[Orchestrator] FAQ hit ({hit.similarity:.2f}): {hit.question}")
+                return hit.answer
+
+        return self._in_bulkhead(current_agent, lambda: self._dispatch(current_agent, message, session_manager))
+
+    def _in_bulkhead(self, agent: str, call: Callable[[], str]) -> str:
+        """Run call inside the agent's bulkhead, answering the bulkhead's message when it is full"""
+        try:
+            # Each agent gets its own concurrency cap so one slow dependency
+            # cannot take every worker thread
+            with get_bulkhead(f"agent.{agent}"):
+                return call()
+        except BulkheadFull as e:
+            return e.message
+
+    def hand_off(
+        self,
+        target: str,
+        message: str,
+        session_manager: SessionManager,
+        call: Optional[Callable[[], str]] = None,
+    ) -> str:
+        """
+        Switch the session to another agent within a turn and run it inside
+        that agent's bulkhead, as if the turn had been routed to it
+
+        Args:
+            call: What to run for the target (default: its process() with message)
+        """
+        session_manager.switch_agent(target)
+        return self._in_bulkhead(target, call or (lambda: self._dispatch(target, message, session_manager)))
+
+    def _dispatch(self, current_agent: str, message: str, session_manager: SessionManager) -> str:
+        """Hand the message to the agent that owns the session"""
+
         if current_agent == "triagem":
             print(f"Triagem message: {message}")
             return self.triage_agent.process(message, session_manager)
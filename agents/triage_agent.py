@@ -3,26 +3,33 @@ Triage agent for authentication and routing
 """
 
 import json
-from langchain_groq import ChatGroq
 from tools.customer_tools import authenticate_customer
+from tools.credit_tools import check_credit_limit, request_credit_increase, get_credit_request_history
+from tools.exchange_tools import get_exchange_rate, convert_currency, get_exchange_rate_history
+from tools.routing_tools import route_to_interview
 from utils.session_manager import SessionManager
-from config import GROQ_API_KEY, GROQ_MODEL
+from utils.llm_client import invoke_llm
+from utils.tracing import traced
+from utils.metrics import AUTH_ATTEMPTS
+from utils.admission import check_auth_attempt
+from utils.faq_cache import faq_propose
+from config import TRIAGE_COMBINED_ROUTING
 
 
 class TriageAgent:
     """Agent responsible for customer authentication and initial routing"""
 
 
-    def __init__(self):
-
-        self.llm = ChatGroq(
-            api_key=GROQ_API_KEY,
-            model_name=GROQ_MODEL,
-            temperature=0
-        )
-
+    def __init__(self, orchestrator):
+        # Peer agents are reached through the shared orchestrator
+        self.orchestrator = orchestrator
         self.tools = [authenticate_customer]
         self.auth_tool = authenticate_customer
+        self.routing_tools = [
+            check_credit_limit, request_credit_increase, get_credit_request_history,
+            get_exchange_rate, convert_currency, get_exchange_rate_history,
+            route_to_interview,
+        ]
 
         self.system_prompt = """Você é o Agente de Triagem do Banco Ágil.
 
@@ -38,21 +45,36 @@ class TriageAgent:
         - Após o usuário estar autenticado, pergunte: "Como posso ajudá-lo hoje? Posso auxiliar com Crédito ou Câmbio?"
         """
 
+        self.intents = {"credito", "cambio", "entrevista", "outros"}
+
         self.classification_prompt = """Analise a mensagem do cliente e identifique a intenção.
 
         Mensagem: "{message}"
 
         Responda APENAS com uma destas palavras:
-        - credito: se o cliente quer consultar limite, pedir aumento de crédito
+        - credito: se o cliente quer consultar limite, pedir aumento de crédito ou ver pedidos de aumento anteriores
         - cambio: se o cliente quer consultar cotação de moedas, dólar, câmbio
         - entrevista: se o cliente quer fazer entrevista de crédito, atualizar score
         - outros: se não se enquadra nas opções acima
 
         Resposta (apenas uma palavra):"""
 
-        self.runnable = self.llm.bind_tools(self.tools)
+        self.routing_prompt = (
+            "Você é o Agente de Triagem do Banco Ágil. O cliente já está autenticado. "
+            "Escolha a ferramenta que atende a mensagem e chame-a diretamente: "
+            "'check_credit_limit' para consultar limite ou score; "
+            "'request_credit_increase' para pedir aumento quando o valor estiver informado; "
+            "'get_credit_request_history' para consultar pedidos de aumento anteriores; "
+            "'get_exchange_rate' para cotação de moedas, passando apenas o código ISO (USD, EUR, GBP, JPY, ARS); "
+            "'convert_currency' para converter um valor entre moedas; "
+            "'get_exchange_rate_history' para a variação de uma moeda nos últimos dias; "
+            "'route_to_interview' para entrevista de crédito ou atualização de score. "
+            "Se o cliente pedir aumento sem informar o valor, pergunte: 'Qual valor de limite você gostaria?'. "
+            "Se nenhuma ferramenta se aplicar, responda brevemente oferecendo ajuda com Crédito ou Câmbio."
+        )
 
 
+    @traced("agent.triage.process")
     def process(self, message: str, session_manager: SessionManager) -> str:
         """Main process loop with authentication control"""
 
@@ -65,8 +87,6 @@ class TriageAgent:
             return self._handle_max_attempts_exceeded(session_manager)
 
         try:
-            print(f"[TriageAgent] Input context: {session_manager.get_session_history()}")
-
             full_input = []
 
             if len(session_manager.get_session_history()) >= 1:
@@ -79,30 +99,35 @@ class TriageAgent:
                     full_input.append((msg["role"], msg["content"]))
                 full_input.append(("user", message))
 
-            print(f"[TriageAgent] Full input: {full_input}")
-
-            result = self.runnable.invoke(full_input)
-            
-            print(f"[TriageAgent] Triage agent result: {result}")
+            result = invoke_llm("triage.auth", full_input, session_manager, tools=self.tools)
 
             auth_success = False            
             if result.content == "" and result.additional_kwargs.get("tool_calls")[0].get("function").get("name") == "authenticate_customer":
-                auth_success = self._process_auth_result(
-                    result.additional_kwargs.get("tool_calls")[0].get("function").get("arguments"),
-                    session_manager,
-                )
+                arguments = result.additional_kwargs.get("tool_calls")[0].get("function").get("arguments")
+                # Attempts are also counted per CPF across sessions, since a
+                # new session starts with a fresh auth_attempts counter
+                rejection = check_auth_attempt(json.loads(arguments or "{}").get("cpf"))
+                if rejection is not None:
+                    AUTH_ATTEMPTS.labels(outcome="throttled").inc()
+                    return rejection.message
+
+                auth_success = self._process_auth_result(arguments, session_manager)
 
                 if auth_success:
                     client_data = session_manager.customer_data
-                    result = self.llm.invoke([
+                    result = invoke_llm("triage.greeting", [
                         ("system", self.auth_prompt),
                         ("system", f"✅ Autenticação bem-sucedida! O cliente {client_data} foi autenticado."),
-                    ])
+                    ], session_manager)
                     return result.content
 
             if not auth_success:
                 session_manager.increment_auth_attempts()
                 print(f"[TriageAgent] Incrementing auth attempts: {session_manager.auth_attempts}")
+                # A generic question answered without any tool call: the
+                # operator may approve it for the FAQ served before login
+                if not result.additional_kwargs.get("tool_calls") and result.content and faq_propose(message, result.content):
+                    print("[TriageAgent] Direct answer queued for FAQ review")
 
             return result.content
 
@@ -166,29 +191,28 @@ class TriageAgent:
         """
         print(f"[TriageAgent] Routing authenticated customer: {message}")
 
+        if TRIAGE_COMBINED_ROUTING:
+            return self._handle_combined_routing(message, session_manager)
+
         prompt_classification = self.classification_prompt.format(message=message)
 
         try:
-            intent = self.llm.invoke(prompt_classification).content.strip().lower()
+            intent = invoke_llm(
+                "triage.classification",
+                prompt_classification,
+                session_manager,
+                validate=lambda r: r.content.strip().lower() in self.intents,
+            ).content.strip().lower()
             print(f"[TriageAgent] Identified intent: {intent}")
 
             if "credito" in intent:
-                from agents.credit_agent import CreditAgent
-                session_manager.switch_agent("credito")
-                agent = CreditAgent()
-                return agent.process(message, session_manager)
+                return self.orchestrator.hand_off("credito", message, session_manager)
             
             elif "cambio" in intent:
-                from agents.exchange_agent import ExchangeAgent
-                session_manager.switch_agent("cambio")
-                agent = ExchangeAgent()
-                return agent.process(message, session_manager)
+                return self.orchestrator.hand_off("cambio", message, session_manager)
             
             elif "entrevista" in intent:
-                from agents.interview_agent import InterviewAgent
-                session_manager.switch_agent("entrevista")
-                agent = InterviewAgent()
-                return agent.process(message, session_manager)
+                return self.orchestrator.hand_off("entrevista", message, session_manager)
             
             else:
 
@@ -203,3 +227,60 @@ class TriageAgent:
         except Exception as e:
             print(f"[TriageAgent] Error routing intent: {e}")
             return "Posso ajudá-lo com Crédito ou Câmbio. O que prefere?"
+
+
+    def _handle_combined_routing(self, message: str, session_manager: SessionManager) -> str:
+        """
+        Route and act in a single model call: the domain tools and the interview
+        pseudo-tool are bound together, so the chosen tool call is both the
+        route and the action
+        """
+
+        full_input = [
+            ("system", self.routing_prompt),
+            ("system", f"CPF do cliente: {session_manager.customer_cpf}"),
+        ]
+        history = session_manager.get_session_history()
+        if history and history[-1]["content"] == message:
+            history = history[:-1]
+        for msg in history[-6:]:
+            full_input.append((msg["role"], msg["content"]))
+        full_input.append(("user", message))
+
+        try:
+            result = invoke_llm("triage.routing", full_input, session_manager, tools=self.routing_tools)
+            tool_calls = result.additional_kwargs.get("tool_calls")
+            if not tool_calls:
+                print("[TriageAgent] Combined routing: no tool call, answering directly")
+                return result.content or "Posso ajudá-lo com Crédito ou Câmbio. O que prefere?"
+
+            fn = tool_calls[0].get("function", {})
+            name = fn.get("name")
+            args = json.loads(fn.get("arguments") or "{}")
+            # Tools always act on the authenticated customer
+            args["cpf"] = session_manager.customer_cpf
+            print(f"[TriageAgent] Combined routing tool call: {name}")
+
+            if name in ("check_credit_limit", "request_credit_increase", "get_credit_request_history"):
+                response = self.orchestrator.hand_off(
+                    "credito", message, session_manager,
+                    lambda: self.orchestrator.credit_agent.handle_tool_call(name, args, session_manager),
+                )
+
+            elif name in ("get_exchange_rate", "convert_currency", "get_exchange_rate_history"):
+                response = self.orchestrator.hand_off(
+                    "cambio", message, session_manager,
+                    lambda: self.orchestrator.exchange_agent.handle_tool_call(name, args, session_manager),
+                )
+
+            elif name == "route_to_interview":
+                response = self.orchestrator.hand_off("entrevista", message, session_manager)
+
+            else:
+                response = None
+
+            return response or "Posso ajudá-lo com Crédito ou Câmbio. O que prefere?"
+
+        except Exception as e:
+            print(f"[TriageAgent] Error in combined routing: {e}")
+            return "Posso ajudá-lo com Crédito ou Câmbio. O que prefere?"
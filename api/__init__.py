@@ -0,0 +1 @@
+"""API module - Headless HTTP/ASGI interface to the agent orchestrator"""
@@ -0,0 +1,353 @@
+"""
+Headless ASGI API in front of AgentOrchestrator
+
+Endpoints:
+    POST   /sessions                          create a session
+    GET    /sessions/{session_id}             session state and history
+    POST   /sessions/{session_id}/messages    send a message, JSON reply
+    POST   /sessions/{session_id}/stream      send a message, reply as server-sent events
+    DELETE /sessions/{session_id}             end the session
+    GET    /health
+    GET    /metrics                           Prometheus metrics of this worker
+    GET    /diagnostics                       caches, sessions, slowest turns (operator)
+    POST   /diagnostics/profile?seconds=N     sampling CPU profile, collapsed stacks (operator)
+
+Every request loads the session from the configured store and saves it back,
+so any worker or replica can serve any session. Use the sqlite or redis
+session backend when running more than one worker. A turn holds the session's
+lock in the store from load to save, so concurrent turns of one session on
+different workers run one after the other instead of the last save winning.
+
+The stream endpoint does not stream tokens: the agents return a complete
+reply, so it sends "accepted", comment keep-alives while the turn runs (for
+proxies that close idle connections), then the whole reply as one "message".
+
+Message endpoints accept an optional Idempotency-Key header; retrying a
+turn with the same key does not repeat its limit-increase requests.
+Diagnostics endpoints require an X-Operator-Token header matching
+OPERATOR_TOKEN and return 404 when it is unset.
+
+Usage:
+    python -m api.server
+    uvicorn api.server:app --workers 4
+"""
+
+import hmac
+import json
+import asyncio
+import threading
+import weakref
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from agents.orchestrator import AgentOrchestrator
+from utils.session_manager import SessionManager
+from utils.session_store import SessionBusy
+from utils.session_lifecycle import get_session_registry
+from utils.warmup import warm_up
+from utils.admission import admit
+from utils import diagnostics, metrics
+from config import (
+    API_HOST,
+    API_PORT,
+    API_WORKERS,
+    API_REQUEST_TIMEOUT_SECONDS,
+    API_MAX_CONCURRENT_TURNS,
+    API_SSE_KEEPALIVE_SECONDS,
+    SESSION_STORE_BACKEND,
+    SESSION_IDLE_TIMEOUT_SECONDS,
+    WARMUP_ON_START,
+    OPERATOR_TOKEN,
+    DIAGNOSTICS_PROFILE_MAX_SECONDS,
+)
+
+ERROR_MESSAGE = "Ocorreu um erro ao processar sua mensagem. Por favor, tente novamente."
+
+orchestrator = AgentOrchestrator()
+registry = get_session_registry()
+store = registry.store
+
+# Turns run on worker threads; the agents and LLM clients are blocking
+_executor = ThreadPoolExecutor(max_workers=API_MAX_CONCURRENT_TURNS, thread_name_prefix="api-turn")
+
+# One turn at a time per session within this worker; the store lock taken
+# inside covers the other workers without polling for turns queued here
+_session_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_session_locks_guard = threading.Lock()
+
+
+def _session_lock(session_id: str) -> threading.Lock:
+    with _session_locks_guard:
+        lock = _session_locks.get(session_id)
+        if lock is None:
+            lock = threading.Lock()
+            _session_locks[session_id] = lock
+        return lock
+
+
+def _session_view(session: SessionManager) -> dict:
+    return {
+        "session_id": session.session_id,
+        "authenticated": session.authenticated,
+        "current_agent": session.current_agent,
+        "session_ended": session.session_ended,
+    }
+
+
+def _run_turn(session_id: str, message: str, turn_id: str | None = None) -> dict:
+    """
+    Load, process and save one turn. Runs on the executor and always persists
+    its result, even if the HTTP request already timed out.
+
+    turn_id is the request's Idempotency-Key header: a client retrying a turn
+    with the same key gets the recorded results of side-effecting tools
+    (e.g. a limit increase) instead of repeating them.
+    """
+    with _session_lock(session_id):
+        try:
+            with store.locked(session_id):
+                return _locked_turn(session_id, message, turn_id)
+        except SessionBusy:
+            return {"error": "busy"}
+
+
+def _locked_turn(session_id: str, message: str, turn_id: str | None) -> dict:
+    """The body of _run_turn, run while holding the session's store lock"""
+    session = SessionManager.load(store, session_id)
+    if session is None:
+        return {"error": "not_found"}
+    if session.session_ended:
+        return {"error": "ended"}
+    rejection = admit(session)
+    if rejection is not None:
+        # Rejected before any model call; the history is left untouched
+        return {"error": "rate_limited", "message": rejection.message, "retry_after": rejection.retry_after}
+
+    session.add_message("user", message)
+    try:
+        response = orchestrator.process_message(message, session, admitted=True, turn_id=turn_id)
+        if not isinstance(response, str):
+            response = str(response) if response else "Sem resposta"
+    except ValueError as ve:
+        response = str(ve)
+    except Exception as e:
+        print(f"[API] Unexpected error in session {session_id}: {e}")
+        response = ERROR_MESSAGE
+    session.add_message("assistant", response)
+    session.save(store)
+
+    return {
+        **_session_view(session),
+        "response": response,
+        "usage": session.last_turn_usage,
+    }
+
+
+def _turn_error(result: dict) -> JSONResponse | None:
+    if result.get("error") == "not_found":
+        return JSONResponse({"error": "Sessão não encontrada"}, status_code=404)
+    if result.get("error") == "ended":
+        return JSONResponse({"error": "Sessão encerrada"}, status_code=409)
+    if result.get("error") == "busy":
+        return JSONResponse({"error": "Outra mensagem desta sessão ainda está em processamento."}, status_code=409)
+    if result.get("error") == "rate_limited":
+        return JSONResponse(
+            {"error": result["message"]},
+            status_code=429,
+            headers={"Retry-After": str(max(1, round(result["retry_after"])))},
+        )
+    return None
+
+
+async def _read_message(request: Request) -> str | None:
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    message = body.get("message") if isinstance(body, dict) else None
+    return message.strip() if isinstance(message, str) and message.strip() else None
+
+
+async def create_session(request: Request) -> JSONResponse:
+    session = SessionManager()
+    # The save is a blocking store write (sqlite or redis); keep it off the event loop
+    await asyncio.get_running_loop().run_in_executor(_executor, session.save, store)
+    print(f"[API] Session created: {session.session_id}")
+    return JSONResponse(_session_view(session), status_code=201)
+
+
+async def get_session(request: Request) -> JSONResponse:
+    session_id = request.path_params["session_id"]
+    session = await asyncio.get_running_loop().run_in_executor(_executor, SessionManager.load, store, session_id)
+    if session is None:
+        return JSONResponse({"error": "Sessão não encontrada"}, status_code=404)
+    return JSONResponse({**_session_view(session), "history": session.get_session_history()})
+
+
+async def send_message(request: Request) -> JSONResponse:
+    session_id = request.path_params["session_id"]
+    message = await _read_message(request)
+    if message is None:
+        return JSONResponse({"error": "Campo 'message' obrigatório"}, status_code=400)
+
+    turn_id = request.headers.get("idempotency-key")
+    turn = asyncio.get_running_loop().run_in_executor(_executor, _run_turn, session_id, message, turn_id)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(turn), API_REQUEST_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"[API] Turn timed out for session {session_id}")
+        return JSONResponse({"error": "Tempo limite excedido. Tente novamente em instantes."}, status_code=504)
+
+    return _turn_error(result) or JSONResponse(result)
+
+
+async def stream_message(request: Request):
+    session_id = request.path_params["session_id"]
+    message = await _read_message(request)
+    if message is None:
+        return JSONResponse({"error": "Campo 'message' obrigatório"}, status_code=400)
+
+    loop = asyncio.get_running_loop()
+    turn_id = request.headers.get("idempotency-key")
+    turn = loop.run_in_executor(_executor, _run_turn, session_id, message, turn_id)
+
+    async def events():
+        # A keep-alive wrapper around one blocking turn, not token streaming
+        yield "event: accepted\ndata: {}\n\n"
+        deadline = loop.time() + API_REQUEST_TIMEOUT_SECONDS
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                yield f"event: error\ndata: {json.dumps({'error': 'timeout'})}\n\n"
+                return
+            try:
+                result = await asyncio.wait_for(asyncio.shield(turn), min(API_SSE_KEEPALIVE_SECONDS, remaining))
+                break
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+
+        if "error" in result:
+            yield f"event: error\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+            return
+        yield f"event: message\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _end_session(session_id: str) -> SessionManager | None:
+    with _session_lock(session_id), store.locked(session_id):
+        session = SessionManager.load(store, session_id)
+        if session is not None and not session.session_ended:
+            session.end_session()
+            session.save(store)
+        return session
+
+
+async def end_session(request: Request) -> JSONResponse:
+    session_id = request.path_params["session_id"]
+    try:
+        session = await asyncio.get_running_loop().run_in_executor(_executor, _end_session, session_id)
+    except SessionBusy:
+        return _turn_error({"error": "busy"})
+    if session is None:
+        return JSONResponse({"error": "Sessão não encontrada"}, status_code=404)
+    return JSONResponse(_session_view(session))
+
+
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok", "session_store": type(store).__name__})
+
+
+async def get_metrics(request: Request) -> Response:
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _operator_denied(request: Request) -> JSONResponse | None:
+    if not OPERATOR_TOKEN:
+        return JSONResponse({"error": "Não encontrado"}, status_code=404)
+    if not hmac.compare_digest(request.headers.get("x-operator-token", ""), OPERATOR_TOKEN):
+        return JSONResponse({"error": "Acesso negado"}, status_code=403)
+    return None
+
+
+def _diagnostics() -> dict:
+    # API turns load sessions from the store per request, so the registry holds
+    # none of them; list the recently active ones from the store instead
+    return {
+        "sessions": {**registry.stats(), "live": diagnostics.active_sessions(store, SESSION_IDLE_TIMEOUT_SECONDS)},
+        "caches": diagnostics.cache_stats(),
+        "slowest_turns": diagnostics.slowest_turns(),
+        "memory": diagnostics.MEMORY_TRACKER.snapshot(app_only=True),
+    }
+
+
+async def get_diagnostics(request: Request) -> JSONResponse:
+    denied = _operator_denied(request)
+    if denied:
+        return denied
+    # Session sizes and the tracemalloc snapshot take a while; keep them off the
+    # event loop, on the default executor so they do not take a turn slot
+    report = await asyncio.get_running_loop().run_in_executor(None, _diagnostics)
+    return JSONResponse(report, headers={"Cache-Control": "no-store"})
+
+
+async def profile_cpu(request: Request):
+    denied = _operator_denied(request)
+    if denied:
+        return denied
+    try:
+        seconds = float(request.query_params.get("seconds", "10"))
+    except ValueError:
+        return JSONResponse({"error": "Parâmetro 'seconds' inválido"}, status_code=400)
+    seconds = max(1.0, min(seconds, DIAGNOSTICS_PROFILE_MAX_SECONDS))
+    # Default executor, so the profile does not take a turn slot
+    collapsed, _ = await asyncio.get_running_loop().run_in_executor(None, diagnostics.sample_cpu, seconds)
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": "attachment; filename=cpu_profile.txt"})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    # Warm up before the worker accepts its first request
+    if WARMUP_ON_START:
+        await asyncio.get_running_loop().run_in_executor(_executor, warm_up, orchestrator)
+    yield
+
+
+app = Starlette(lifespan=lifespan, routes=[
+    Route("/health", health, methods=["GET"]),
+    Route("/metrics", get_metrics, methods=["GET"]),
+    Route("/diagnostics", get_diagnostics, methods=["GET"]),
+    Route("/diagnostics/profile", profile_cpu, methods=["POST"]),
+    Route("/sessions", create_session, methods=["POST"]),
+    Route("/sessions/{session_id}", get_session, methods=["GET"]),
+    Route("/sessions/{session_id}", end_session, methods=["DELETE"]),
+    Route("/sessions/{session_id}/messages", send_message, methods=["POST"]),
+    Route("/sessions/{session_id}/stream", stream_message, methods=["POST"]),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if API_WORKERS > 1 and SESSION_STORE_BACKEND == "memory":
+        # Each worker would hold its own sessions and 404 the others' session ids
+        raise SystemExit(
+            f"[API] API_WORKERS={API_WORKERS} needs a shared session store; "
+            "set SESSION_STORE_BACKEND to sqlite or redis, or run a single worker"
+        )
+    uvicorn.run(
+        "api.server:app",
+        host=API_HOST,
+        port=API_PORT,
+        workers=API_WORKERS,
+        timeout_keep_alive=30,
+    )
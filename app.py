@@ -5,7 +5,11 @@ Banco Ágil - Sistema de Atendimento com Agentes de IA
 import streamlit as st
 from datetime import datetime
 from agents.orchestrator import AgentOrchestrator
-from utils.session_manager import SessionManager
+from utils.session_lifecycle import get_session_registry, resume_token, session_id_from_resume_token, confirm_resume
+from utils.admission import check_auth_attempt
+from utils.warmup import warm_up
+from utils.metrics import start_metrics_server
+from config import WARMUP_ON_START, METRICS_PORT
 
 st.set_page_config(
     page_title="Banco Ágil - Atendimento",
@@ -13,12 +17,68 @@ st.set_page_config(
     layout="centered"
 )
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-if "orchestrator" not in st.session_state:
-    st.session_state.orchestrator = AgentOrchestrator()
-if "session_manager" not in st.session_state:
-    st.session_state.session_manager = SessionManager()
+@st.cache_resource
+def get_orchestrator() -> AgentOrchestrator:
+    """One stateless orchestrator shared by every browser session"""
+    orchestrator = AgentOrchestrator()
+    if WARMUP_ON_START:
+        warm_up(orchestrator)
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    return orchestrator
+
+
+orchestrator = get_orchestrator()
+session_registry = get_session_registry()
+restored_from_url = False
+if "session_id" not in st.session_state:
+    # Resume the conversation from the shared store when the URL carries a
+    # valid resume token (signed and short-lived, so an old link resumes nothing)
+    st.session_state.session_id = session_id_from_resume_token(st.query_params.get("sid"))
+    restored_from_url = st.session_state.session_id is not None
+# Only the id lives in the browser session; the registry owns the state and may
+# have evicted it to the store while the user was idle
+st.session_state.session_manager = session_registry.get_or_create(st.session_state.session_id)
+if restored_from_url and st.session_state.session_manager.authenticated:
+    # A link (copied, in the history or leaked via Referer) must not hand over an
+    # authenticated customer on its own: the customer confirms the birthdate first
+    st.session_state.resume_pending = True
+    st.session_state.resume_failures = 0
+st.session_state.session_id = st.session_state.session_manager.session_id
+
+
+def start_new_session() -> None:
+    st.session_state.resume_pending = False
+    st.session_state.session_manager = session_registry.get_or_create()
+    st.session_state.session_id = st.session_state.session_manager.session_id
+    st.query_params["sid"] = resume_token(st.session_state.session_id)
+    st.rerun()
+
+
+if st.session_state.get("resume_pending"):
+    st.title("🏦 Banco Ágil")
+    st.info("🔐 Para retomar o atendimento, confirme sua data de nascimento.")
+    with st.form("confirmar_retomada"):
+        birthdate = st.text_input("Data de nascimento (DD/MM/AAAA)")
+        submitted = st.form_submit_button("Retomar atendimento")
+    if submitted:
+        session = st.session_state.session_manager
+        rejection = check_auth_attempt(session.customer_cpf)
+        if rejection is None and confirm_resume(session, birthdate):
+            print(f"[App] Resumed authenticated session {session.session_id} from the URL")
+            st.session_state.resume_pending = False
+            st.rerun()
+        st.session_state.resume_failures += 1
+        if rejection is not None or st.session_state.resume_failures >= session.max_auth_attempts:
+            print(f"[App] Resume of session {session.session_id} not confirmed, starting a new one")
+            start_new_session()
+        st.error(f"⚠️ Data de nascimento não confere. Tentativas restantes: {session.max_auth_attempts - st.session_state.resume_failures}")
+    if st.button("🔄 Iniciar nova conversa"):
+        start_new_session()
+    # Nothing of the session is shown, and the link is not renewed, until confirmed
+    st.stop()
+
+st.query_params["sid"] = resume_token(st.session_state.session_id)
 
 st.markdown("""
     <style>
@@ -57,6 +117,17 @@ with st.sidebar:
     st.write("**Agente Atual:**")
     st.write(st.session_state.session_manager.current_agent.replace("_", " ").title())
 
+    usage = st.session_state.session_manager.last_turn_usage
+    if usage:
+        st.divider()
+        st.write("**Consumo do último turno:**")
+        st.caption(
+            f"{usage['calls']} chamadas LLM · {usage['prompt_tokens']} tokens de entrada · "
+            f"{usage['completion_tokens']} tokens de saída · {usage['latency_ms']:.0f} ms"
+        )
+
+    st.caption(f"🧠 Memória da sessão: {st.session_state.session_manager.memory_footprint() / 1024:.1f} KB")
+
     st.divider()
     st.write("CPF: 11122233344\n\nDATA DE NASCIMENTO: 10/11/1978")
     st.divider()
@@ -64,12 +135,11 @@ with st.sidebar:
     
     st.divider()
     if st.button("🔄 Reiniciar Conversa"):
-        st.session_state.messages = []
-        st.session_state.orchestrator = AgentOrchestrator()
-        st.session_state.session_manager = SessionManager()
+        session_registry.discard(st.session_state.session_id)
+        st.session_state.session_id = None
         st.rerun()
 
-for message in st.session_state.messages:
+for message in st.session_state.session_manager.get_session_history():
     with st.chat_message(message["role"]):
         st.write(message["content"])
 
@@ -80,15 +150,14 @@ if st.session_state.session_manager.session_ended:
 
 if prompt := st.chat_input("Digite sua mensagem..."):
 
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    st.session_state.session_manager.messages.append({"role": "user", "content": prompt})
+    st.session_state.session_manager.add_message("user", prompt)
     with st.chat_message("user"):
         st.write(prompt)
 
     with st.chat_message("assistant"):
         with st.spinner("Processando..."):
             try:
-                response = st.session_state.orchestrator.process_message(
+                response = orchestrator.process_message(
                     prompt,
                     st.session_state.session_manager
                 )
@@ -97,14 +166,7 @@ if prompt := st.chat_input("Digite sua mensagem..."):
                     response = str(response) if response else "Sem resposta"
 
                 st.write(response)
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": response
-                })
-                st.session_state.session_manager.messages.append({
-                    "role": "assistant",
-                    "content": response
-                })
+                st.session_state.session_manager.add_message("assistant", response)
 
 
                 if st.session_state.session_manager.session_ended:
@@ -114,27 +176,15 @@ if prompt := st.chat_input("Digite sua mensagem..."):
 
                 error_msg = str(ve)
                 st.warning(error_msg)
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": error_msg
-                })
-                st.session_state.session_manager.messages.append({
-                    "role": "assistant",
-                    "content": error_msg
-                })
+                st.session_state.session_manager.add_message("assistant", error_msg)
             except Exception as e:
 
                 error_msg = "Ocorreu um erro ao processar sua mensagem. Por favor, tente novamente ou reinicie a conversa."
                 st.error(error_msg)
                 print(f"[APP] Erro inesperado: {e}")
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": error_msg
-                })
-                st.session_state.session_manager.messages.append({
-                    "role": "assistant",
-                    "content": error_msg
-                })
+                st.session_state.session_manager.add_message("assistant", error_msg)
+            finally:
+                session_registry.save(st.session_state.session_manager)
 
 st.divider()
 st.caption("🔒 Banco Ágil - Todos os dados são fictícios para fins de demonstração")
@@ -3,30 +3,216 @@ Configuration file for the banking agent system
 """
 
 import os
+import json
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables (every setting below is read from them)
 load_dotenv()
 
 # Groq API Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+GROQ_MODEL_FAST = os.getenv("GROQ_MODEL_FAST", "llama-3.1-8b-instant")
+
+
+def require_groq_api_key() -> str:
+    """Return the Groq API key; checked when the first LLM client is built, not at import"""
+    if not GROQ_API_KEY:
+        raise ValueError(
+            "GROQ_API_KEY not found. Please set it in your .env file or environment variables."
+        )
+    return GROQ_API_KEY
 
-# Verify API key is set
-if not GROQ_API_KEY:
-    raise ValueError(
-        "GROQ_API_KEY not found. Please set it in your .env file or environment variables."
-    )
 
 # File paths
 DATA_DIR = "data"
 CUSTOMERS_FILE = os.path.join(DATA_DIR, "clientes.csv")
 SCORE_LIMIT_FILE = os.path.join(DATA_DIR, "score_limite.csv")
 REQUESTS_FILE = os.path.join(DATA_DIR, "solicitacoes_aumento_limite.csv")
+RATE_HISTORY_DIR = os.path.join(DATA_DIR, "rates")
+
+# Outbound HTTP (shared pooled clients in utils/http_client.py)
+FRANKFURTER_BASE_URL = os.getenv("FRANKFURTER_BASE_URL", "https://api.frankfurter.app").rstrip("/")
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "false").lower() in ("1", "true", "yes")
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+# Exchange rate cache: entries are fresh for the TTL, then served stale
+# (while refreshed in background) up to the max stale age. A failed fetch is
+# remembered for the error TTL, so while Frankfurter is down callers fall back
+# at once instead of each waiting for its own timeout
+EXCHANGE_RATE_TTL_SECONDS = int(os.getenv("EXCHANGE_RATE_TTL_SECONDS", "3600"))
+EXCHANGE_RATE_MAX_STALE_SECONDS = int(os.getenv("EXCHANGE_RATE_MAX_STALE_SECONDS", "86400"))
+EXCHANGE_RATE_ERROR_TTL_SECONDS = float(os.getenv("EXCHANGE_RATE_ERROR_TTL_SECONDS", "30"))
 
 # Agent configuration
 MAX_AUTH_ATTEMPTS = 3
 
+# Session store backend: "memory" (single process), "sqlite" (shared file) or
+# "redis" (any Redis-protocol server, e.g. scripts/resp_server.py)
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory").lower()
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", os.path.join(DATA_DIR, "sessions.sqlite"))
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "redis://127.0.0.1:6379/0")
+
+# Turn lock held in the session store, so workers and replicas sharing it run
+# one turn per session at a time. The lease must outlast the slowest turn; a
+# turn that cannot get the lock within SESSION_LOCK_WAIT_SECONDS is refused
+SESSION_LOCK_TTL_SECONDS = float(os.getenv("SESSION_LOCK_TTL_SECONDS", "300"))
+SESSION_LOCK_WAIT_SECONDS = float(os.getenv("SESSION_LOCK_WAIT_SECONDS", "30"))
+
+# Session lifecycle (utils/session_lifecycle.py): idle sessions leave memory but
+# stay resumable; ended or long-abandoned sessions are archived and deleted
+SESSION_IDLE_TIMEOUT_SECONDS = int(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "1800"))
+SESSION_ENDED_TTL_SECONDS = int(os.getenv("SESSION_ENDED_TTL_SECONDS", "300"))
+SESSION_ARCHIVE_AFTER_SECONDS = int(os.getenv("SESSION_ARCHIVE_AFTER_SECONDS", "86400"))
+SESSION_MAX_LIVE = int(os.getenv("SESSION_MAX_LIVE", "1000"))
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR", os.path.join(DATA_DIR, "session_archive"))
+
+# Resuming a session from the URL (app.py): the link carries a signed token that
+# expires after SESSION_RESUME_TTL_SECONDS; set the same SESSION_RESUME_SECRET on
+# every replica (unset: a random per-process secret, links work on this process only)
+SESSION_RESUME_SECRET = os.getenv("SESSION_RESUME_SECRET", "")
+SESSION_RESUME_TTL_SECONDS = int(os.getenv("SESSION_RESUME_TTL_SECONDS", "900"))
+
+# Admission control (utils/admission.py): token buckets per session, per CPF,
+# global, and for authentication attempts per CPF across sessions. Buckets
+# live in RATE_LIMIT_BACKEND (defaults to the session store backend).
+# Override with a JSON object in RATE_LIMITS, e.g. '{"session": {"capacity": 5, "refill_per_second": 0.2}}'
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", SESSION_STORE_BACKEND).lower()
+RATE_LIMITS = {
+    "session": {"capacity": 10, "refill_per_second": 0.5},
+    "cpf": {"capacity": 20, "refill_per_second": 0.5},
+    "global": {"capacity": 300, "refill_per_second": 30},
+    "auth": {"capacity": 5, "refill_per_second": 1 / 180},
+}
+RATE_LIMITS.update(json.loads(os.getenv("RATE_LIMITS", "{}")))
+
+# Concurrency bulkheads per agent ("agent.<name>") and tool ("tool.<name>"),
+# per process; a call waiting longer than the queue timeout is rejected.
+# Override with a JSON object in BULKHEAD_LIMITS, e.g. '{"tool.get_exchange_rate": 2}'
+BULKHEAD_DEFAULT_LIMIT = int(os.getenv("BULKHEAD_DEFAULT_LIMIT", "16"))
+BULKHEAD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_SECONDS", "2"))
+BULKHEAD_LIMITS = {
+    "tool.get_exchange_rate": 4,
+    "tool.convert_currency": 4,
+    "tool.get_exchange_rate_history": 2,
+    "tool.request_credit_increase": 4,
+    "tool.update_customer_score": 4,
+}
+BULKHEAD_LIMITS.update(json.loads(os.getenv("BULKHEAD_LIMITS", "{}")))
+
+# Customer change journal (utils/journal.py, utils/customer_store.py): score
+# and limit changes are appended here with group-committed fsyncs; clientes.csv
+# is rewritten as a compacted snapshot every JOURNAL_SNAPSHOT_EVERY events.
+# An append not durable within JOURNAL_APPEND_TIMEOUT_SECONDS fails the caller.
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", os.path.join(DATA_DIR, "journal"))
+JOURNAL_GROUP_COMMIT_MS = float(os.getenv("JOURNAL_GROUP_COMMIT_MS", "2"))
+JOURNAL_SNAPSHOT_EVERY = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "1000"))
+JOURNAL_APPEND_TIMEOUT_SECONDS = float(os.getenv("JOURNAL_APPEND_TIMEOUT_SECONDS", "10"))
+
+# FAQ layer (utils/faq_cache.py): before authentication, questions similar
+# enough to a known one (trigram Jaccard >= FAQ_MATCH_THRESHOLD) are answered
+# without the LLM.
+# Learned entries are LLM answers approved with scripts/faq_review.py.
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "true").lower() in ("1", "true", "yes")
+FAQ_FILE = os.getenv("FAQ_FILE", os.path.join(DATA_DIR, "faq.json"))
+FAQ_LEARNED_FILE = os.getenv("FAQ_LEARNED_FILE", os.path.join(DATA_DIR, "faq", "learned.jsonl"))
+FAQ_PENDING_FILE = os.getenv("FAQ_PENDING_FILE", os.path.join(DATA_DIR, "faq", "pending.jsonl"))
+FAQ_MAX_ENTRIES = int(os.getenv("FAQ_MAX_ENTRIES", "500"))
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.6"))
+
+# Idempotent side-effecting tools (utils/idempotency.py): results kept per
+# (session, turn, tool, arguments) key so a repeated call replays the result
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "900"))
+
+# Conversation history: messages kept per session; older ones are dropped, or
+# appended to <HISTORY_ARCHIVE_DIR>/<session_id>.jsonl for audit when set
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "40"))
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "")
+
+# Tracing (utils/tracing.py): fraction of turns traced (0 disables), the
+# OTLP/JSON lines file the sampled traces are appended to, and how many recent
+# traces stay in memory for the diagnostics page. LLM prompts and outputs
+# carry customer data, so they are recorded only when explicitly enabled
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", os.path.join(DATA_DIR, "traces", "spans.otlp.jsonl"))
+TRACE_MAX_ATTRIBUTE_LENGTH = int(os.getenv("TRACE_MAX_ATTRIBUTE_LENGTH", "4096"))
+TRACE_RECENT_TRACES = int(os.getenv("TRACE_RECENT_TRACES", "200"))
+TRACE_CAPTURE_LLM_CONTENT = os.getenv("TRACE_CAPTURE_LLM_CONTENT", "false").lower() in ("1", "true", "yes")
+
+# Operator diagnostics (pages/ and GET /diagnostics): disabled unless a token
+# is set; CPU profiles are capped at DIAGNOSTICS_PROFILE_MAX_SECONDS
+OPERATOR_TOKEN = os.getenv("OPERATOR_TOKEN", "")
+DIAGNOSTICS_PROFILE_MAX_SECONDS = float(os.getenv("DIAGNOSTICS_PROFILE_MAX_SECONDS", "60"))
+
+# Prometheus metrics (utils/metrics.py): the API serves them on GET /metrics;
+# the Streamlit app listens on METRICS_PORT when set (0 disables)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Headless API (api/server.py): uvicorn workers, per-turn timeout and the
+# number of turns processed concurrently per worker. More than one worker
+# needs a shared session store (sqlite or redis)
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_REQUEST_TIMEOUT_SECONDS = float(os.getenv("API_REQUEST_TIMEOUT_SECONDS", "60"))
+API_MAX_CONCURRENT_TURNS = int(os.getenv("API_MAX_CONCURRENT_TURNS", "16"))
+API_SSE_KEEPALIVE_SECONDS = float(os.getenv("API_SSE_KEEPALIVE_SECONDS", "10"))
+
+# Startup: preload heavy imports, data files, LLM clients and the HTTP pool
+# before the first message (utils/warmup.py) instead of on first use
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "false").lower() in ("1", "true", "yes")
+
+# Bulk rescoring (utils/credit_scoring.py): worker processes (0 = one per CPU)
+# and rows per worker task; inputs up to one chunk are scored in-process
+BULK_SCORING_WORKERS = int(os.getenv("BULK_SCORING_WORKERS", "0"))
+BULK_SCORING_CHUNK_ROWS = int(os.getenv("BULK_SCORING_CHUNK_ROWS", "1000000"))
+
+# Optional mode: triage picks the route and the domain tool call in a single
+# model response (off by default: classification and the domain call stay separate)
+TRIAGE_COMBINED_ROUTING = os.getenv("TRIAGE_COMBINED_ROUTING", "false").lower() in ("1", "true", "yes")
+
 # LLM Settings
-LLM_TEMPERATURE = 0
-LLM_MAX_TOKENS = 1000
\ No newline at end of file
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1000"))
+
+# Output caps per LLM call site (never above LLM_MAX_TOKENS).
+# Override with a JSON object in LLM_CALL_SITE_MAX_TOKENS, e.g. '{"credit.tools": 300}'
+LLM_CALL_SITE_MAX_TOKENS = {
+    "triage.auth": 300,
+    "triage.greeting": 150,
+    "triage.classification": 10,
+    "triage.routing": 300,
+    "credit.tools": 400,
+    "credit.rejection": 250,
+    "interview.ask_next": 150,
+    "exchange.tools": 300,
+    "exchange.phrasing": 200,
+}
+LLM_CALL_SITE_MAX_TOKENS.update(json.loads(os.getenv("LLM_CALL_SITE_MAX_TOKENS", "{}")))
+
+# Model tier per LLM call site. Calls fall back to the other tier on errors.
+# Override with a JSON object in LLM_CALL_SITE_TIERS, e.g. '{"credit.rejection": "large"}'
+LLM_TIER_MODELS = {
+    "fast": GROQ_MODEL_FAST,
+    "large": GROQ_MODEL,
+}
+LLM_DEFAULT_TIER = "large"
+LLM_CALL_SITE_TIERS = {
+    "triage.auth": "large",
+    "triage.greeting": "fast",
+    "triage.classification": "fast",
+    "triage.routing": "large",
+    "credit.tools": "large",
+    "credit.rejection": "fast",
+    "interview.ask_next": "fast",
+    "exchange.tools": "large",
+    "exchange.phrasing": "fast",
+}
+LLM_CALL_SITE_TIERS.update(json.loads(os.getenv("LLM_CALL_SITE_TIERS", "{}")))
@@ -0,0 +1,115 @@
+"""
+Operator diagnostics page: sessions and memory, caches, slow turns and CPU profiling
+
+Shown only after the operator enters OPERATOR_TOKEN; disabled when it is unset.
+"""
+
+import hmac
+import streamlit as st
+from datetime import datetime
+from utils.session_lifecycle import get_session_registry
+from utils.tracing import get_sample_rate, set_sample_rate
+from utils.diagnostics import MEMORY_TRACKER, cache_stats, live_sessions, slowest_turns, sample_cpu
+from config import OPERATOR_TOKEN, DIAGNOSTICS_PROFILE_MAX_SECONDS
+
+st.set_page_config(page_title="Banco Ágil - Diagnóstico", page_icon="🛠️", layout="wide")
+st.title("🛠️ Diagnóstico do Operador")
+
+if not OPERATOR_TOKEN:
+    st.info("Página desativada. Defina OPERATOR_TOKEN para habilitá-la.")
+    st.stop()
+
+if not st.session_state.get("operator_authorized"):
+    token = st.text_input("Token do operador", type="password")
+    if token and hmac.compare_digest(token, OPERATOR_TOKEN):
+        st.session_state.operator_authorized = True
+        st.rerun()
+    elif token:
+        st.error("Token inválido.")
+    st.stop()
+
+registry = get_session_registry()
+sessions_tab, memory_tab, caches_tab, turns_tab, cpu_tab = st.tabs(
+    ["Sessões", "Memória", "Caches", "Turnos lentos", "Perfil de CPU"]
+)
+
+with sessions_tab:
+    counters = registry.stats()
+    cols = st.columns(len(counters))
+    for col, (name, value) in zip(cols, counters.items()):
+        col.metric(name, value)
+    rows = live_sessions(registry)
+    st.caption(f"{len(rows)} sessões em memória · {sum(r['memory_kb'] for r in rows):,.1f} KB no total")
+    st.dataframe(rows, use_container_width=True)
+
+with memory_tab:
+    st.caption(
+        "O tracemalloc só registra alocações feitas depois de iniciado e deixa cada alocação mais lenta "
+        "enquanto está ativo; pare-o ao terminar."
+    )
+    start_col, stop_col, snap_col = st.columns(3)
+    if start_col.button("Iniciar tracemalloc", disabled=MEMORY_TRACKER.active):
+        MEMORY_TRACKER.start()
+        st.rerun()
+    if stop_col.button("Parar tracemalloc", disabled=not MEMORY_TRACKER.active):
+        MEMORY_TRACKER.stop()
+        st.rerun()
+    app_only = st.checkbox("Somente código do app", value=False)
+    if snap_col.button("Capturar snapshot", disabled=not MEMORY_TRACKER.active):
+        st.session_state.memory_snapshot = MEMORY_TRACKER.snapshot(app_only=app_only)
+
+    snapshot = st.session_state.get("memory_snapshot")
+    if snapshot and snapshot.get("active"):
+        st.metric("Memória rastreada", f"{snapshot['traced_kb']:,.1f} KB", help=f"Pico: {snapshot['peak_kb']:,.1f} KB")
+        st.write("**Maiores pontos de alocação**")
+        st.dataframe(snapshot["top"], use_container_width=True)
+        st.write("**Crescimento desde o snapshot anterior**")
+        st.dataframe(snapshot["growth"], use_container_width=True)
+
+with caches_tab:
+    for name, stats in cache_stats().items():
+        with st.expander(name, expanded=name in ("customers", "faq", "exchange_rates")):
+            st.json(stats)
+
+with turns_tab:
+    st.caption("Somente turnos amostrados pelo tracing ficam disponíveis aqui (TRACE_SAMPLE_RATE).")
+    rate = st.slider("Taxa de amostragem", 0.0, 1.0, float(get_sample_rate()), 0.05)
+    if rate != get_sample_rate():
+        set_sample_rate(rate)
+    turns = slowest_turns(limit=10)
+    if not turns:
+        st.info("Nenhum turno amostrado em memória.")
+    for turn in turns:
+        with st.expander(f"{turn['duration_ms']:,.0f} ms · {turn['agent']} · sessão {turn['session_id']}"):
+            st.dataframe(
+                [
+                    {**row, "span": " " * row["depth"] + row["span"]}
+                    for row in turn["spans"]
+                ],
+                use_container_width=True,
+                column_order=["span", "offset_ms", "duration_ms", "error"],
+            )
+
+with cpu_tab:
+    st.caption(
+        "Amostra a pilha de todas as threads do processo. O resultado é gerado em formato de pilhas "
+        "colapsadas, aberto por speedscope.app ou flamegraph.pl."
+    )
+    seconds = st.number_input("Duração (s)", 1.0, DIAGNOSTICS_PROFILE_MAX_SECONDS, 10.0, 1.0)
+    include_idle = st.checkbox("Incluir threads ociosas", value=False)
+    if st.button("Executar perfil"):
+        with st.spinner(f"Amostrando por {seconds:.0f}s..."):
+            st.session_state.cpu_profile = sample_cpu(seconds, include_idle=include_idle)
+            st.session_state.cpu_profile_at = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    profile = st.session_state.get("cpu_profile")
+    if profile:
+        collapsed, summary = profile
+        st.write(f"**{summary['samples']} amostras em {summary['seconds']:.0f}s**")
+        st.dataframe(summary["top_functions"], use_container_width=True)
+        st.download_button(
+            "Baixar perfil",
+            collapsed,
+            file_name=f"cpu_profile_{st.session_state.cpu_profile_at}.txt",
+            mime="text/plain",
+        )
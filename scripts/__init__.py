@@ -0,0 +1 @@
+"""Scripts module - Development, load-testing and benchmark utilities"""
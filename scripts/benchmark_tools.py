@@ -0,0 +1,271 @@
+"""
+Micro-benchmarks for the customer and credit tools at scale
+
+Generates synthetic customer, credit policy and request-log files at each
+size, then times every tool's cold (first) call, warm calls and Python heap
+peak (tracemalloc) against them. The interview score formula is timed on its
+own since it does not touch the data files. Results are compared with a
+stored baseline; a fastest warm call or memory peak above the tolerance is flagged
+as a regression and makes the script exit with status 1. Timings only compare
+on the same machine, so the baseline is a local, unversioned file.
+
+Generated files are kept under --work-dir and reused between runs as a
+pristine copy. Some tools write to the data (the request log, scores), so every
+case runs against a fresh copy of it: each run, case and size measures the same
+inputs.
+
+Usage:
+    python -m scripts.benchmark_tools --sizes 1k,100k
+    python -m scripts.benchmark_tools --sizes 1k,100k,10m --repeats 3
+    python -m scripts.benchmark_tools --sizes 1k,100k --update-baseline
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "scripts", "benchmark_baseline.json")
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(label: str) -> int:
+    label = label.strip().lower()
+    if label[-1] in SIZE_SUFFIXES:
+        return int(float(label[:-1]) * SIZE_SUFFIXES[label[-1]])
+    return int(label)
+
+
+def generate_data(data_dir: str, rows: int, seed: int = 42) -> None:
+    """Write clientes.csv, score_limite.csv and solicitacoes_aumento_limite.csv with `rows` rows each"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+
+    cpfs = pd.Series(np.arange(10_000_000_000, 10_000_000_000 + rows, dtype=np.int64)).astype(str)
+    birthdates = (
+        pd.Series(rng.integers(1, 29, rows)).astype(str).str.zfill(2) + "/" +
+        pd.Series(rng.integers(1, 13, rows)).astype(str).str.zfill(2) + "/" +
+        pd.Series(rng.integers(1950, 2005, rows)).astype(str)
+    )
+    pd.DataFrame({
+        "cpf": cpfs,
+        "data_nascimento": birthdates,
+        "score": np.round(rng.uniform(0, 1000, rows), 1),
+        "limite_credito": np.round(rng.uniform(500, 50000, rows), -2),
+    }).to_csv(os.path.join(data_dir, "clientes.csv"), index=False)
+
+    # Policy tiers with increasing minimum score and maximum limit
+    pd.DataFrame({
+        "score_minimo": np.linspace(0, 1000, rows).round(2),
+        "limite_maximo": np.linspace(1000, 100_000, rows).round(2),
+    }).to_csv(os.path.join(data_dir, "score_limite.csv"), index=False)
+
+    pd.DataFrame({
+        "cpf_cliente": cpfs.sample(frac=1, random_state=seed).values,
+        "data_hora_solicitacao": datetime(2025, 1, 1).isoformat(),
+        "limite_atual": np.round(rng.uniform(500, 50000, rows), -2),
+        "novo_limite_solicitado": np.round(rng.uniform(500, 60000, rows), -2),
+        "status_pedido": np.where(rng.random(rows) < 0.5, "aprovado", "rejeitado"),
+    }).to_csv(os.path.join(data_dir, "solicitacoes_aumento_limite.csv"), index=False)
+
+
+def _measure(fn, repeats: int) -> dict:
+    """Cold (first) call, warm calls, and tracemalloc peak of one extra call"""
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    warm = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        warm.append((time.perf_counter() - start) * 1000)
+    warm.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "cold_ms": round(cold_ms, 3),
+        "warm_p50_ms": round(warm[len(warm) // 2], 3) if warm else None,
+        "warm_min_ms": round(warm[0], 3) if warm else None,
+        "peak_mb": round(peak / 1024 / 1024, 3),
+    }
+
+
+def _restore_data(pristine_dir: str, data_dir: str) -> None:
+    """
+    Replace data/ with fresh copies of the generated files and no journal.
+    Copies get a new mtime, so every file-backed cache sees them as changed.
+    """
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+    for name in os.listdir(pristine_dir):
+        shutil.copyfile(os.path.join(pristine_dir, name), os.path.join(data_dir, name))
+
+
+def bench_size(rows: int, work_dir: str, repeats: int) -> dict:
+    """Benchmark the data tools against synthetic files of the given size"""
+    from tools.customer_tools import authenticate_customer
+    from tools.credit_tools import check_credit_limit, request_credit_increase, update_customer_score, get_credit_request_history
+
+    size_dir = os.path.join(work_dir, str(rows))
+    pristine_dir = os.path.join(size_dir, "pristine")
+    data_dir = os.path.join(size_dir, "data")
+    if not os.path.exists(os.path.join(pristine_dir, "solicitacoes_aumento_limite.csv")):
+        print(f"[Benchmark] Generating {rows:,} rows in {pristine_dir}")
+        start = time.perf_counter()
+        generate_data(pristine_dir, rows)
+        print(f"[Benchmark] Generated in {time.perf_counter() - start:.1f}s")
+
+    # Tools resolve data/ relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(size_dir)
+    try:
+        import pandas as pd
+        last = pd.read_csv(os.path.join(pristine_dir, "clientes.csv"), dtype={"cpf": str}, skiprows=range(1, rows)).iloc[0]
+        cpf, birthdate = last["cpf"], last["data_nascimento"]
+
+        cases = {
+            "authenticate_customer": lambda: authenticate_customer.invoke({"cpf": cpf, "birthdate": birthdate}),
+            "check_credit_limit": lambda: check_credit_limit.invoke({"cpf": cpf}),
+            "request_credit_increase": lambda: request_credit_increase.invoke({"cpf": cpf, "requested_limit": 1000.0}),
+            "update_customer_score": lambda: update_customer_score.invoke({"cpf": cpf, "new_score": 500.0}),
+            "get_credit_request_history": lambda: get_credit_request_history.invoke({"cpf": cpf, "limit": 5}),
+        }
+        results = {}
+        for name, fn in cases.items():
+            _restore_data(pristine_dir, data_dir)
+            results[name] = _measure(fn, repeats)
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def bench_calculate_score(iterations: int) -> dict:
+    """Time InterviewAgent._calculate_score per call"""
+    from agents.interview_agent import InterviewAgent
+
+    agent = InterviewAgent(None)
+    data = {
+        "renda_mensal": 6000.0,
+        "tipo_emprego": "autônomo",
+        "despesas_fixas": 3500.0,
+        "num_dependentes": 0,
+        "tem_dividas": "não",
+    }
+    result = _measure(lambda: agent._calculate_score(data), repeats=5)
+
+    # Best of several rounds, as timeit does, to filter scheduler noise
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations // 5):
+            agent._calculate_score(data)
+        rounds.append((time.perf_counter() - start) / (iterations // 5))
+    result["per_call_us"] = round(min(rounds) * 1e6, 3)
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float = 0.0) -> list:
+    """Metrics that got worse than baseline * (1 + tolerance)"""
+    regressions = []
+    for size, tools in results["sizes"].items():
+        for tool, metrics in tools.items():
+            previous = baseline.get("sizes", {}).get(size, {}).get(tool)
+            if not previous:
+                continue
+            for metric in ("warm_min_ms", "peak_mb"):
+                old, new = previous.get(metric), metrics.get(metric)
+                if metric.endswith("_ms") and new is not None and old is not None and new - old < min_delta_ms:
+                    continue
+                if old and new and new > old * (1 + tolerance):
+                    regressions.append(f"{size} {tool} {metric}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    old = baseline.get("micro", {}).get("calculate_score", {}).get("per_call_us")
+    new = results["micro"]["calculate_score"]["per_call_us"]
+    if old and new > old * (1 + tolerance):
+        regressions.append(f"calculate_score per_call_us: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the data tools at scale")
+    parser.add_argument("--sizes", default="1k,100k,10m", help="Comma-separated row counts (k/m suffixes allowed)")
+    parser.add_argument("--repeats", type=int, default=5, help="Warm calls per tool")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "banco_agil_bench"))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed growth before flagging (0.5 = 50%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore timing changes smaller than this")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="Keep tool logs on stdout")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+    import contextlib
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "repeats": args.repeats,
+        "sizes": {},
+        "micro": {},
+    }
+    sink = sys.stdout if args.verbose else open(os.devnull, "w")
+    for label in args.sizes.split(","):
+        rows = parse_size(label)
+        with contextlib.redirect_stdout(sink):
+            sizes = bench_size(rows, args.work_dir, args.repeats)
+        results["sizes"][label.strip().lower()] = sizes
+        for name, metrics in sizes.items():
+            print(f"[Benchmark] {label:>6} {name:<26} cold={metrics['cold_ms']:.1f}ms "
+                  f"warm={metrics['warm_p50_ms']:.1f}ms peak={metrics['peak_mb']:.1f}MB")
+    with contextlib.redirect_stdout(sink):
+        results["micro"]["calculate_score"] = bench_calculate_score(100_000)
+    print(f"[Benchmark] calculate_score {results['micro']['calculate_score']['per_call_us']:.2f}us/call")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[Benchmark] Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[Benchmark] Baseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"[Benchmark] No baseline at {args.baseline}; run with --update-baseline on this machine first")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("[Benchmark] ⚠️ Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("[Benchmark] No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Startup import budget check
+
+Imports the app's entry module in fresh interpreters with `-X importtime`
+and fails when the cumulative import time exceeds the budget or when the
+app's own modules eagerly import a dependency that must stay lazy (loaded
+on first use or by the warm-up). Prints the slowest modules the app imports
+directly to show where the time went.
+
+langchain_core currently pulls requests and httpx in through langsmith;
+such transitive imports are listed but not counted as violations.
+
+Usage:
+    python -m scripts.check_import_time
+    python -m scripts.check_import_time --module api.server --budget-ms 1500
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that startup must not pull in
+LAZY_MODULES = ("pandas", "numpy", "langchain_groq", "groq", "requests", "httpx")
+
+# Packages of this repo
+APP_PACKAGES = ("agents", "tools", "utils", "api", "config", "app")
+
+
+def measure(module: str) -> list:
+    """(module, self_us, cumulative_us, depth, importer) for every import of a fresh `import module`"""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    # Startup must not depend on the API key; it is checked when the first LLM client is built
+    env.pop("GROQ_API_KEY", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+
+    # -X importtime prints children before their parent; walking backwards,
+    # the last module seen one level up is the importer
+    imports = []
+    parents: dict = {}
+    for name, self_us, cumulative_us, depth in reversed(rows):
+        parents[depth] = name
+        imports.append((name, self_us, cumulative_us, depth, parents.get(depth - 1, "")))
+    imports.reverse()
+    return imports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the startup import time budget")
+    parser.add_argument("--module", default="agents.orchestrator", help="Entry module to import")
+    parser.add_argument("--budget-ms", type=float, default=1200.0, help="Maximum cumulative import time")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports to list")
+    args = parser.parse_args()
+
+    # Fastest of several runs, as timeit does, to filter scheduler noise
+    runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    imports = min(runs, key=lambda run: sum(i[1] for i in run))
+    total_ms = sum(i[1] for i in imports) / 1000
+    lazy = [i for i in imports if i[0].split(".")[0] in LAZY_MODULES]
+    eager = sorted({f"{i[0]} (from {i[4]})" for i in lazy if i[4].split(".")[0] in APP_PACKAGES})
+    transitive = sorted({i[0].split(".")[0] for i in lazy})
+
+    print(f"[ImportTime] import {args.module}: {total_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    # Slowest modules imported directly by the app's own code
+    direct = sorted((i for i in imports if i[4].split(".")[0] in APP_PACKAGES), key=lambda i: -i[2])
+    for name, _, cumulative_us, _, _ in direct[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+    if transitive and not eager:
+        print(f"[ImportTime] Loaded by third-party packages: {', '.join(transitive)}")
+
+    failed = False
+    if total_ms > args.budget_ms:
+        print(f"[ImportTime] ⚠️ Over budget by {total_ms - args.budget_ms:.0f}ms")
+        failed = True
+    if eager:
+        print("[ImportTime] ⚠️ Imported eagerly, should load on first use:")
+        for line in eager:
+            print(f"  {line}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("[ImportTime] OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Review LLM answers proposed for the FAQ cache
+
+Triage answers given without any tool call are queued in FAQ_PENDING_FILE.
+Approved ones are appended to FAQ_LEARNED_FILE, which every process picks up
+on its next lookup; approved and rejected proposals leave the queue.
+
+Usage:
+    python -m scripts.faq_review                      # list pending proposals
+    python -m scripts.faq_review --approve 0 3 --reject 1
+    python -m scripts.faq_review --reject-all
+"""
+
+import os
+import sys
+import json
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def main() -> None:
+    from utils.faq_cache import FAQ_CACHE
+    from utils.journal import write_atomic
+
+    parser = argparse.ArgumentParser(description="Approve or reject proposed FAQ answers")
+    parser.add_argument("--approve", type=int, nargs="*", default=[], help="Proposal numbers to add to the FAQ")
+    parser.add_argument("--reject", type=int, nargs="*", default=[], help="Proposal numbers to discard")
+    parser.add_argument("--reject-all", action="store_true", help="Discard every proposal not approved")
+    args = parser.parse_args()
+
+    pending = FAQ_CACHE.pending()
+    if not (args.approve or args.reject or args.reject_all):
+        if not pending:
+            print("[FAQReview] No pending proposals")
+        for i, item in enumerate(pending):
+            print(f"#{i} P: {item['question']}\n   R: {item['answer']}\n")
+        return
+
+    unknown = [i for i in args.approve + args.reject if not 0 <= i < len(pending)]
+    if unknown:
+        sys.exit(f"[FAQReview] Unknown proposal numbers: {unknown}")
+
+    for i in args.approve:
+        FAQ_CACHE.learn(pending[i]["question"], pending[i]["answer"])
+        print(f"[FAQReview] Approved #{i}: {pending[i]['question']}")
+
+    resolved = set(args.approve) | set(args.reject)
+    remaining = [] if args.reject_all else [item for i, item in enumerate(pending) if i not in resolved]
+    write_atomic(
+        FAQ_CACHE.pending_file,
+        "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in remaining).encode("utf-8"),
+    )
+    print(f"[FAQReview] {len(pending) - len(remaining)} resolved, {len(remaining)} still pending")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Conversation load test against AgentOrchestrator with a fake LLM
+
+Replays scripted multi-turn conversations (login -> credit -> rejection ->
+interview, and login -> exchange) from concurrent simulated users. The LLM is
+replaced by a rule-based fake with injected latency and exchange rates come
+from the local Frankfurter stub, so runs are free and repeatable. Tools write
+to a temporary copy of data/, never to the real CSV files.
+
+Reports throughput and p50/p95/p99 turn latency per agent (the agent the
+turn ended in, i.e. the one that handled it after any routing) and per turn
+type, and writes the results as JSON so runs can be compared. Each turn type
+has an agent it must reach (TURN_AGENTS); a turn that reaches neither before
+nor after it is counted as misrouted, and any misrouted turn makes the script
+exit with status 1, since the latencies would then not measure the journeys.
+
+Usage:
+    python -m scripts.loadtest --conversations 200 --concurrency 20 --rate 10
+    python -m scripts.loadtest --output run2.json --compare run1.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# (turn type, user message)
+SCRIPTS = {
+    "credit_journey": [
+        ("login", "Meu CPF é 11122233344 e nasci em 10/11/1978"),
+        ("credit_query", "Qual é o meu limite de crédito?"),
+        ("credit_increase", "Quero um aumento de limite para 8000"),
+        ("interview_start", "Quero fazer a entrevista"),
+        ("interview_answer", "Minha renda mensal é 5000"),
+        ("interview_answer", "Trabalho formal, com carteira assinada"),
+        ("interview_answer", "Minhas despesas fixas são 1000"),
+        ("interview_answer", "Tenho 0 dependentes"),
+        ("interview_answer", "Não tenho dívidas"),
+        ("goodbye", "Obrigado, tchau"),
+    ],
+    "exchange_journey": [
+        ("login", "CPF 12345678901, data de nascimento 15/03/1985"),
+        ("exchange_rate", "Qual a cotação do dólar hoje?"),
+        ("exchange_convert", "Quero converter 250 euros para reais"),
+        ("exchange_history", "Como foi a variação da libra no último mês?"),
+        ("goodbye", "Obrigado, tchau"),
+    ],
+}
+
+# Agent each scripted turn type is meant to reach (goodbye ends the session anywhere)
+TURN_AGENTS = {
+    "login": "triagem",
+    "credit_query": "credito",
+    "credit_increase": "credito",
+    "interview_start": "entrevista",
+    "interview_answer": "entrevista",
+    "exchange_rate": "cambio",
+    "exchange_convert": "cambio",
+    "exchange_history": "cambio",
+}
+
+# Prompts passed as one string quote the customer's message this way
+QUOTED_MESSAGE = re.compile(r'Mensagem:\s*"(.*?)"', re.DOTALL)
+
+CURRENCY_WORDS = {
+    "dólar": "USD", "dolar": "USD", "usd": "USD",
+    "euro": "EUR", "eur": "EUR",
+    "libra": "GBP", "gbp": "GBP",
+    "iene": "JPY", "jpy": "JPY",
+    "peso": "ARS", "ars": "ARS",
+}
+
+
+class FakeChatModel:
+    """
+    Stand-in for ChatGroq: sleeps for the injected latency, then answers with
+    the tool call (or text) the real model would produce for the scripted
+    messages.
+    """
+
+    def __init__(self, tier: str, latency_ms: float, jitter_ms: float, tools: list | None = None):
+        self.tier = tier
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tool_names = {t.name for t in tools or []}
+
+    def bind_tools(self, tools: list) -> "FakeChatModel":
+        return FakeChatModel(self.tier, self.latency_ms, self.jitter_ms, tools)
+
+    def invoke(self, llm_input, max_tokens: int | None = None, **kwargs):
+        from langchain_core.messages import AIMessage
+
+        time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+
+        messages = [("user", llm_input)] if isinstance(llm_input, str) else list(llm_input)
+        user_text = next((c for role, c in reversed(messages) if role == "user"), "")
+        if isinstance(llm_input, str):
+            # Match keywords against the customer's message, not the prompt
+            # around it (the classification prompt itself names every intent)
+            quoted = QUOTED_MESSAGE.search(llm_input)
+            if quoted:
+                user_text = quoted.group(1)
+        all_text = "\n".join(str(c) for _, c in messages)
+
+        tool_call = self._choose_tool(user_text, all_text)
+        content = "" if tool_call else self._text_reply(user_text, all_text)
+
+        additional_kwargs = {}
+        if tool_call:
+            name, args = tool_call
+            additional_kwargs["tool_calls"] = [{
+                "id": f"call_{random.getrandbits(32):08x}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args)},
+            }]
+        prompt_tokens = len(all_text) // 4
+        completion_tokens = max(1, len(content) // 4) if content else 20
+        return AIMessage(
+            content=content,
+            additional_kwargs=additional_kwargs,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+            response_metadata={"finish_reason": "tool_calls" if tool_call else "stop"},
+        )
+
+    def _choose_tool(self, user_text: str, all_text: str):
+        text = user_text.lower()
+        cpf = re.search(r"CPF:?\s*(\d{11})", all_text)
+        number = re.search(r"\d+(?:[.,]\d+)?", text)
+        currency = next((code for word, code in CURRENCY_WORDS.items() if word in text), None)
+
+        if "authenticate_customer" in self.tool_names:
+            birthdate = re.search(r"\d{2}/\d{2}/\d{4}", user_text)
+            digits = re.search(r"\d{11}", user_text)
+            if digits and birthdate:
+                return "authenticate_customer", {"cpf": digits.group(0), "birthdate": birthdate.group(0)}
+            return None
+
+        if "convert" in text and currency and number and "convert_currency" in self.tool_names:
+            return "convert_currency", {"amount": float(number.group(0).replace(",", ".")), "from_currency": currency, "to_currency": "BRL"}
+        if ("histórico" in text or "variação" in text) and currency and "get_exchange_rate_history" in self.tool_names:
+            return "get_exchange_rate_history", {"currency_code": currency, "days": 30}
+        if currency and "get_exchange_rate" in self.tool_names:
+            return "get_exchange_rate", {"currency_code": currency}
+        if ("entrevista" in text or "score" in text) and "route_to_interview" in self.tool_names:
+            return "route_to_interview", {"reason": "Cliente pediu entrevista"}
+        if "aumento" in text and number and "request_credit_increase" in self.tool_names:
+            args = {"requested_limit": float(number.group(0).replace(",", "."))}
+            if cpf:
+                args["cpf"] = cpf.group(1)
+            return "request_credit_increase", args
+        if "limite" in text and "check_credit_limit" in self.tool_names:
+            return "check_credit_limit", {"cpf": cpf.group(1)} if cpf else {}
+        return None
+
+    def _text_reply(self, user_text: str, all_text: str) -> str:
+        text = user_text.lower()
+        if "Responda APENAS com uma destas palavras" in all_text:
+            if "entrevista" in text or "score" in text:
+                return "entrevista"
+            if "limite" in text or "aumento" in text:
+                return "credito"
+            if any(word in text for word in CURRENCY_WORDS):
+                return "cambio"
+            return "outros"
+        if "check_credit_limit" in self.tool_names and ("entrevista" in text or "score" in text):
+            return "ROTA_ENTREVISTA|Vamos fazer uma entrevista rápida."
+        return "Resposta simulada do assistente do Banco Ágil."
+
+
+def _percentile(sorted_values: list, p: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _latency_summary(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(_percentile(values, 50), 2),
+        "p95_ms": round(_percentile(values, 95), 2),
+        "p99_ms": round(_percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def _group(turns: list, key: str) -> dict:
+    groups: dict = {}
+    for turn in turns:
+        groups.setdefault(turn[key], []).append(turn["latency_ms"])
+    return {name: _latency_summary(values) for name, values in sorted(groups.items())}
+
+
+def run(args) -> dict:
+    from agents.orchestrator import AgentOrchestrator
+    from utils.session_manager import SessionManager
+    from utils.llm_client import set_chat_model_factory, TIER_STATS
+    from utils.usage_ledger import GLOBAL_USAGE
+    from utils.tracing import get_exporter
+
+    latencies = {"fast": args.fast_latency_ms, "large": args.large_latency_ms}
+    set_chat_model_factory(lambda tier: FakeChatModel(tier, latencies.get(tier, args.large_latency_ms), args.jitter_ms))
+
+    orchestrator = AgentOrchestrator()
+    script_names = [name for name in args.scripts.split(",") if name]
+    turns: list = []
+    conversations: list = []
+    lock = threading.Lock()
+
+    def conversation(index: int, scheduled_at: float) -> None:
+        started = time.perf_counter()
+        script = script_names[index % len(script_names)]
+        session = SessionManager()
+        for turn_type, message in SCRIPTS[script]:
+            if session.session_ended:
+                break
+            agent_before = session.current_agent
+            session.add_message("user", message)
+            t0 = time.perf_counter()
+            error = False
+            try:
+                response = orchestrator.process_message(message, session)
+                error = "ocorreu um erro" in str(response).lower()
+            except Exception as e:
+                response = f"exception: {e}"
+                error = True
+            latency_ms = (time.perf_counter() - t0) * 1000
+            session.add_message("assistant", str(response))
+            expected = TURN_AGENTS.get(turn_type)
+            with lock:
+                turns.append({
+                    "script": script,
+                    "turn_type": turn_type,
+                    "agent": session.current_agent,
+                    "latency_ms": latency_ms,
+                    "error": error,
+                    "misrouted": expected is not None and expected not in (agent_before, session.current_agent),
+                })
+            if args.think_ms:
+                time.sleep(random.expovariate(1000 / args.think_ms))
+        with lock:
+            conversations.append({
+                "script": script,
+                "queue_ms": (started - scheduled_at) * 1000,
+                "duration_ms": (time.perf_counter() - started) * 1000,
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="loadtest") as pool:
+        futures = []
+        next_arrival = start
+        for i in range(args.conversations):
+            if args.rate > 0:
+                next_arrival += random.expovariate(args.rate)
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(conversation, i, time.perf_counter()))
+        wait(futures)
+    elapsed = time.perf_counter() - start
+    get_exporter().flush()
+
+    return {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "conversations": args.conversations,
+            "concurrency": args.concurrency,
+            "arrival_rate_per_s": args.rate,
+            "scripts": script_names,
+            "fast_latency_ms": args.fast_latency_ms,
+            "large_latency_ms": args.large_latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "think_ms": args.think_ms,
+            "seed": args.seed,
+        },
+        "totals": {
+            "duration_s": round(elapsed, 3),
+            "conversations": len(conversations),
+            "turns": len(turns),
+            "errors": sum(1 for t in turns if t["error"]),
+            "misrouted": sum(1 for t in turns if t["misrouted"]),
+            "turns_per_s": round(len(turns) / elapsed, 2) if elapsed else 0.0,
+            "conversations_per_s": round(len(conversations) / elapsed, 2) if elapsed else 0.0,
+        },
+        "turn_latency": _latency_summary([t["latency_ms"] for t in turns]),
+        "by_agent": _group(turns, "agent"),
+        "by_turn_type": _group(turns, "turn_type"),
+        "misrouted_by_turn_type": {
+            name: sum(1 for t in turns if t["turn_type"] == name and t["misrouted"])
+            for name in sorted({t["turn_type"] for t in turns if t["misrouted"]})
+        },
+        "queue_latency": _latency_summary([c["queue_ms"] for c in conversations]),
+        "llm_usage": GLOBAL_USAGE.summary(),
+        "llm_tiers": TIER_STATS.summary(),
+    }
+
+
+def _print_report(results: dict, baseline: dict | None) -> None:
+    totals = results["totals"]
+    print(
+        f"[LoadTest] {totals['conversations']} conversations, {totals['turns']} turns in {totals['duration_s']}s "
+        f"({totals['turns_per_s']} turns/s), errors={totals['errors']}, misrouted={totals['misrouted']}"
+    )
+    for section in ("by_agent", "by_turn_type"):
+        print(f"\n{section}:")
+        print(f"  {'name':<20}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, stats in results[section].items():
+            line = f"  {name:<20}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+            previous = (baseline or {}).get(section, {}).get(name)
+            if previous and previous["p95_ms"]:
+                delta = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+                line += f"   p95 {delta:+.1f}% vs baseline"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test AgentOrchestrator with a fake LLM")
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10, help="Simulated users in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="Conversation arrivals per second (0 = all at once)")
+    parser.add_argument("--scripts", default=",".join(SCRIPTS), help="Comma-separated script names")
+    parser.add_argument("--fast-latency-ms", type=float, default=150.0)
+    parser.add_argument("--large-latency-ms", type=float, default=600.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean user think time between turns")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output", default="loadtest_results.json")
+    parser.add_argument("--compare", help="Previous results file to compare p95 latencies against")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Keep admission rate limits on (off by default: every simulated user shares two test CPFs)")
+    parser.add_argument("--verbose", action="store_true", help="Keep agent logs on stdout")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    from scripts.stub_frankfurter import start_stub_server
+
+    # Isolated copy of data/ so tool writes never touch the real files
+    workdir = tempfile.mkdtemp(prefix="banco_agil_loadtest_")
+    shutil.copytree(os.path.join(ROOT, "data"), os.path.join(workdir, "data"), ignore=shutil.ignore_patterns("rates"))
+    stub, stub_url = start_stub_server()
+    os.environ["FRANKFURTER_BASE_URL"] = stub_url
+    os.environ.setdefault("GROQ_API_KEY", "loadtest")
+    if not args.rate_limits:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.chdir(workdir)
+
+    try:
+        sink = sys.stdout if args.verbose else open(os.devnull, "w")
+        with contextlib.redirect_stdout(sink):
+            results = run(args)
+    finally:
+        stub.shutdown()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    _print_report(results, baseline)
+    print(f"\n[LoadTest] Results written to {output}")
+
+    if results["totals"]["misrouted"]:
+        print(f"[LoadTest] ⚠️ Turns that never reached their agent: {results['misrouted_by_turn_type']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
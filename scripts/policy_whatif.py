@@ -0,0 +1,177 @@
+"""
+What-if simulator for credit policy changes
+
+Replays every row of the limit-increase request log against the current
+policy (score_limite.csv) and a candidate table, joined with each customer's
+score from clientes.csv, and reports how approvals and granted limits would
+shift: approval-rate and exposure deltas overall and per score band.
+
+The log is streamed in chunks and each chunk is evaluated with NumPy
+(binary search over the compiled tiers, bincount per band), so memory stays
+flat and millions of requests replay in seconds.
+
+Scores are the customers' current scores; the log does not record the score
+at request time. Requests from CPFs missing in clientes.csv are counted
+separately and never approved.
+
+Usage:
+    python -m scripts.policy_whatif --candidate nova_politica.csv
+    python -m scripts.policy_whatif --candidate nova_politica.csv --band-width 50 --output whatif.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+MAX_SCORE = 1000
+COUNTERS = (
+    "requests",
+    "logged_approved",
+    "current_approved",
+    "candidate_approved",
+    "newly_approved",
+    "newly_rejected",
+    "current_exposure",
+    "candidate_exposure",
+)
+
+
+def load_scores(customers_path: str):
+    """Customer score by CPF, as a Series indexed by CPF"""
+    import pandas as pd
+    from utils.customer_store import read_customers
+
+    customers = read_customers(customers_path)[["cpf", "score"]]
+    customers = customers.drop_duplicates("cpf", keep="last")
+    return pd.Series(customers["score"].to_numpy(dtype="float64"), index=customers["cpf"])
+
+
+def replay(requests_path: str, scores, current, candidate, band_width: float, chunk_rows: int) -> dict:
+    """
+    Stream the request log and accumulate per-band counters for both policies
+
+    Exposure is the sum of (novo_limite_solicitado - limite_atual) over the
+    approved requests, i.e. the credit line the policy would have granted.
+    """
+    import numpy as np
+    import pandas as pd
+
+    n_bands = max(1, math.ceil(MAX_SCORE / band_width))
+    totals = {name: np.zeros(n_bands) for name in COUNTERS}
+    unknown_customers = 0
+
+    reader = pd.read_csv(
+        requests_path,
+        usecols=["cpf_cliente", "limite_atual", "novo_limite_solicitado", "status_pedido"],
+        dtype={"cpf_cliente": str, "status_pedido": str},
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        score = chunk["cpf_cliente"].map(scores).to_numpy(dtype=np.float64)
+        requested = chunk["novo_limite_solicitado"].to_numpy(dtype=np.float64)
+        increase = requested - chunk["limite_atual"].to_numpy(dtype=np.float64)
+
+        known = ~np.isnan(score)
+        unknown_customers += int((~known).sum())
+        score, requested, increase = score[known], requested[known], increase[known]
+        logged = (chunk["status_pedido"].to_numpy()[known] == "aprovado")
+
+        approved_now = current.approves_many(score, requested)
+        approved_then = candidate.approves_many(score, requested)
+        band = np.minimum((np.clip(score, 0, MAX_SCORE) // band_width).astype(np.int64), n_bands - 1)
+
+        for name, weights in (
+            ("requests", None),
+            ("logged_approved", logged),
+            ("current_approved", approved_now),
+            ("candidate_approved", approved_then),
+            ("newly_approved", approved_then & ~approved_now),
+            ("newly_rejected", approved_now & ~approved_then),
+            ("current_exposure", np.where(approved_now, increase, 0.0)),
+            ("candidate_exposure", np.where(approved_then, increase, 0.0)),
+        ):
+            totals[name] += np.bincount(band, weights=weights, minlength=n_bands)
+
+    bands = []
+    for i in range(n_bands):
+        low = i * band_width
+        high = MAX_SCORE if i == n_bands - 1 else (i + 1) * band_width
+        row = {"band": f"{low:g}-{high:g}", **{name: float(totals[name][i]) for name in COUNTERS}}
+        if row["requests"]:
+            bands.append(_summarize(row))
+
+    overall = _summarize({"band": "total", **{name: float(totals[name].sum()) for name in COUNTERS}})
+    return {"overall": overall, "bands": bands, "unknown_customers": unknown_customers}
+
+
+def _summarize(row: dict) -> dict:
+    requests = row["requests"] or 1
+    row["logged_rate"] = row["logged_approved"] / requests
+    row["current_rate"] = row["current_approved"] / requests
+    row["candidate_rate"] = row["candidate_approved"] / requests
+    row["rate_delta"] = row["candidate_rate"] - row["current_rate"]
+    row["exposure_delta"] = row["candidate_exposure"] - row["current_exposure"]
+    return row
+
+
+def print_report(report: dict) -> None:
+    header = (f"  {'band':<12}{'requests':>11}{'logged':>9}{'current':>9}{'candidate':>11}"
+              f"{'delta':>9}{'+appr':>9}{'-appr':>9}{'exposure delta':>17}")
+    print(header)
+    for row in report["bands"] + [report["overall"]]:
+        print(
+            f"  {row['band']:<12}{row['requests']:>11,.0f}{row['logged_rate']:>9.1%}"
+            f"{row['current_rate']:>9.1%}{row['candidate_rate']:>11.1%}{row['rate_delta']:>+9.1%}"
+            f"{row['newly_approved']:>9,.0f}{row['newly_rejected']:>9,.0f}{row['exposure_delta']:>+17,.2f}"
+        )
+
+
+def main() -> None:
+    from config import CUSTOMERS_FILE, SCORE_LIMIT_FILE, REQUESTS_FILE
+    from utils.credit_policy import CreditPolicy
+
+    parser = argparse.ArgumentParser(description="Replay the request log against a candidate credit policy")
+    parser.add_argument("--candidate", required=True, help="Candidate table with score_minimo,limite_maximo")
+    parser.add_argument("--current", default=SCORE_LIMIT_FILE, help="Policy to compare against")
+    parser.add_argument("--requests", default=REQUESTS_FILE)
+    parser.add_argument("--customers", default=CUSTOMERS_FILE)
+    parser.add_argument("--band-width", type=float, default=100, help="Score band width for the breakdown")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="Request rows per streamed chunk")
+    parser.add_argument("--output", default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    current = CreditPolicy.from_csv(args.current)
+    candidate = CreditPolicy.from_csv(args.candidate)
+    scores = load_scores(args.customers)
+    report = replay(args.requests, scores, current, candidate, args.band_width, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+
+    overall = report["overall"]
+    print(f"[WhatIf] Replayed {overall['requests']:,.0f} requests in {elapsed:.2f}s "
+          f"({report['unknown_customers']:,} from unknown customers skipped)")
+    print(f"[WhatIf] Approval rate {overall['current_rate']:.1%} -> {overall['candidate_rate']:.1%} "
+          f"({overall['rate_delta']:+.1%}), exposure {overall['current_exposure']:,.2f} -> "
+          f"{overall['candidate_exposure']:,.2f} ({overall['exposure_delta']:+,.2f})")
+    print_report(report)
+
+    if args.output:
+        report.update({
+            "current_policy": args.current,
+            "candidate_policy": args.candidate,
+            "elapsed_seconds": round(elapsed, 3),
+        })
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[WhatIf] Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Rescore the customer base from bulk interview or bureau answers
+
+Reads a CSV with `cpf` and the interview columns (renda_mensal,
+despesas_fixas, tipo_emprego, num_dependentes, tem_dividas), scores every
+row with the interview formula (utils/credit_scoring.py) and raises each
+matching customer's score in clientes.csv when the new score is higher; a
+score is never lowered. Empty cells count as unanswered fields.
+
+Usage:
+    python -m scripts.rescore_portfolio --input respostas.csv --dry-run
+    python -m scripts.rescore_portfolio --input respostas.csv --verify 10000
+    python -m scripts.rescore_portfolio --input respostas.csv --output data/clientes_rescored.csv
+"""
+
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _dependents(text: str):
+    """Parse one num_dependentes answer the way the interview does"""
+    try:
+        count = float(text.strip().replace(",", "."))
+    except ValueError:
+        return text.strip()
+    if count < 0:
+        return None
+    return "3+" if count >= 3 else int(count)
+
+
+def normalize_answers(frame):
+    """Bring CSV text to the values the interview stores ('Formal' -> 'formal', '4' -> '3+')"""
+    for field in ("tipo_emprego", "tem_dividas"):
+        if field in frame:
+            frame[field] = frame[field].str.strip().str.lower()
+    if "num_dependentes" in frame:
+        # Parse each distinct answer once
+        column = frame["num_dependentes"]
+        parsed = {value: _dependents(value) for value in column.dropna().unique()}
+        frame["num_dependentes"] = column.map(parsed).astype(object)
+    return frame
+
+
+def verify(frame, scores, sample: int, seed: int = 0) -> int:
+    """Compare a random sample of bulk scores with calculate_score; returns mismatches"""
+    import numpy as np
+    from utils.credit_scoring import calculate_score, row_answers
+
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(frame), size=min(sample, len(frame)), replace=False)
+    records = frame.iloc[rows].to_dict("records")
+    mismatches = 0
+    for i, record in zip(rows, records):
+        try:
+            expected = calculate_score(row_answers(record))
+        except ZeroDivisionError:
+            expected = float("nan")
+        if not (expected == scores[i] or (expected != expected and scores[i] != scores[i])):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"[Rescore] Mismatch at row {i}: bulk={scores[i]!r} single={expected!r} {record}")
+    return mismatches
+
+
+def main() -> None:
+    from config import CUSTOMERS_FILE
+
+    parser = argparse.ArgumentParser(description="Rescore customers from bulk interview answers")
+    parser.add_argument("--input", required=True, help="CSV with cpf and the interview columns")
+    parser.add_argument("--customers", default=CUSTOMERS_FILE)
+    parser.add_argument("--output", default=None, help="Where to write the updated customers (default: --customers)")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default BULK_SCORING_WORKERS)")
+    parser.add_argument("--verify", type=int, default=0, help="Check this many random rows against the single-row formula")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing")
+    args = parser.parse_args()
+
+    import numpy as np
+    import pandas as pd
+    from utils.credit_scoring import score_bulk, never_lower
+    from utils.customer_store import CUSTOMER_STORE, read_customers
+
+    start = time.perf_counter()
+    answers = normalize_answers(pd.read_csv(
+        args.input,
+        dtype={"cpf": str, "tipo_emprego": str, "tem_dividas": str, "num_dependentes": str},
+    ))
+    answers["cpf"] = answers["cpf"].str.replace(r"\D", "", regex=True)
+    # One answer set per customer: the last row wins
+    answers = answers.drop_duplicates("cpf", keep="last").reset_index(drop=True)
+    print(f"[Rescore] Loaded {len(answers):,} answer rows in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    scores = score_bulk(answers, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"[Rescore] Scored {len(answers):,} rows in {elapsed:.2f}s "
+          f"({len(answers) / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    if args.verify:
+        mismatches = verify(answers, scores, args.verify)
+        print(f"[Rescore] Verified {min(args.verify, len(answers)):,} rows, {mismatches} mismatches")
+        if mismatches:
+            sys.exit(1)
+
+    # The live table for clientes.csv: last snapshot plus the journaled changes
+    position = None
+    if os.path.abspath(args.customers) == os.path.abspath(CUSTOMER_STORE.snapshot_path):
+        # Changes journaled from here on are replayed over the result on write
+        customers, position = CUSTOMER_STORE.get_with_position()
+        customers = customers.copy()
+    else:
+        customers = read_customers(args.customers).copy()
+    new_scores = pd.Series(scores, index=answers["cpf"])
+    matched = customers["cpf"].map(new_scores)
+    current = customers["score"].to_numpy(dtype=np.float64)
+    updated = never_lower(current, matched.to_numpy(dtype=np.float64))
+
+    raised = int((updated > current).sum())
+    print(f"[Rescore] Customers: {len(customers):,}, with answers: {int(matched.notna().sum()):,}, "
+          f"raised: {raised:,}, unscorable rows (despesas_fixas = -1): {int(np.isnan(scores).sum()):,}, "
+          f"unknown cpfs: {int((~answers['cpf'].isin(customers['cpf'])).sum()):,}")
+
+    if args.dry_run:
+        print("[Rescore] Dry run, nothing written")
+        return
+    customers["score"] = updated
+    output = args.output or args.customers
+    if os.path.abspath(output) == os.path.abspath(CUSTOMER_STORE.snapshot_path):
+        # A new snapshot, so the journal up to `position` is not replayed over the new scores
+        CUSTOMER_STORE.snapshot(customers, since=position or CUSTOMER_STORE.get_with_position()[1])
+    else:
+        customers.to_csv(output, index=False)
+    print(f"[Rescore] Written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Local stand-in for a Redis server (RESP2, in-memory, single database)
+
+Implements the subset of commands used by the session store and shared
+limiters: PING, SELECT, GET, SET (EX/PX/NX), DEL, EXISTS, INCR, INCRBY,
+EXPIRE, PEXPIRE, PTTL, TTL, HSET, HGETALL, HMGET, HDEL, KEYS, SCAN, ZADD (XX),
+ZREM, ZCARD, ZSCORE, ZRANGEBYSCORE, ZREVRANGEBYSCORE (LIMIT).
+
+Usage:
+    python -m scripts.resp_server --port 6380
+    SESSION_STORE_BACKEND=redis SESSION_STORE_URL=redis://127.0.0.1:6380/0 streamlit run app.py
+"""
+
+import time
+import argparse
+import threading
+import socketserver
+from fnmatch import fnmatchcase
+
+
+class RespStore:
+    """Keyspace with lazy expiry"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: dict = {}
+        self.expires: dict = {}
+
+    def _alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def execute(self, cmd: str, args: list):
+        handler = getattr(self, f"cmd_{cmd.lower()}", None)
+        if handler is None:
+            return Exception(f"ERR unknown command '{cmd}'")
+        with self.lock:
+            try:
+                return handler(*args)
+            except TypeError:
+                return Exception(f"ERR wrong number of arguments for '{cmd}'")
+            except ValueError as e:
+                return Exception(f"ERR {e}")
+
+    def cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_select(self, db):
+        return "OK"
+
+    def cmd_get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def cmd_set(self, key, value, *options):
+        opts = [o.upper() for o in options]
+        if b"NX" in opts and self._alive(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for i, opt in enumerate(opts):
+            if opt == b"EX":
+                self.expires[key] = time.monotonic() + int(options[i + 1])
+            elif opt == b"PX":
+                self.expires[key] = time.monotonic() + int(options[i + 1]) / 1000
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_incrby(self, key, amount):
+        value = int(self.data[key]) if self._alive(key) else 0
+        value += int(amount)
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_pexpire(self, key, ms):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(ms) / 1000
+        return 1
+
+    def cmd_expire(self, key, seconds):
+        return self.cmd_pexpire(key, int(seconds) * 1000)
+
+    def cmd_pttl(self, key):
+        if not self._alive(key):
+            return -2
+        deadline = self.expires.get(key)
+        return -1 if deadline is None else int((deadline - time.monotonic()) * 1000)
+
+    def cmd_ttl(self, key):
+        ttl = self.cmd_pttl(key)
+        return ttl if ttl < 0 else ttl // 1000
+
+    def cmd_hset(self, key, *pairs):
+        if len(pairs) % 2:
+            raise ValueError("wrong number of arguments for 'hset'")
+        mapping = self.data[key] if self._alive(key) else {}
+        added = sum(1 for field in pairs[::2] if field not in mapping)
+        mapping.update(zip(pairs[::2], pairs[1::2]))
+        self.data[key] = mapping
+        return added
+
+    def cmd_hgetall(self, key):
+        if not self._alive(key):
+            return []
+        out = []
+        for field, value in self.data[key].items():
+            out.extend((field, value))
+        return out
+
+    def cmd_hdel(self, key, *fields):
+        if not self._alive(key):
+            return 0
+        mapping = self.data[key]
+        return sum(1 for field in fields if mapping.pop(field, None) is not None)
+
+    def cmd_hmget(self, key, *fields):
+        mapping = self.data[key] if self._alive(key) else {}
+        return [mapping.get(field) for field in fields]
+
+    def cmd_keys(self, pattern):
+        pattern = pattern.decode()
+        return [key for key in list(self.data) if self._alive(key) and fnmatchcase(key.decode(), pattern)]
+
+    def cmd_scan(self, cursor, *options):
+        opts = [o.upper() if i % 2 == 0 else o for i, o in enumerate(options)]
+        pattern = opts[opts.index(b"MATCH") + 1].decode() if b"MATCH" in opts else "*"
+        count = int(opts[opts.index(b"COUNT") + 1]) if b"COUNT" in opts else 10
+        keys = sorted(self.data)
+        start = int(cursor)
+        page = keys[start:start + count]
+        next_cursor = start + count if start + count < len(keys) else 0
+        matched = [key for key in page if self._alive(key) and fnmatchcase(key.decode(), pattern)]
+        return [str(next_cursor).encode(), matched]
+
+    def _zset(self, key) -> dict:
+        return self.data[key] if self._alive(key) else {}
+
+    def cmd_zadd(self, key, *args):
+        only_existing = bool(args) and args[0].upper() == b"XX"
+        pairs = args[1:] if only_existing else args
+        if not pairs or len(pairs) % 2:
+            raise ValueError("wrong number of arguments for 'zadd'")
+        zset = self._zset(key)
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            if only_existing and member not in zset:
+                continue
+            added += member not in zset
+            zset[member] = float(score)
+        if zset:
+            self.data[key] = zset
+        return added
+
+    def cmd_zrem(self, key, *members):
+        zset = self._zset(key)
+        removed = sum(1 for member in members if zset.pop(member, None) is not None)
+        if not zset:
+            self.data.pop(key, None)
+        return removed
+
+    def cmd_zcard(self, key):
+        return len(self._zset(key))
+
+    def cmd_zscore(self, key, member):
+        score = self._zset(key).get(member)
+        return None if score is None else repr(score).encode()
+
+    def cmd_zrangebyscore(self, key, low, high, *options):
+        return self._range_by_score(key, low, high, options, reverse=False)
+
+    def cmd_zrevrangebyscore(self, key, high, low, *options):
+        return self._range_by_score(key, low, high, options, reverse=True)
+
+    def _range_by_score(self, key, low, high, options, reverse: bool):
+        def bound(value: bytes):
+            text = value.decode()
+            exclusive = text.startswith("(")
+            return float(text.lstrip("(")), exclusive
+
+        (lo, lo_open), (hi, hi_open) = bound(low), bound(high)
+        members = sorted(self._zset(key).items(), key=lambda item: (item[1], item[0]), reverse=reverse)
+        matched = [
+            member
+            for member, score in members
+            if (score > lo if lo_open else score >= lo) and (score < hi if hi_open else score <= hi)
+        ]
+        if options and options[0].upper() == b"LIMIT":
+            offset, count = int(options[1]), int(options[2])
+            matched = matched[offset:] if count < 0 else matched[offset:offset + count]
+        return matched
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, Exception):
+        return f"-{value}\r\n".encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return f"${len(value)}\r\n".encode() + value + b"\r\n"
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(_encode(v) for v in value)
+    return _encode(str(value).encode())
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """Reads RESP arrays of bulk strings and writes replies"""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b"*"):
+                args = line.split()
+            else:
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2])
+            if not args:
+                continue
+            reply = self.server.store.execute(args[0].decode(), args[1:])
+            self.wfile.write(_encode(reply))
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, RespHandler)
+        self.store = RespStore()
+
+
+def start_resp_server(host: str = "127.0.0.1", port: int = 0) -> tuple[RespServer, str]:
+    """Start the stand-in in a daemon thread and return (server, url)"""
+    server = RespServer((host, port))
+    threading.Thread(target=server.serve_forever, name="resp-server", daemon=True).start()
+    return server, f"redis://{host}:{server.server_address[1]}/0"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Redis-protocol stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server = RespServer((args.host, args.port))
+    print(f"[RespServer] Serving on redis://{args.host}:{args.port}/0")
+    server.serve_forever()
@@ -0,0 +1,114 @@
+"""
+Local stub HTTP server standing in for the Frankfurter API
+
+Usage:
+    python -m scripts.stub_frankfurter --port 8765
+    FRANKFURTER_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+
+import json
+import math
+import argparse
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Units of each currency per 1 BRL
+STUB_RATES = {
+    "USD": 0.1852,
+    "EUR": 0.1712,
+    "GBP": 0.1461,
+    "JPY": 27.94,
+    "ARS": 169.3,
+    "BRL": 1.0,
+}
+
+
+def _rates_for(base: str, symbols: list[str] | None) -> dict:
+    """Rates of every stub currency against base"""
+    base_per_brl = STUB_RATES[base]
+    return {
+        code: round(per_brl / base_per_brl, 6)
+        for code, per_brl in STUB_RATES.items()
+        if code != base and (not symbols or code in symbols)
+    }
+
+
+def _rates_on(day: date, base: str, symbols: list[str] | None) -> dict:
+    """Deterministic daily wiggle around the stub rates"""
+    factor = 1 + 0.02 * math.sin(day.toordinal() / 5)
+    return {code: round(rate * factor, 6) for code, rate in _rates_for(base, symbols).items()}
+
+
+class StubFrankfurterHandler(BaseHTTPRequestHandler):
+    """Serves /latest and /<start>..<end> with Frankfurter's JSON shape over keep-alive HTTP/1.1"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        base = query.get("from", ["EUR"])[0].upper()
+        symbols = query["to"][0].upper().split(",") if "to" in query else None
+
+        if base not in STUB_RATES:
+            return self._send(404, {"message": "not found"})
+
+        if ".." in parsed.path:
+            start_raw, end_raw = parsed.path.strip("/").split("..", 1)
+            start = date.fromisoformat(start_raw)
+            end = date.fromisoformat(end_raw) if end_raw else date.today()
+            days = (end - start).days + 1
+            rates = {
+                day.isoformat(): _rates_on(day, base, symbols)
+                for day in (start + timedelta(days=i) for i in range(days))
+                if day.weekday() < 5
+            }
+            return self._send(200, {
+                "amount": 1.0,
+                "base": base,
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+                "rates": rates,
+            })
+
+        if parsed.path != "/latest":
+            return self._send(404, {"message": "not found"})
+
+        self._send(200, {
+            "amount": 1.0,
+            "base": base,
+            "date": date.today().isoformat(),
+            "rates": _rates_for(base, symbols),
+        })
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread and return (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), StubFrankfurterHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-frankfurter", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Frankfurter API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StubFrankfurterHandler)
+    print(f"[StubFrankfurter] Serving on http://{args.host}:{args.port}")
+    server.serve_forever()
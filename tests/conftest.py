@@ -0,0 +1,62 @@
+"""
+Shared fixtures: the stub Frankfurter server, the Redis-protocol stand-in, a
+fresh HTTP pool and a scratch copy of data/ per test
+"""
+
+import os
+import sys
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scripts.resp_server import start_resp_server
+from scripts.stub_frankfurter import start_stub_server
+from utils import http_client
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    """Base URL of a stub Frankfurter server running for the module's tests"""
+    server, url = start_stub_server()
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def resp_url():
+    """URL of an empty Redis-protocol stand-in (scripts/resp_server.py) for one test"""
+    server, url = start_resp_server()
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A new shared session and new pool counters, so counts start at zero"""
+    monkeypatch.setattr(http_client, "_session", None)
+    monkeypatch.setattr(http_client, "SYNC_STATS", http_client.PoolStats(http_client.HTTP_POOL_MAXSIZE))
+    monkeypatch.setattr(http_client, "ASYNC_STATS", http_client.PoolStats(http_client.HTTP_POOL_MAXSIZE))
+    yield http_client
+    if http_client._session is not None:
+        http_client._session.close()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Run the test from a directory holding a copy of the repo's CSVs
+
+    DATA_DIR is relative, so everything that reads or writes data/ (customer
+    store, journal, requests file) works on the copy and the repo is left alone.
+    """
+    data = tmp_path / "data"
+    data.mkdir()
+    for name in ("clientes.csv", "score_limite.csv", "solicitacoes_aumento_limite.csv", "faq.json"):
+        shutil.copy(os.path.join(ROOT, "data", name), data / name)
+    monkeypatch.chdir(tmp_path)
+    yield data
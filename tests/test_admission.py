@@ -0,0 +1,146 @@
+"""
+Admission control: token buckets on each backend, bulkheads, and routed
+hops running inside the target agent's bulkhead
+"""
+
+import threading
+
+import pytest
+
+from utils import admission, rate_limit
+from utils.admission import Bulkhead, BulkheadFull
+from utils.rate_limit import InMemoryRateLimitStore, RedisRateLimitStore, SQLiteRateLimitStore
+from utils.session_manager import SessionManager
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def open_limits(request, tmp_path):
+    """Opens the bucket store as another worker would (see tests/test_session_store.py)"""
+    if request.param == "memory":
+        store = InMemoryRateLimitStore()
+        yield lambda: store
+    elif request.param == "sqlite":
+        path = str(tmp_path / "sessions.sqlite")
+        yield lambda: SQLiteRateLimitStore(path)
+    else:
+        url = request.getfixturevalue("resp_url")
+        yield lambda: RedisRateLimitStore(url)
+
+
+def test_bucket_admits_capacity_then_throttles_across_workers(open_limits):
+    first, second = open_limits(), open_limits()
+    waits = [store.take("session:s1", 4, 0.01) for store in (first, second, first, second)]
+    assert waits == [0.0] * 4
+    assert second.take("session:s1", 4, 0.01) > 0
+    assert first.take("session:s2", 4, 0.01) == 0.0
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    now = [1_800_000_000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    store = InMemoryRateLimitStore()
+    for _ in range(2):
+        assert store.take("auth:1", 2, 0.5) == 0.0
+    assert store.take("auth:1", 2, 0.5) == pytest.approx(2.0)
+    now[0] += 2.0
+    assert store.take("auth:1", 2, 0.5) == 0.0
+
+
+def test_dropped_connection_does_not_charge_an_admission_twice(resp_url):
+    store = RedisRateLimitStore(resp_url)
+    store.take("session:s1", 10, 1)
+    read = store.client._read
+    dropped = []
+
+    def drop_after_increment():
+        reply = read()
+        if not dropped and isinstance(reply, int):
+            # The server applied the INCRBY, then the connection dropped
+            dropped.append(reply)
+            raise ConnectionError("connection reset")
+        return reply
+
+    store.client._read = drop_after_increment
+    with pytest.raises(ConnectionError):
+        store.take("session:s1", 10, 1)
+    store.client._read = read
+
+    [key] = [k for k in store.client.execute("KEYS", f"{store.KEY_PREFIX}session:s1:*")]
+    assert int(store.client.execute("GET", key)) == 2
+
+
+def test_store_errors_fail_open(monkeypatch):
+    class Broken:
+        def take(self, *args, **kwargs):
+            raise ConnectionError("down")
+
+    monkeypatch.setattr(admission, "get_rate_limit_store", lambda: Broken())
+    monkeypatch.setattr(admission, "RATE_LIMIT_ENABLED", True)
+    assert admission.admit(SessionManager()) is None
+
+
+def test_bulkhead_caps_concurrency_and_counts_rejections():
+    bulkhead = Bulkhead("agent.test", limit=2, queue_timeout=0.05)
+    with bulkhead, bulkhead:
+        assert bulkhead.stats()["active"] == 2
+        with pytest.raises(BulkheadFull):
+            with bulkhead:
+                pass
+    with bulkhead:
+        pass
+    stats = bulkhead.stats()
+    assert (stats["active"], stats["admitted"], stats["rejected"]) == (0, 3, 1)
+
+
+def test_bulkhead_queues_until_a_slot_frees():
+    bulkhead = Bulkhead("agent.test", limit=1, queue_timeout=2)
+    release = threading.Event()
+
+    def hold():
+        with bulkhead:
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    threading.Timer(0.05, release.set).start()
+    with bulkhead:
+        assert bulkhead.stats()["active"] == 1
+    holder.join()
+
+
+class _Agent:
+    def __init__(self, name, on_process=None):
+        self.name = name
+        self.on_process = on_process
+
+    def process(self, message, session_manager):
+        return self.on_process(message, session_manager) if self.on_process else f"{self.name} handled it"
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    from agents.orchestrator import AgentOrchestrator
+
+    monkeypatch.setattr(admission, "_bulkheads", {})
+    orchestrator = AgentOrchestrator()
+    orchestrator.triage_agent = _Agent("triagem", lambda message, session: orchestrator.hand_off("credito", message, session))
+    return orchestrator
+
+
+def test_routed_hop_runs_inside_the_target_bulkhead(orchestrator):
+    seen = []
+    orchestrator.credit_agent = _Agent("credito", lambda *_: seen.append(admission.get_bulkhead("agent.credito").active) or "ok")
+    session = SessionManager()
+
+    assert orchestrator._route("quero ver meu limite", session) == "ok"
+    assert seen == [1]
+    assert session.current_agent == "credito"
+    assert admission.get_bulkhead("agent.credito").stats()["admitted"] == 1
+
+
+def test_routed_hop_is_refused_when_the_target_bulkhead_is_full(orchestrator):
+    orchestrator.credit_agent = _Agent("credito")
+    admission._bulkheads["agent.credito"] = full = Bulkhead("agent.credito", limit=1, queue_timeout=0.01)
+    with full:
+        answer = orchestrator._route("quero ver meu limite", SessionManager())
+    assert answer == admission.MESSAGES["bulkhead"]
@@ -0,0 +1,67 @@
+"""
+Bulk scoring parity: score_frame() and score_bulk() must return exactly what
+calculate_score() returns for each row, rounding included
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+
+from utils.credit_scoring import calculate_score, row_answers, score_bulk, score_frame
+
+ROWS = 100_000
+
+
+def _fuzzed_frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+
+    def money():
+        kind = rng.random()
+        if kind < 0.3:
+            return float(rng.randint(0, 30000))
+        if kind < 0.6:
+            return round(rng.uniform(0, 30000), 2)
+        if kind < 0.7:
+            # Values whose score sits on a rounding boundary, e.g. x.xx5
+            return rng.randint(0, 3000) / 200 + rng.choice((0.0, 0.005, 0.0005))
+        if kind < 0.8:
+            return rng.uniform(0, 1e6)
+        return float(rng.randint(0, 100))
+
+    def maybe(value):
+        return None if rng.random() < 0.03 else value
+
+    return pd.DataFrame({
+        "renda_mensal": [maybe(money()) for _ in range(rows)],
+        "despesas_fixas": [maybe(-1.0 if rng.random() < 0.01 else money()) for _ in range(rows)],
+        "tipo_emprego": [maybe(rng.choice(("formal", "autônomo", "desempregado", "outro"))) for _ in range(rows)],
+        "num_dependentes": [maybe(rng.choice((0, 1, 2, "3+", 1.0, 5, True))) for _ in range(rows)],
+        "tem_dividas": [maybe(rng.choice(("sim", "não", "talvez"))) for _ in range(rows)],
+    })
+
+
+def _scalar_scores(frame: pd.DataFrame) -> np.ndarray:
+    scores = []
+    for row in frame.to_dict("records"):
+        try:
+            scores.append(calculate_score(row_answers(row)))
+        except ZeroDivisionError:
+            scores.append(np.nan)
+    return np.array(scores, dtype=np.float64)
+
+
+def test_bulk_scores_match_the_scalar_scorer_exactly():
+    frame = _fuzzed_frame(ROWS, seed=42)
+    expected = _scalar_scores(frame)
+    bulk = score_frame(frame)
+
+    mismatched = np.flatnonzero(~((bulk == expected) | (np.isnan(bulk) & np.isnan(expected))))
+    assert mismatched.size == 0, frame.iloc[mismatched[:5]].assign(bulk=bulk[mismatched[:5]], scalar=expected[mismatched[:5]])
+
+
+def test_chunked_process_pool_matches_the_single_pass():
+    frame = _fuzzed_frame(5_000, seed=7)
+    single = score_frame(frame)
+    chunked = score_bulk(frame, workers=2, chunk_rows=1_000)
+    np.testing.assert_array_equal(chunked, single)
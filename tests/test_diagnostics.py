@@ -0,0 +1,44 @@
+"""
+CPU sampler: waiting threads are left out by module, so the app's own
+get()/wait() methods still show up
+"""
+
+import queue
+import threading
+
+from utils.diagnostics import sample_cpu
+
+
+class _Store:
+    def get(self, stop: list) -> None:
+        # Busy like a cache or store lookup, and named like a blocking call
+        while not stop:
+            sum(range(1000))
+
+
+def _top(summary):
+    return [row["function"] for row in summary["top_functions"]]
+
+
+def test_idle_threads_are_skipped_but_app_get_is_kept():
+    stop = []
+    blocked = queue.Queue()
+    threads = [
+        threading.Thread(target=_Store().get, args=(stop,), name="busy-get"),
+        threading.Thread(target=blocked.get, name="blocked-get"),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        _, summary = sample_cpu(0.3, interval=0.005)
+        _, with_idle = sample_cpu(0.3, interval=0.005, include_idle=True)
+    finally:
+        stop.append(True)
+        blocked.put(None)
+        for thread in threads:
+            thread.join()
+
+    top = _top(summary)
+    assert any(fn.startswith("get (tests/test_diagnostics.py") for fn in top)
+    assert not any("threading.py" in fn or "queue.py" in fn for fn in top)
+    assert any("threading.py" in fn for fn in _top(with_idle))
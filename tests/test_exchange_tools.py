@@ -0,0 +1,228 @@
+"""
+Exchange tools against the stub Frankfurter server: snapshots, the offline
+fallback to the local history, and history backfill
+"""
+
+import json
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from scripts.stub_frankfurter import STUB_RATES
+from tools import exchange_tools
+from utils import ttl_cache
+from utils.rate_history import RateHistoryStore
+from utils.ttl_cache import TTLCache
+
+# Nothing listens on port 9 (discard) on a test machine: connections are refused at once
+DEAD_URL = "http://127.0.0.1:9"
+
+
+@pytest.fixture
+def exchange(stub_url, pool, tmp_path, monkeypatch):
+    """exchange_tools pointed at the stub, with an empty cache and history and no backfill memory"""
+    monkeypatch.setattr(exchange_tools, "FRANKFURTER_BASE_URL", stub_url)
+    monkeypatch.setattr(exchange_tools, "RATE_HISTORY", RateHistoryStore(str(tmp_path / "rates")))
+    monkeypatch.setattr(exchange_tools, "_backfilled_ranges", set())
+    _fresh_cache(monkeypatch)
+    yield exchange_tools
+
+
+def _fresh_cache(monkeypatch, error_ttl_seconds: float = 0.0) -> list:
+    """Replace RATE_CACHE with an empty one; returns the list of keys its loader was called with"""
+    calls = []
+
+    def load(base):
+        calls.append(base)
+        return exchange_tools._fetch_snapshot(base)
+
+    monkeypatch.setattr(exchange_tools, "RATE_CACHE", TTLCache(
+        load, ttl_seconds=60, max_stale_seconds=60, name="TestRateCache", error_ttl_seconds=error_ttl_seconds,
+    ))
+    return calls
+
+
+def test_fetch_snapshot_prices_every_currency_in_brl(exchange):
+    snapshot = exchange._fetch_snapshot("BRL")
+
+    assert snapshot.offline is False
+    assert snapshot.date == date.today().isoformat()
+    for code in exchange.SUPPORTED_CURRENCIES:
+        assert snapshot.rate(code, "BRL") == pytest.approx(1 / STUB_RATES[code])
+    assert snapshot.rate("USD", "EUR") == pytest.approx(STUB_RATES["EUR"] / STUB_RATES["USD"])
+    # Every snapshot also feeds the local history
+    day, rates = exchange.RATE_HISTORY.latest()
+    assert day == date.today()
+    assert rates == pytest.approx({code: 1 / STUB_RATES[code] for code in exchange.SUPPORTED_CURRENCIES})
+
+
+def test_get_rate_snapshot_shares_one_request(exchange, pool):
+    first = exchange.get_rate_snapshot()
+    second = exchange.get_rate_snapshot()
+
+    assert second is first
+    assert exchange.get_rate_cache_stats()["misses"] == 1
+    assert pool.SYNC_STATS.summary()["requests"] == 1
+
+
+def test_tools_answer_from_the_stub(exchange):
+    assert exchange.get_exchange_rate.invoke({"currency_code": "dólar"}) == f"{1 / STUB_RATES['USD']:.4f}"
+    converted = json.loads(exchange.convert_currency.invoke({"amount": 100, "from_currency": "EUR", "to_currency": "BRL"}))
+    assert converted["converted"] == pytest.approx(100 / STUB_RATES["EUR"], abs=0.01)
+
+
+def test_offline_fallback_serves_the_stored_rates(exchange, monkeypatch):
+    online = exchange.get_rate_snapshot()
+    monkeypatch.setattr(exchange, "FRANKFURTER_BASE_URL", DEAD_URL)
+    _fresh_cache(monkeypatch)
+
+    offline = exchange.get_rate_snapshot()
+
+    assert offline.offline is True
+    assert offline.date == online.date
+    assert offline.rate("USD", "BRL") == pytest.approx(online.rate("USD", "BRL"))
+    assert exchange.get_exchange_rate.invoke({"currency_code": "USD"}) == f"{online.rate('USD', 'BRL'):.4f}"
+
+
+def test_offline_without_history_reports_the_outage(exchange, monkeypatch):
+    from requests.exceptions import RequestException
+
+    monkeypatch.setattr(exchange, "FRANKFURTER_BASE_URL", DEAD_URL)
+    with pytest.raises(RequestException):
+        exchange.get_rate_snapshot()
+    answer = exchange.get_exchange_rate.invoke({"currency_code": "USD"})
+    assert answer.startswith("Não foi possível consultar a cotação")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_failures_are_cached_on_a_cold_start(exchange, stub_url, monkeypatch, clock):
+    from requests.exceptions import RequestException
+
+    monkeypatch.setattr(exchange, "FRANKFURTER_BASE_URL", DEAD_URL)
+    calls = _fresh_cache(monkeypatch, error_ttl_seconds=30)
+
+    for _ in range(3):
+        with pytest.raises(RequestException):
+            exchange.get_rate_snapshot()
+    assert len(calls) == 1
+    assert exchange.get_rate_cache_stats()["negative_hits"] == 2
+
+    clock[0] += 31
+    monkeypatch.setattr(exchange, "FRANKFURTER_BASE_URL", stub_url)
+    assert exchange.get_rate_snapshot().offline is False
+    assert len(calls) == 2
+    assert exchange.get_rate_cache_stats()["cached_errors"] == 0
+
+
+def test_cached_failure_falls_back_to_history_without_calling_the_api(exchange, monkeypatch, clock):
+    exchange.get_rate_snapshot()
+    monkeypatch.setattr(exchange, "FRANKFURTER_BASE_URL", DEAD_URL)
+    calls = _fresh_cache(monkeypatch, error_ttl_seconds=30)
+
+    assert exchange.get_rate_snapshot().offline is True
+    assert exchange.get_rate_snapshot().offline is True
+    assert len(calls) == 1
+
+
+def test_stale_entries_are_served_without_retrying_a_failed_refresh(clock):
+    outcomes = ["v1", ValueError("down"), "v2"]
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    cache = TTLCache(load, ttl_seconds=10, max_stale_seconds=100, name="Test", error_ttl_seconds=30)
+    assert cache.get("BRL") == "v1"
+
+    clock[0] += 11
+    assert cache.get("BRL") == "v1"  # stale hit, the refresh fails in the background
+    _wait_for(lambda: cache.stats()["load_errors"] == 1 and not cache._inflight)
+    assert cache.get("BRL") == "v1"
+    assert len(loads) == 2
+
+    clock[0] += 31
+    assert cache.get("BRL") == "v1"  # error expired: refreshed again
+    _wait_for(lambda: cache.stats()["loads"] == 3 and not cache._inflight)
+    assert cache.get("BRL") == "v2"
+
+
+def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+
+def test_history_tool_backfills_from_the_stub(exchange):
+    stats = json.loads(exchange.get_exchange_rate_history.invoke({"currency_code": "euro", "days": 30}))
+
+    assert stats["currency"] == "EUR"
+    assert stats["count"] >= 20
+    assert stats["min"] <= stats["avg"] <= stats["max"]
+
+
+def _business_days(start: date, end: date):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1) if (start + timedelta(days=i)).weekday() < 5]
+
+
+def _largest_gap(points):
+    days = [day for day, _ in points]
+    return max((b - a for a, b in zip(days, days[1:])), default=timedelta(0))
+
+
+def test_ensure_history_backfills_a_gap_in_the_middle(exchange, monkeypatch):
+    fetched = []
+    fetch_history = exchange._fetch_history
+    monkeypatch.setattr(exchange, "_fetch_history", lambda a, b: fetched.append((a, b)) or fetch_history(a, b))
+    end = date(2026, 6, 30)
+    start = end - timedelta(days=60)
+    middle_start, middle_end = start + timedelta(days=20), start + timedelta(days=40)
+    exchange.RATE_HISTORY.record_many("USD", [(d, 5.0) for d in _business_days(start, end) if not middle_start <= d <= middle_end])
+
+    exchange.ensure_history("USD", start, end)
+
+    points = exchange.RATE_HISTORY.range("USD", start, end)
+    assert _largest_gap(points) <= timedelta(days=3)
+    # Only the gap is requested, not the whole range
+    [(fetch_start, fetch_end)] = fetched
+    assert middle_start - timedelta(days=3) <= fetch_start <= middle_start
+    assert middle_end <= fetch_end <= middle_end + timedelta(days=3)
+
+
+def test_ensure_history_backfills_a_missing_tail(exchange):
+    end = date(2026, 6, 30)
+    start = end - timedelta(days=30)
+    exchange.RATE_HISTORY.record_many("USD", [(d, 5.0) for d in _business_days(start, start + timedelta(days=10))])
+
+    exchange.ensure_history("USD", start, end)
+
+    points = exchange.RATE_HISTORY.range("USD", start, end)
+    assert points[-1][0] == date(2026, 6, 30)
+    assert _largest_gap(points) <= timedelta(days=3)
+
+
+def test_ensure_history_skips_a_covered_range(exchange, monkeypatch):
+    end = date(2026, 6, 30)
+    start = end - timedelta(days=30)
+    exchange.RATE_HISTORY.record_many("USD", [(d, 5.0) for d in _business_days(start, end)])
+    monkeypatch.setattr(exchange, "_fetch_history", lambda *_: pytest.fail("covered range was fetched"))
+
+    exchange.ensure_history("USD", start, end)
+
+
+def test_missing_span_tolerates_holidays():
+    # Good Friday and Easter Monday 2026: Thursday 2 April to Tuesday 7 April
+    points = [(date(2026, 4, 2), 5.0), (date(2026, 4, 7), 5.0)]
+    assert exchange_tools._missing_span(points, date(2026, 4, 2), date(2026, 4, 7)) is None
+    assert exchange_tools._missing_span(points, date(2026, 3, 20), date(2026, 4, 7)) == (date(2026, 3, 20), date(2026, 4, 1))
@@ -0,0 +1,128 @@
+"""
+FAQ layer (utils/faq_cache.py) and where the orchestrator consults it
+"""
+
+import json
+import os
+
+import pytest
+
+from utils import faq_cache
+from utils.faq_cache import FAQCache
+from utils.session_manager import SessionManager
+
+FAQ_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "faq.json")
+
+REQUESTS = [
+    "quero pedir aumento de limite",
+    "pedir aumento de limite",
+    "quero atualizar meu score",
+    "preciso aumentar meu limite",
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FAQCache(FAQ_FILE, str(tmp_path / "learned.jsonl"), str(tmp_path / "pending.jsonl"), max_entries=3, threshold=0.6)
+
+
+@pytest.mark.parametrize("message", REQUESTS)
+def test_requests_are_not_answered_from_the_faq(cache, message):
+    assert cache.lookup(message) is None
+
+
+@pytest.mark.parametrize("message", ["Como pedir aumento de limite?", "o que é score", "Quais serviços vocês oferecem"])
+def test_questions_are_answered_from_the_faq(cache, message):
+    assert cache.lookup(message) is not None
+
+
+def test_transactional_questions_skip_the_faq(cache):
+    assert cache.lookup("Como pedir aumento de limite para 5000?") is None
+    assert cache.stats()["skipped"] == 1
+
+
+def test_proposals_are_bounded_and_deduplicated(cache):
+    assert cache.propose("Vocês têm cartão de crédito?", "Sim, temos.")
+    assert not cache.propose("voces tem cartao de credito?", "Sim.")
+    assert not cache.propose("quero um cartão", "Certo.")
+    assert cache.propose("Vocês abrem aos sábados?", "Não.")
+    assert cache.propose("Onde fica a agência?", "Somos um banco digital.")
+    assert not cache.propose("Quem é o gerente?", "Não há gerente.")
+    assert len(cache.pending()) == 3
+
+
+def test_learned_file_is_compacted_to_the_kept_entries(cache):
+    for i in range(7):
+        cache.learn(f"Pergunta aprendida {'abcdefg'[i]}?", f"Resposta {'abcdefg'[i]}")
+
+    with open(cache.learned_file, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) <= 2 * cache.max_entries
+    assert cache.stats()["learned_entries"] == 3
+    assert lines[-1]["question"] == "Pergunta aprendida g?"
+
+
+class _Agent:
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    def process(self, message, session_manager):
+        self.calls.append(message)
+        return f"{self.name} handled it"
+
+
+@pytest.fixture
+def orchestrator(monkeypatch, cache):
+    from agents.orchestrator import AgentOrchestrator
+
+    monkeypatch.setattr(faq_cache, "FAQ_CACHE", cache)
+    orchestrator = AgentOrchestrator()
+    orchestrator.triage_agent = _Agent("triagem")
+    orchestrator.credit_agent = _Agent("credito")
+    orchestrator.interview_agent = _Agent("entrevista")
+    return orchestrator
+
+
+def _session(agent: str, authenticated: bool) -> SessionManager:
+    session = SessionManager()
+    session.current_agent = agent
+    session.authenticated = authenticated
+    return session
+
+
+@pytest.mark.parametrize("message", REQUESTS + ["Como pedir aumento de limite?"])
+def test_authenticated_customers_always_reach_the_agent(orchestrator, message):
+    assert orchestrator._route(message, _session("credito", True)) == "credito handled it"
+    assert orchestrator.credit_agent.calls == [message]
+
+
+def test_authenticated_triage_skips_the_faq(orchestrator):
+    assert orchestrator._route("Quais serviços vocês oferecem?", _session("triagem", True)) == "triagem handled it"
+
+
+def test_questions_before_login_are_answered_from_the_faq(orchestrator):
+    answer = orchestrator._route("Como pedir aumento de limite?", _session("triagem", False))
+
+    assert "Depois de se autenticar" in answer
+    assert orchestrator.triage_agent.calls == []
+
+
+def test_requests_before_login_reach_triage(orchestrator):
+    assert orchestrator._route("quero pedir aumento de limite", _session("triagem", False)) == "triagem handled it"
+
+
+def test_direct_triage_answers_before_login_are_proposed(monkeypatch, cache):
+    from types import SimpleNamespace
+    from agents import triage_agent
+    from agents.orchestrator import AgentOrchestrator
+
+    monkeypatch.setattr(faq_cache, "FAQ_CACHE", cache)
+    reply = SimpleNamespace(content="Atendemos o dia todo, todos os dias.", additional_kwargs={})
+    monkeypatch.setattr(triage_agent, "invoke_llm", lambda *args, **kwargs: reply)
+
+    orchestrator = AgentOrchestrator()
+    answer = orchestrator.triage_agent.process("Vocês atendem de madrugada?", _session("triagem", False))
+
+    assert answer == reply.content
+    assert cache.pending() == [{"question": "Vocês atendem de madrugada?", "answer": reply.content}]
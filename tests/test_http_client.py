@@ -0,0 +1,155 @@
+"""
+Pooled HTTP clients (utils/http_client.py) against the stub Frankfurter server
+"""
+
+import gc
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scripts.stub_frankfurter import StubFrankfurterHandler
+
+
+class FlakyHandler(StubFrankfurterHandler):
+    """Answers the first `failures` requests with `status`, then like the stub"""
+
+    failures = 0
+    status = 503
+    seen = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with FlakyHandler.lock:
+            FlakyHandler.seen += 1
+            fail = FlakyHandler.seen <= FlakyHandler.failures
+        if fail:
+            return self._send(FlakyHandler.status, {"message": "unavailable"})
+        super().do_GET()
+
+
+@pytest.fixture
+def flaky_url():
+    FlakyHandler.seen = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_get_returns_stub_quote(pool, stub_url):
+    response = pool.http_get(f"{stub_url}/latest?from=USD&to=BRL")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["base"] == "USD"
+    assert data["rates"]["BRL"] == pytest.approx(1 / 0.1852, rel=1e-4)
+
+
+def test_http_get_reuses_one_keepalive_connection(pool, stub_url):
+    for _ in range(5):
+        pool.http_get(f"{stub_url}/latest?from=EUR").raise_for_status()
+
+    stats = pool.get_http_pool_stats()["sync"]
+    assert stats["requests"] == 5
+    assert stats["errors"] == 0
+    assert stats["in_flight"] == 0
+    assert stats["new_connections"] == 1
+    assert stats["connection_reuse_ratio"] == pytest.approx(0.8)
+
+
+def test_http_get_retries_server_errors(pool, flaky_url):
+    FlakyHandler.failures, FlakyHandler.status = pool.HTTP_MAX_RETRIES, 503
+
+    response = pool.http_get(f"{flaky_url}/latest?from=EUR")
+
+    assert response.status_code == 200
+    assert FlakyHandler.seen == pool.HTTP_MAX_RETRIES + 1
+    assert pool.SYNC_STATS.summary()["requests"] == 1
+
+
+def test_http_get_does_not_retry_client_errors(pool, flaky_url):
+    FlakyHandler.failures, FlakyHandler.status = 1, 404
+
+    response = pool.http_get(f"{flaky_url}/latest?from=EUR")
+
+    assert response.status_code == 404
+    assert FlakyHandler.seen == 1
+
+
+def test_http_get_counts_failed_requests(pool, flaky_url):
+    FlakyHandler.failures, FlakyHandler.status = 100, 503
+
+    with pytest.raises(requests.exceptions.RetryError):
+        pool.http_get(f"{flaky_url}/latest?from=EUR")
+
+    stats = pool.SYNC_STATS.summary()
+    assert stats["errors"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_pool_stats_saturation():
+    from utils.http_client import PoolStats
+
+    stats = PoolStats(2)
+    for _ in range(3):
+        stats.start()
+    stats.finish(ok=True)
+    stats.finish(ok=False)
+
+    summary = stats.summary()
+    assert summary["peak_in_flight"] == 3
+    assert summary["saturated_requests"] == 1
+    assert summary["in_flight"] == 1
+    assert summary["saturation"] == pytest.approx(0.5)
+    assert summary["errors"] == 1
+
+
+def test_pool_stats_counts_only_new_pool_connections():
+    from utils.http_client import PoolStats
+
+    stats = PoolStats(4)
+    stats.observe_pool_total(1)
+    stats.observe_pool_total(1)
+    stats.observe_pool_total(3)
+
+    assert stats.summary()["new_connections"] == 3
+
+
+def test_async_http_get_reuses_connection(pool, stub_url):
+    async def run():
+        for _ in range(3):
+            (await pool.async_http_get(f"{stub_url}/latest?from=GBP")).raise_for_status()
+        await pool.close_async_http_client()
+
+    asyncio.run(run())
+
+    stats = pool.get_http_pool_stats()["async"]
+    assert stats["requests"] == 3
+    assert stats["new_connections"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_async_clients_are_per_loop_and_dropped_with_it(pool):
+    async def client():
+        return pool.get_async_http_client()
+
+    loop = asyncio.new_event_loop()
+    first = loop.run_until_complete(client())
+    assert loop.run_until_complete(client()) is first
+    loop.run_until_complete(first.aclose())
+    loop.close()
+
+    other = asyncio.new_event_loop()
+    second = other.run_until_complete(client())
+    assert second is not first
+    other.run_until_complete(second.aclose())
+    other.close()
+
+    del loop, other
+    gc.collect()
+    assert len(pool._async_clients) == 0
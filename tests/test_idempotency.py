@@ -0,0 +1,96 @@
+"""
+Idempotency of side-effecting tools: replay within a turn, TTL expiry and
+LRU eviction of the dedup index
+"""
+
+import csv
+import json
+
+import pytest
+
+from utils import idempotency
+from utils.idempotency import IdempotencyIndex, default_turn_id, idempotency_key, turn_scope
+
+
+def test_keys_exist_only_inside_a_turn():
+    assert idempotency_key("request_credit_increase", "12345678901", 7000.0) is None
+    with turn_scope("s1", "t1"):
+        key = idempotency_key("request_credit_increase", "12345678901", 7000.0)
+        assert key == idempotency_key("request_credit_increase", "12345678901", 7000.0)
+        assert key != idempotency_key("request_credit_increase", "12345678901", 7500.0)
+    with turn_scope("s1", "t2"):
+        assert idempotency_key("request_credit_increase", "12345678901", 7000.0) != key
+
+
+def test_a_resent_message_reuses_the_previous_turn_id():
+    turn_id, last = default_turn_id("Quero aumentar meu limite", [])
+    assert default_turn_id("  quero aumentar   meu LIMITE ", last) == (turn_id, last)
+    other, last = default_turn_id("Quero ver meu score", last)
+    assert other != turn_id
+    assert default_turn_id("Quero aumentar meu limite", last)[0] not in (turn_id, other)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: now[0])
+    index = IdempotencyIndex(max_entries=10, ttl_seconds=60)
+    index.put("k", "result")
+    now[0] += 59
+    assert index.get("k") == "result"
+    now[0] += 2
+    assert index.get("k") is None
+    assert index.stats() == {"replays": 1, "stored": 1, "expired": 1, "evicted": 0, "entries": 0}
+
+
+def test_least_recently_used_entries_are_evicted():
+    index = IdempotencyIndex(max_entries=2, ttl_seconds=60)
+    index.put("a", "A")
+    index.put("b", "B")
+    assert index.get("a") == "A"  # a is now the most recent
+    index.put("c", "C")
+    assert index.get("b") is None
+    assert (index.get("a"), index.get("c")) == ("A", "C")
+    assert index.stats()["evicted"] == 1
+
+
+@pytest.fixture
+def credit_tools(data_dir, monkeypatch):
+    from tools import credit_tools
+
+    monkeypatch.setattr(credit_tools, "IDEMPOTENCY_INDEX", IdempotencyIndex(100, 60))
+    return credit_tools
+
+
+def _request_rows(data_dir):
+    with open(data_dir / "solicitacoes_aumento_limite.csv", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _journaled_requests(credit_tools):
+    return [e for e in credit_tools.CUSTOMER_STORE.journal.iter_events() if e["type"] == "increase_requested"]
+
+
+def test_repeated_increase_in_one_turn_writes_once(credit_tools, data_dir):
+    rows_before = len(_request_rows(data_dir))
+    args = {"cpf": "123.456.789-01", "requested_limit": 7000.0}
+
+    with turn_scope("s1", "t1"):
+        first = credit_tools.request_credit_increase.invoke(args)
+        second = credit_tools.request_credit_increase.invoke(args)
+
+    assert json.loads(first)["status"] == "aprovado"
+    assert second == first
+    assert len(_request_rows(data_dir)) == rows_before + 1
+    assert len(_journaled_requests(credit_tools)) == 1
+    assert credit_tools.CUSTOMER_STORE.get().set_index("cpf").loc["12345678901", "limite_credito"] == 7000.0
+
+
+def test_the_same_increase_in_a_new_turn_is_a_new_request(credit_tools, data_dir):
+    rows_before = len(_request_rows(data_dir))
+    args = {"cpf": "12345678901", "requested_limit": 7000.0}
+    for turn_id in ("t1", "t2"):
+        with turn_scope("s1", turn_id):
+            credit_tools.request_credit_increase.invoke(args)
+
+    assert len(_request_rows(data_dir)) == rows_before + 2
+    assert len(_journaled_requests(credit_tools)) == 2
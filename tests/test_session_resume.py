@@ -0,0 +1,47 @@
+"""
+Resume links: signed token round-trip, tampering and expiry, and the
+birthdate re-check that guards authenticated sessions
+"""
+
+from utils import session_lifecycle
+from utils.session_lifecycle import confirm_resume, resume_token, session_id_from_resume_token
+from utils.session_manager import SessionManager
+
+
+def test_token_round_trip():
+    session = SessionManager()
+    assert session_id_from_resume_token(resume_token(session.session_id)) == session.session_id
+
+
+def test_tampered_token_is_rejected():
+    sid, expires, signature = resume_token("abc123").split(".")
+    assert session_id_from_resume_token(f"other.{expires}.{signature}") is None
+    assert session_id_from_resume_token(f"{sid}.{int(expires) + 3600}.{signature}") is None
+    assert session_id_from_resume_token(f"{sid}.{expires}.{'0' * len(signature)}") is None
+
+
+def test_malformed_tokens_are_rejected():
+    for token in (None, "", "abc123", "abc123.notanumber.sig", "a.b.c.d"):
+        assert session_id_from_resume_token(token) is None
+
+
+def test_token_expires(monkeypatch):
+    now = 1_800_000_000.0
+    monkeypatch.setattr(session_lifecycle.time, "time", lambda: now)
+    token = resume_token("abc123")
+    monkeypatch.setattr(session_lifecycle.time, "time", lambda: now + session_lifecycle.SESSION_RESUME_TTL_SECONDS - 1)
+    assert session_id_from_resume_token(token) == "abc123"
+    monkeypatch.setattr(session_lifecycle.time, "time", lambda: now + session_lifecycle.SESSION_RESUME_TTL_SECONDS + 1)
+    assert session_id_from_resume_token(token) is None
+
+
+def test_confirm_resume_checks_the_birthdate(data_dir):
+    session = SessionManager()
+    session.set_customer_data("12345678901", '{"score": 650.0, "limite_credito": 5000.0}')
+    assert confirm_resume(session, "15/03/1985")
+    assert not confirm_resume(session, "16/03/1985")
+    assert not confirm_resume(session, "")
+
+
+def test_confirm_resume_needs_an_authenticated_session(data_dir):
+    assert not confirm_resume(SessionManager(), "15/03/1985")
@@ -0,0 +1,165 @@
+"""
+Session store backends: turn locks shared by every process using the store,
+the lifecycle sweep over the expiry index, and LRU eviction to the store
+"""
+
+import os
+import time
+import threading
+
+import pytest
+
+from utils.session_lifecycle import SessionRegistry
+from utils.session_manager import SessionManager
+from utils.session_store import InMemorySessionStore, RedisSessionStore, SessionBusy, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def open_store(request, tmp_path):
+    """
+    Opens the backend as another worker would: the memory store is one
+    process-wide object, sqlite a new connection to the same file, redis a new
+    client to the same server
+    """
+    if request.param == "memory":
+        store = InMemorySessionStore()
+        yield lambda: store
+    elif request.param == "sqlite":
+        path = str(tmp_path / "sessions.sqlite")
+        yield lambda: SQLiteSessionStore(path)
+    else:
+        url = request.getfixturevalue("resp_url")
+        yield lambda: RedisSessionStore(url)
+
+
+def test_lock_excludes_other_owners_until_released(open_store):
+    first, second = open_store(), open_store()
+    assert first.try_lock("s1", "worker-a", 60)
+    assert not second.try_lock("s1", "worker-b", 60)
+    assert second.try_lock("s2", "worker-b", 60)
+    second.unlock("s1", "worker-b")  # not the holder: no effect
+    assert not second.try_lock("s1", "worker-b", 60)
+    first.unlock("s1", "worker-a")
+    assert second.try_lock("s1", "worker-b", 60)
+
+
+def test_expired_lease_can_be_taken_over(open_store):
+    first, second = open_store(), open_store()
+    assert first.try_lock("s1", "worker-a", 0.001)
+    threading.Event().wait(0.05)
+    assert second.try_lock("s1", "worker-b", 60)
+
+
+def test_locked_raises_when_the_lock_is_not_released(open_store):
+    first, second = open_store(), open_store()
+    with first.locked("s1"):
+        with pytest.raises(SessionBusy):
+            with second.locked("s1", wait_seconds=0.05):
+                pass
+    with second.locked("s1", wait_seconds=0.05):
+        pass
+
+
+def test_concurrent_turns_on_two_workers_keep_every_message(open_store):
+    session = SessionManager()
+    session.save(open_store())
+    workers = [open_store(), open_store()]
+
+    def turn(store, n):
+        with store.locked(session.session_id):
+            current = SessionManager.load(store, session.session_id)
+            current.add_message("user", f"mensagem {n}")
+            current.save(store)
+
+    threads = [threading.Thread(target=turn, args=(workers[n % 2], n)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    history = SessionManager.load(workers[0], session.session_id).get_session_history()
+    assert sorted(message["content"] for message in history) == sorted(f"mensagem {n}" for n in range(8))
+
+
+def _stored(store, last_activity: float, ended: bool = False) -> str:
+    session = SessionManager()
+    session.add_message("user", "olá")
+    if ended:
+        session.end_session()
+    session.last_activity = last_activity
+    session.save(store)
+    return session.session_id
+
+
+def _registry(store, tmp_path, **limits) -> SessionRegistry:
+    settings = {"idle_timeout": 100, "ended_ttl": 50, "archive_after": 1000, "max_live": 10}
+    settings.update(limits)
+    return SessionRegistry(store, archive_dir=str(tmp_path / "archive"), **settings)
+
+
+def test_sweep_archives_only_expired_stored_sessions(open_store, tmp_path):
+    store = open_store()
+    now = time.time()
+    abandoned = _stored(store, now - 2000)
+    ended_long_ago = _stored(store, now - 60, ended=True)
+    ended_just_now = _stored(store, now - 10, ended=True)
+    active = _stored(store, now - 500)
+
+    stats = _registry(open_store(), tmp_path).sweep()
+
+    assert stats["archived"] == 2
+    assert sorted(store.session_ids()) == sorted([ended_just_now, active])
+    assert sorted(os.listdir(tmp_path / "archive")) == sorted(f"{sid}.msgpack" for sid in (abandoned, ended_long_ago))
+    assert store.expired_ids(now - 1000, now - 50) == []
+
+
+def test_sweep_drops_index_entries_of_deleted_fields(open_store, tmp_path):
+    store = open_store()
+    orphan = _stored(store, time.time() - 2000)
+    # The fields vanish without the index being updated (e.g. a manual cleanup)
+    if isinstance(store, InMemorySessionStore):
+        store._sessions.pop(orphan)
+    elif isinstance(store, SQLiteSessionStore):
+        with store._conn() as conn:
+            conn.execute("DELETE FROM session_fields WHERE session_id = ?", (orphan,))
+    else:
+        store.client.execute("DEL", store._key(orphan))
+
+    stats = _registry(store, tmp_path).sweep()
+
+    assert stats["archived"] == 0
+    assert store.expired_ids(time.time(), time.time()) == []
+
+
+def test_idle_live_sessions_leave_memory_but_stay_resumable(open_store, tmp_path):
+    registry = _registry(open_store(), tmp_path)
+    session = registry.get_or_create()
+    session.add_message("user", "quero ver meu limite")
+    session.last_activity = time.time() - 200
+
+    stats = registry.sweep(include_store=False)
+
+    assert (stats["live"], stats["evicted_idle"]) == (0, 1)
+    resumed = _registry(open_store(), tmp_path).get_or_create(session.session_id)
+    assert resumed is not session
+    assert resumed.get_session_history() == session.get_session_history()
+
+
+def test_lru_eviction_saves_state_before_dropping_it(open_store, tmp_path):
+    registry = _registry(open_store(), tmp_path, max_live=2)
+    sessions = []
+    for n in range(3):
+        session = registry.get_or_create()
+        # Changed after get_or_create and never saved explicitly
+        session.add_message("user", f"mensagem {n}")
+        sessions.append(session)
+    registry.get_or_create(sessions[1].session_id)  # touch: sessions[2] is now the oldest
+    registry.get_or_create()
+
+    assert registry.stats()["evicted_lru"] == 2
+    assert [s.session_id for s in registry.live_sessions()][0] == sessions[1].session_id
+    other_worker = _registry(open_store(), tmp_path)
+    for n in (0, 2):
+        resumed = other_worker.get_or_create(sessions[n].session_id)
+        assert [m["content"] for m in resumed.get_session_history()] == [f"mensagem {n}"]
+    assert other_worker.stats()["resumed"] == 2
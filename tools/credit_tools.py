@@ -2,12 +2,23 @@
 Tools for credit operations
 """
 
+import io
 import os
+import csv
 import json
-import pandas as pd
+import threading
 from datetime import datetime
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
+from utils.tracing import traced
+from utils.metrics import STORAGE_SECONDS, TOOL_SECONDS, timed, timer
+from utils.admission import bulkheaded
+from utils.data_cache import FileBackedCache
+from utils.idempotency import IDEMPOTENCY_INDEX, idempotency_key
+from utils.credit_policy import CreditPolicy
+from utils.customer_store import CUSTOMER_STORE
+from utils.request_index import RequestLogIndex
+from config import SCORE_LIMIT_FILE, REQUESTS_FILE
 
 
 class CheckCreditLimitArgsSchema(BaseModel):
@@ -17,17 +28,74 @@ class RequestCreditIncreaseArgsSchema(BaseModel):
     cpf: str = Field(description="CPF do cliente")
     requested_limit: float = Field(description="Novo limite desejado pelo cliente")
 
+class GetCreditRequestHistoryArgsSchema(BaseModel):
+    cpf: str = Field(description="CPF do cliente")
+    limit: int = Field(default=5, description="Quantidade de pedidos mais recentes a retornar")
+
 class UpdateCustomerScoreArgsSchema(BaseModel):
     cpf: str = Field(description="CPF do cliente")
     new_score: float = Field(description="Novo score calculado")
 
 
+# score_limite.csv compiled once and recompiled only when the file changes
+POLICY_CACHE = FileBackedCache(CreditPolicy.from_csv, name="CreditPolicyCache")
+
+# Byte offsets of each customer's rows in the request log, kept up to date on append
+REQUEST_INDEX = RequestLogIndex(REQUESTS_FILE)
+
+REQUEST_COLUMNS = ["cpf_cliente", "data_hora_solicitacao", "limite_atual", "novo_limite_solicitado", "status_pedido"]
+
+# Serialize read-check-journal cycles per customer. Lock stripes rather than
+# one global lock, so writes for different customers wait on the journal
+# together and share its group-committed fsync.
+_customer_locks = [threading.Lock() for _ in range(64)]
+_request_log_lock = threading.Lock()
+
+
+def _customer_lock(cpf_clean: str) -> threading.Lock:
+    return _customer_locks[hash(cpf_clean) % len(_customer_locks)]
+
+
+def _append_request(path: str, request_data: dict) -> None:
+    """
+    Append one row to the request log (the journal already holds the durable
+    copy) and index it under the customer's CPF
+    """
+    with _request_log_lock, timer(STORAGE_SECONDS, store="requests_csv", op="write"):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        needs_newline = False
+        if exists:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b"\n", b"\r")
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=REQUEST_COLUMNS)
+        if not exists:
+            writer.writeheader()
+        prefix = ("\n" if needs_newline else "") + buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(request_data)
+        row = buffer.getvalue().encode("utf-8")
+
+        with open(path, "ab") as f:
+            f.write(prefix.encode("utf-8"))
+            offset = f.tell()
+            f.write(row)
+            end = f.tell()
+        REQUEST_INDEX.record(offset, end, row)
+
+
 @tool("check_credit_limit", description="Verifica limite e score. Use para consultas de saldo ou situação atual.", args_schema=CheckCreditLimitArgsSchema)
+@traced("tool.check_credit_limit", capture_args=True)
+@timed(TOOL_SECONDS, tool="check_credit_limit")
+@bulkheaded("tool.check_credit_limit")
 def check_credit_limit(cpf: str) -> str:
     try:
         print(f"[CreditTool] check_credit_limit start cpf={cpf}")
         
-        df = pd.read_csv('data/clientes.csv', dtype={'cpf': str})
+        df = CUSTOMER_STORE.get()
         cpf_clean = ''.join(filter(str.isdigit, cpf))
         print(f"[CreditTool] cpf_clean={cpf_clean}")
         
@@ -52,94 +120,138 @@ def check_credit_limit(cpf: str) -> str:
 
 
 @tool("request_credit_increase", description="Solicita aumento de limite. Requer CPF e o valor desejado.", args_schema=RequestCreditIncreaseArgsSchema)
+@traced("tool.request_credit_increase", capture_args=True)
+@timed(TOOL_SECONDS, tool="request_credit_increase")
+@bulkheaded("tool.request_credit_increase")
 def request_credit_increase(cpf: str, requested_limit: float) -> str:
     try:
         print(f"[CreditTool] request_credit_increase start cpf={cpf} requested_limit={requested_limit}")
-     
-        df_clientes = pd.read_csv('data/clientes.csv', dtype={'cpf': str})
         cpf_clean = ''.join(filter(str.isdigit, cpf))
         print(f"[CreditTool] cpf_clean={cpf_clean}")
+
+        with _customer_lock(cpf_clean):
+
+            key = idempotency_key("request_credit_increase", cpf_clean, float(requested_limit))
+            replayed = IDEMPOTENCY_INDEX.get(key) if key else None
+            if replayed is not None:
+                print(f"[CreditTool] duplicate increase request in this turn, replaying result={replayed}")
+                return replayed
+
+            df_clientes = CUSTOMER_STORE.get()
+
+            customer = df_clientes[df_clientes['cpf'] == cpf_clean]
+            if customer.empty:
+                print("[CreditTool] customer not found for increase")
+                return json.dumps({"error": "Cliente não encontrado para processar aumento"})
      
-        customer = df_clientes[df_clientes['cpf'] == cpf_clean]
-        if customer.empty:
-            print("[CreditTool] customer not found for increase")
-            return json.dumps({"error": "Cliente não encontrado para processar aumento"})
-     
-        current_limit = float(customer.iloc[0]['limite_credito'])
-        current_score = float(customer.iloc[0]['score'])
-        print(f"[CreditTool] current_limit={current_limit} current_score={current_score}")
-     
-        score_df = pd.read_csv('data/score_limite.csv')
-        approved = False
-        for _, row in score_df.iterrows():
-            if current_score >= row['score_minimo'] and requested_limit <= row['limite_maximo']:
-                approved = True
-                break
-     
-        status = "aprovado" if approved else "rejeitado"
-        print(f"[CreditTool] increase status={status}")
-     
-        request_data = {
-            "cpf_cliente": cpf_clean,
-            "data_hora_solicitacao": datetime.now().isoformat(),
-            "limite_atual": current_limit,
-            "novo_limite_solicitado": requested_limit,
-            "status_pedido": status
-        }
+            current_limit = float(customer.iloc[0]['limite_credito'])
+            current_score = float(customer.iloc[0]['score'])
+            print(f"[CreditTool] current_limit={current_limit} current_score={current_score}")
      
-        file_path = 'data/solicitacoes_aumento_limite.csv'
-        new_row = pd.DataFrame([request_data])
+            approved = POLICY_CACHE.get(SCORE_LIMIT_FILE).approves(current_score, requested_limit)
      
-        if os.path.exists(file_path):
-            pd.concat([pd.read_csv(file_path), new_row], ignore_index=True).to_csv(file_path, index=False)
-        else:
-            new_row.to_csv(file_path, index=False)
+            status = "aprovado" if approved else "rejeitado"
+            print(f"[CreditTool] increase status={status}")
      
-        print("[CreditTool] increase request recorded")
-        if approved:
-            df_clientes.loc[df_clientes['cpf'] == cpf_clean, 'limite_credito'] = requested_limit
-            df_clientes.to_csv('data/clientes.csv', index=False)
-            print("[CreditTool] limit updated in clientes.csv")
+            request_data = {
+                "cpf_cliente": cpf_clean,
+                "data_hora_solicitacao": datetime.now().isoformat(),
+                "limite_atual": current_limit,
+                "novo_limite_solicitado": requested_limit,
+                "status_pedido": status
+            }
      
-        result = {
-            "status": status,
-            "limite_atual": current_limit if not approved else requested_limit,
-            "mensagem": "Aprovado com sucesso" if approved else "Negado por score insuficiente"
-        }
-        print(f"[CreditTool] request_credit_increase result={result}")
+            events = [{"type": "increase_requested", "cpf": cpf_clean, "request": request_data}]
+            if approved:
+                events.append({
+                    "type": "limit_updated",
+                    "cpf": cpf_clean,
+                    "set": {"limite_credito": requested_limit},
+                    "previous": {"limite_credito": current_limit},
+                })
+            CUSTOMER_STORE.record(events)
+            print("[CreditTool] increase request journaled" + (" with limit update" if approved else ""))
+
+            _append_request(REQUESTS_FILE, request_data)
+            print("[CreditTool] increase request recorded")
      
-        return json.dumps(result)
+            result = {
+                "status": status,
+                "limite_atual": current_limit if not approved else requested_limit,
+                "mensagem": "Aprovado com sucesso" if approved else "Negado por score insuficiente"
+            }
+            print(f"[CreditTool] request_credit_increase result={result}")
+
+            result_json = json.dumps(result)
+            if key:
+                IDEMPOTENCY_INDEX.put(key, result_json)
+            return result_json
     
     except Exception as e:
         print(f"[CreditTool] request_credit_increase error={e}")
         return json.dumps({"error": str(e)})
 
 
+@tool("get_credit_request_history", description="Lista os pedidos de aumento de limite mais recentes do cliente, do mais novo ao mais antigo.", args_schema=GetCreditRequestHistoryArgsSchema)
+@traced("tool.get_credit_request_history", capture_args=True)
+@timed(TOOL_SECONDS, tool="get_credit_request_history")
+@bulkheaded("tool.get_credit_request_history")
+def get_credit_request_history(cpf: str, limit: int = 5) -> str:
+    try:
+        cpf_clean = ''.join(filter(str.isdigit, cpf))
+        limit = max(1, min(int(limit or 5), 20))
+        print(f"[CreditTool] get_credit_request_history cpf={cpf_clean} limit={limit}")
+
+        requests = [
+            {
+                "data_hora_solicitacao": row.get("data_hora_solicitacao"),
+                "limite_atual": float(row.get("limite_atual") or 0),
+                "novo_limite_solicitado": float(row.get("novo_limite_solicitado") or 0),
+                "status_pedido": row.get("status_pedido"),
+            }
+            for row in REQUEST_INDEX.recent(cpf_clean, limit)
+        ]
+        print(f"[CreditTool] get_credit_request_history found={len(requests)}")
+        return json.dumps({"cpf": cpf_clean, "pedidos": requests})
+
+    except Exception as e:
+        print(f"[CreditTool] get_credit_request_history error={e}")
+        return json.dumps({"error": str(e)})
+
+
 @tool("update_customer_score", description="Atualiza o score de crédito do cliente.", args_schema=UpdateCustomerScoreArgsSchema)
+@traced("tool.update_customer_score", capture_args=True)
+@timed(TOOL_SECONDS, tool="update_customer_score")
+@bulkheaded("tool.update_customer_score")
 def update_customer_score(cpf: str, new_score: float) -> str:
     try:
         print(f"[CreditTool] update_customer_score start cpf={cpf} new_score={new_score}")
-        df = pd.read_csv('data/clientes.csv', dtype={'cpf': str})
-        
         cpf_clean = ''.join(filter(str.isdigit, cpf))
         print(f"[CreditTool] cpf_clean={cpf_clean}")
+
+        with _customer_lock(cpf_clean):
+            df = CUSTOMER_STORE.get()
         
-        old_score = float(df[df['cpf'] == cpf_clean]['score'].iloc[0])
-        print(f"[CreditTool] old_score={old_score}")
+            old_score = float(df[df['cpf'] == cpf_clean]['score'].iloc[0])
+            print(f"[CreditTool] old_score={old_score}")
         
-        df.loc[df['cpf'] == cpf_clean, 'score'] = new_score
-        df.to_csv('data/clientes.csv', index=False)
-        print("[CreditTool] score updated in clientes.csv")
+            CUSTOMER_STORE.record([{
+                "type": "score_updated",
+                "cpf": cpf_clean,
+                "set": {"score": new_score},
+                "previous": {"score": old_score},
+            }])
+            print("[CreditTool] score update journaled")
         
-        result = {
-            "cpf": cpf_clean,
-            "old_score": old_score,
-            "new_score": new_score,
-            "updated": True
-        }
-        print(f"[CreditTool] update_customer_score result={result}")
+            result = {
+                "cpf": cpf_clean,
+                "old_score": old_score,
+                "new_score": new_score,
+                "updated": True
+            }
+            print(f"[CreditTool] update_customer_score result={result}")
         
-        return json.dumps(result)
+            return json.dumps(result)
     except Exception as e:
         print(f"[CreditTool] update_customer_score error={e}")
         return json.dumps({"error": str(e)})
@@ -4,14 +4,21 @@ Tools for customer authentication and data access
 
 import json
 from pydantic import Field, BaseModel
-import pandas as pd
 from langchain_core.tools import tool
+from utils.tracing import traced
+from utils.metrics import AUTH_ATTEMPTS, TOOL_SECONDS, timed
+from utils.admission import bulkheaded
+from utils.customer_store import CUSTOMER_STORE
+
 
 class AuthSchema(BaseModel):
     cpf: str = Field(description="CPF do cliente")
     birthdate: str = Field(description="Data de nascimento do cliente no formato DD/MM/YYYY")
 
 @tool("authenticate_customer", description="Authenticate customer by verifying CPF and birthdate.", args_schema=AuthSchema)
+@traced("tool.authenticate_customer")
+@timed(TOOL_SECONDS, tool="authenticate_customer")
+@bulkheaded("tool.authenticate_customer")
 def authenticate_customer(cpf: str, birthdate: str) -> str:
     """Authenticate customer by verifying CPF and birthdate.
     Parameters:
@@ -20,7 +27,7 @@ def authenticate_customer(cpf: str, birthdate: str) -> str:
     """
 
     try:
-        df = pd.read_csv('data/clientes.csv', dtype={'cpf': str})
+        df = CUSTOMER_STORE.get()
         cpf_clean = ''.join(filter(str.isdigit, cpf))
 
         bd = birthdate.strip()
@@ -31,12 +38,14 @@ def authenticate_customer(cpf: str, birthdate: str) -> str:
 
         customer = df[df['cpf'] == cpf_clean]
         if customer.empty:
+            AUTH_ATTEMPTS.labels(outcome="unknown_cpf").inc()
             return json.dumps({"error": "CPF não encontrado no sistema."})
 
         db_birthdate = str(customer.iloc[0]['data_nascimento'])
         db_birthdate_norm = db_birthdate.replace('-', '/')
 
         if db_birthdate != bd and db_birthdate_norm != bd:
+            AUTH_ATTEMPTS.labels(outcome="wrong_birthdate").inc()
             return json.dumps({"error": f"Data de nascimento incorreta. (Esperado formato similar a {db_birthdate})"})
 
         result = {
@@ -45,7 +54,9 @@ def authenticate_customer(cpf: str, birthdate: str) -> str:
             "score": float(customer.iloc[0]['score']),
             "limite_credito": float(customer.iloc[0]['limite_credito'])
         }
+        AUTH_ATTEMPTS.labels(outcome="success").inc()
         return json.dumps(result)
 
     except Exception as e:
+        AUTH_ATTEMPTS.labels(outcome="error").inc()
         return json.dumps({"error": f"Erro técnico na validação: {str(e)}"})
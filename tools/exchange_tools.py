@@ -2,61 +2,280 @@
 Tools for currency exchange operations
 """
 
+import json
+import time
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
-import requests
+from utils.tracing import traced
+from utils.metrics import EXCHANGE_API_ERRORS, EXCHANGE_API_SECONDS, TOOL_SECONDS, timed
+from utils.admission import bulkheaded, MESSAGES
+from config import (
+    EXCHANGE_RATE_TTL_SECONDS,
+    EXCHANGE_RATE_MAX_STALE_SECONDS,
+    EXCHANGE_RATE_ERROR_TTL_SECONDS,
+    FRANKFURTER_BASE_URL,
+    RATE_HISTORY_DIR,
+)
+from utils.ttl_cache import TTLCache
+from utils.http_client import http_get
+from utils.rate_history import RateHistoryStore
 
 class ExchangeRateSchema(BaseModel):
     currency_code: str = Field(description="Código ISO da moeda (e.g., USD, EUR, GBP, JPY, ARS)")
 
-@tool("get_exchange_rate", description="Obter a cotação atual da moeda contra BRL", args_schema=ExchangeRateSchema)
-def get_exchange_rate(currency_code: str) -> str:
-    try:
-        code = currency_code.upper().strip()
-
-        currency_map = {
-            "DOLAR": "USD",
-            "DÓLAR": "USD",
-            "EURO": "EUR",
-            "LIBRA": "GBP",
-            "IENE": "JPY",
-            "YEN": "JPY",
-            "PESO": "ARS",
-            "PESO ARGENTINO": "ARS",
-            "DOLAR AMERICANO": "USD",
-            "USD": "USD",
-            "EUR": "EUR",
-            "GBP": "GBP",
-            "JPY": "JPY",
-            "ARS": "ARS"
-        }
-
-        if code in currency_map:
-            code = currency_map[code]
-
-        supported = {"USD", "EUR", "GBP", "JPY", "ARS"}
-        if code not in supported:
-            return "Moeda não suportada. Informe um código válido: USD, EUR, GBP, JPY, ARS."
+class ConvertCurrencySchema(BaseModel):
+    amount: float = Field(description="Valor a converter")
+    from_currency: str = Field(description="Código ISO da moeda de origem (e.g., EUR, USD, BRL)")
+    to_currency: str = Field(description="Código ISO da moeda de destino (e.g., USD, BRL)")
+
+class ExchangeRateHistorySchema(BaseModel):
+    currency_code: str = Field(description="Código ISO da moeda (e.g., USD, EUR, GBP, JPY, ARS)")
+    days: int = Field(default=30, description="Quantidade de dias para trás a partir de hoje (e.g., 7, 30, 90)")
+
+
+BASE_CURRENCY = "BRL"
+SUPPORTED_CURRENCIES = ("USD", "EUR", "GBP", "JPY", "ARS")
+
+CURRENCY_ALIASES = {
+    "DOLAR": "USD",
+    "DÓLAR": "USD",
+    "DOLARES": "USD",
+    "DÓLARES": "USD",
+    "EURO": "EUR",
+    "EUROS": "EUR",
+    "LIBRA": "GBP",
+    "IENE": "JPY",
+    "YEN": "JPY",
+    "PESO": "ARS",
+    "PESO ARGENTINO": "ARS",
+    "DOLAR AMERICANO": "USD",
+    "REAL": "BRL",
+    "REAIS": "BRL",
+}
+
+
+def normalize_currency(currency_code: str) -> str:
+    """Map a currency name or code to its ISO code"""
+    code = currency_code.upper().strip()
+    return CURRENCY_ALIASES.get(code, code)
+
+
+class RateSnapshot:
+    """All supported currencies priced in BRL at one point in time; any pair is computed locally"""
+
+    def __init__(self, date: str, brl_per_unit: Dict[str, float], offline: bool = False):
+        self.date = date
+        self.brl_per_unit = {BASE_CURRENCY: 1.0, **brl_per_unit}
+        # True when served from the local history because the API was unavailable
+        self.offline = offline
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        """Units of to_code per one unit of from_code"""
+        for code in (from_code, to_code):
+            if code not in self.brl_per_unit:
+                raise KeyError(code)
+        return self.brl_per_unit[from_code] / self.brl_per_unit[to_code]
+
+    def convert(self, amount: float, from_code: str, to_code: str) -> float:
+        """Convert an amount between any two currencies in the snapshot"""
+        return amount * self.rate(from_code, to_code)
+
 
-        url = f"https://api.frankfurter.app/latest?from={code}&to=BRL"
-        response = requests.get(url, timeout=10)
+def _frankfurter_get(endpoint: str, url: str) -> dict:
+    """GET a Frankfurter endpoint, recording its latency and failures"""
+    start = time.perf_counter()
+    try:
+        response = http_get(url)
         response.raise_for_status()
-        data = response.json()
+        return response.json()
+    except Exception as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        EXCHANGE_API_ERRORS.labels(endpoint=endpoint, reason=str(status) if status else type(e).__name__).inc()
+        raise
+    finally:
+        EXCHANGE_API_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+
+
+def _fetch_snapshot(base: str) -> RateSnapshot:
+    """Fetch every currency against the base in a single Frankfurter request"""
+    data = _frankfurter_get("latest", f"{FRANKFURTER_BASE_URL}/latest?from={base}")
+
+    # Frankfurter returns units of each currency per 1 BRL; store BRL per unit instead
+    rates = data.get("rates", {})
+    brl_per_unit = {
+        code: 1 / float(rates[code])
+        for code in SUPPORTED_CURRENCIES
+        if rates.get(code)
+    }
+    if not brl_per_unit:
+        EXCHANGE_API_ERRORS.labels(endpoint="latest", reason="empty_response").inc()
+        raise ValueError("Resposta sem cotações")
+
+    snapshot_date = data.get("date") or date.today().isoformat()
+    try:
+        RATE_HISTORY.record_snapshot(date.fromisoformat(snapshot_date), brl_per_unit)
+    except Exception as e:
+        print(f"[ExchangeTool] Failed to record rate history: {e}")
+    return RateSnapshot(snapshot_date, brl_per_unit)
+
+
+def _fetch_history(start: date, end: date) -> None:
+    """Backfill the local history with one Frankfurter time-series request"""
+    url = f"{FRANKFURTER_BASE_URL}/{start.isoformat()}..{end.isoformat()}?from={BASE_CURRENCY}"
+    RATE_HISTORY.record_snapshots({
+        date.fromisoformat(day): {code: 1 / float(rates[code]) for code in SUPPORTED_CURRENCIES if rates.get(code)}
+        for day, rates in _frankfurter_get("timeseries", url).get("rates", {}).items()
+    })
+
+
+RATE_HISTORY = RateHistoryStore(RATE_HISTORY_DIR)
+_backfilled_ranges: set = set()
+_backfill_lock = threading.Lock()
+
+
+# Rates change at most once a day, so one snapshot is shared across sessions
+RATE_CACHE = TTLCache(
+    _fetch_snapshot,
+    ttl_seconds=EXCHANGE_RATE_TTL_SECONDS,
+    max_stale_seconds=EXCHANGE_RATE_MAX_STALE_SECONDS,
+    error_ttl_seconds=EXCHANGE_RATE_ERROR_TTL_SECONDS,
+    name="ExchangeRateCache",
+)
+
+
+def get_rate_snapshot() -> RateSnapshot:
+    """Current snapshot of all supported currencies against BRL, falling back to the local history offline"""
+    from requests.exceptions import RequestException
 
-        rate_raw = data.get("rates", {}).get("BRL")
-        try:
-            rate = float(rate_raw) if rate_raw is not None else None
-        except Exception:
-            rate = None
+    try:
+        return RATE_CACHE.get(BASE_CURRENCY)
+    except (RequestException, ValueError):
+        latest = RATE_HISTORY.latest()
+        if latest is None:
+            raise
+        day, brl_per_unit = latest
+        print(f"[ExchangeTool] API unavailable, serving stored rates from {day}")
+        return RateSnapshot(day.isoformat(), brl_per_unit, offline=True)
+
+
+# Frankfurter publishes business days only: a weekend next to a two-day
+# holiday (Easter, Christmas) is the longest legitimate gap between points
+_MAX_HISTORY_GAP = timedelta(days=5)
+
+
+def _missing_span(points: List[Tuple[date, float]], start: date, end: date) -> Optional[Tuple[date, date]]:
+    """Smallest range covering every gap in points over start..end, None when fully covered"""
+    bounds = [start - timedelta(days=1)] + [day for day, _ in points] + [end + timedelta(days=1)]
+    gaps = [(a, b) for a, b in zip(bounds, bounds[1:]) if b - a > _MAX_HISTORY_GAP]
+    if not gaps:
+        return None
+    return max(start, gaps[0][0] + timedelta(days=1)), min(end, gaps[-1][1] - timedelta(days=1))
+
+
+def ensure_history(code: str, start: date, end: date) -> None:
+    """Backfill, once per process, the parts of a date range the local history does not cover"""
+    span = _missing_span(RATE_HISTORY.range(code, start, end), start, end)
+    if span is None:
+        return
+    with _backfill_lock:
+        if span in _backfilled_ranges:
+            return
+        _backfilled_ranges.add(span)
+    try:
+        _fetch_history(*span)
+    except Exception as e:
+        print(f"[ExchangeTool] History backfill failed, answering from local data: {e}")
 
-        if rate is None:
-            return "Não foi possível obter a cotação no momento. Tente novamente mais tarde."
 
+def get_rate_cache_stats() -> dict:
+    """Hit, miss and staleness metrics of the exchange rate cache"""
+    return RATE_CACHE.stats()
+
+
+@tool("get_exchange_rate", description="Obter a cotação atual da moeda contra BRL", args_schema=ExchangeRateSchema)
+@traced("tool.get_exchange_rate", capture_args=True)
+@timed(TOOL_SECONDS, tool="get_exchange_rate")
+@bulkheaded("tool.get_exchange_rate", rejection=lambda: MESSAGES["bulkhead"])
+def get_exchange_rate(currency_code: str) -> str:
+    from requests.exceptions import RequestException, Timeout
+
+    try:
+        code = normalize_currency(currency_code)
+
+        if code not in SUPPORTED_CURRENCIES:
+            return "Moeda não suportada. Informe um código válido: USD, EUR, GBP, JPY, ARS."
+
+        rate = get_rate_snapshot().rate(code, BASE_CURRENCY)
         return f"{rate:.4f}"
 
-    except requests.exceptions.Timeout:
+    except Timeout:
         return "Desculpe, o serviço de cotação está demorando para responder. Tente novamente em alguns instantes."
-    except requests.exceptions.RequestException:
+    except RequestException:
         return "Não foi possível consultar a cotação no momento. Por favor, tente novamente mais tarde."
+    except (ValueError, KeyError):
+        return "Não foi possível obter a cotação no momento. Tente novamente mais tarde."
     except Exception as e:
         return f"Erro ao consultar cotação: {str(e)}"
+
+
+@tool("convert_currency", description="Converte um valor entre duas moedas (USD, EUR, GBP, JPY, ARS, BRL)", args_schema=ConvertCurrencySchema)
+@traced("tool.convert_currency", capture_args=True)
+@timed(TOOL_SECONDS, tool="convert_currency")
+@bulkheaded("tool.convert_currency")
+def convert_currency(amount: float, from_currency: str, to_currency: str) -> str:
+    from requests.exceptions import RequestException, Timeout
+
+    try:
+        from_code = normalize_currency(from_currency)
+        to_code = normalize_currency(to_currency)
+
+        allowed = SUPPORTED_CURRENCIES + (BASE_CURRENCY,)
+        if from_code not in allowed or to_code not in allowed:
+            return json.dumps({"error": "Moeda não suportada. Use: USD, EUR, GBP, JPY, ARS ou BRL."})
+
+        snapshot = get_rate_snapshot()
+        rate = snapshot.rate(from_code, to_code)
+        return json.dumps({
+            "amount": amount,
+            "from": from_code,
+            "to": to_code,
+            "rate": round(rate, 6),
+            "converted": round(amount * rate, 2),
+            "date": snapshot.date,
+        })
+
+    except Timeout:
+        return json.dumps({"error": "O serviço de cotação está demorando para responder."})
+    except RequestException:
+        return json.dumps({"error": "Não foi possível consultar a cotação no momento."})
+    except (ValueError, KeyError):
+        return json.dumps({"error": "Cotação indisponível para esta moeda no momento."})
+    except Exception as e:
+        return json.dumps({"error": f"Erro ao converter: {str(e)}"})
+
+
+@tool("get_exchange_rate_history", description="Variação histórica de uma moeda contra BRL nos últimos N dias (mínima, máxima, média e variação)", args_schema=ExchangeRateHistorySchema)
+@traced("tool.get_exchange_rate_history", capture_args=True)
+@timed(TOOL_SECONDS, tool="get_exchange_rate_history")
+@bulkheaded("tool.get_exchange_rate_history")
+def get_exchange_rate_history(currency_code: str, days: int = 30) -> str:
+    try:
+        code = normalize_currency(currency_code)
+        if code not in SUPPORTED_CURRENCIES:
+            return json.dumps({"error": "Moeda não suportada. Use: USD, EUR, GBP, JPY ou ARS."})
+
+        days = max(1, min(int(days or 30), 366))
+        end = date.today()
+        start = end - timedelta(days=days)
+        ensure_history(code, start, end)
+
+        stats = RATE_HISTORY.stats(code, start, end)
+        if stats is None:
+            return json.dumps({"error": "Não há histórico disponível para este período."})
+        return json.dumps(stats)
+
+    except Exception as e:
+        return json.dumps({"error": f"Erro ao consultar histórico: {str(e)}"})
@@ -0,0 +1,16 @@
+"""
+Pseudo-tools used by the triage agent to route in a single model call
+"""
+
+from pydantic import BaseModel, Field
+from langchain_core.tools import tool
+
+
+class RouteToInterviewSchema(BaseModel):
+    reason: str = Field(default="", description="Motivo do encaminhamento, se houver")
+
+
+@tool("route_to_interview", description="Encaminha o cliente para a entrevista de crédito (atualização de score).", args_schema=RouteToInterviewSchema)
+def route_to_interview(reason: str = "") -> str:
+    """Routing marker only: the triage agent hands off to the interview agent instead of running it"""
+    return "entrevista"
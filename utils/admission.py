@@ -0,0 +1,201 @@
+"""
+Admission control: rate limits per session, CPF and globally, a per-CPF
+authentication throttle, and concurrency bulkheads per agent and tool
+
+Checks run before any model call, so a rejected turn costs no LLM tokens and
+returns at once with a friendly message instead of queueing behind a flood.
+"""
+
+import json
+import time
+import threading
+import functools
+from typing import Callable, Dict, Optional
+from config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMITS,
+    BULKHEAD_LIMITS,
+    BULKHEAD_DEFAULT_LIMIT,
+    BULKHEAD_QUEUE_TIMEOUT_SECONDS,
+)
+from utils.rate_limit import get_rate_limit_store
+
+MESSAGES = {
+    "session": "Você enviou muitas mensagens em pouco tempo. Aguarde {wait} segundos e tente novamente.",
+    "cpf": "Muitas solicitações para esta conta em pouco tempo. Aguarde {wait} segundos e tente novamente.",
+    "global": "Estamos com alto volume de atendimentos no momento. Por favor, tente novamente em alguns instantes.",
+    "auth": (
+        "Por segurança, as tentativas de autenticação para este CPF foram temporariamente bloqueadas. "
+        "Aguarde alguns minutos antes de tentar novamente."
+    ),
+    "bulkhead": "Este serviço está com alta demanda no momento. Por favor, tente novamente em alguns instantes.",
+}
+
+
+class Rejection:
+    """Why a call was refused and when to retry"""
+
+    __slots__ = ("scope", "retry_after", "message")
+
+    def __init__(self, scope: str, retry_after: float, message: str):
+        self.scope = scope
+        self.retry_after = retry_after
+        self.message = message
+
+
+class AdmissionStats:
+    """Admitted and rejected counters per scope"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, scope: str, admitted: bool) -> None:
+        with self._lock:
+            counts = self.counts.setdefault(scope, {"admitted": 0, "rejected": 0})
+            counts["admitted" if admitted else "rejected"] += 1
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {scope: dict(counts) for scope, counts in self.counts.items()}
+
+
+ADMISSION_STATS = AdmissionStats()
+
+
+def _take(scope: str, key: str) -> Optional[Rejection]:
+    limit = RATE_LIMITS.get(scope)
+    if not RATE_LIMIT_ENABLED or not limit:
+        return None
+    try:
+        wait = get_rate_limit_store().take(f"{scope}:{key}", limit["capacity"], limit["refill_per_second"])
+    except Exception as e:
+        # A store outage must not take the service down with it: fail open
+        print(f"[Admission] Rate limit store error, admitting: {e}")
+        return None
+    ADMISSION_STATS.record(scope, wait <= 0)
+    if wait <= 0:
+        return None
+    print(f"[Admission] {scope} limit hit for {key}, retry in {wait:.1f}s")
+    return Rejection(scope, wait, MESSAGES[scope].format(wait=max(1, round(wait))))
+
+
+def admit(session_manager) -> Optional[Rejection]:
+    """
+    Check the session, CPF and global buckets for one turn, narrowest first so
+    a single flooding client runs out of its own tokens before the shared ones
+
+    Returns:
+        None when admitted, otherwise the Rejection to report
+    """
+    rejection = _take("session", session_manager.session_id)
+    if rejection is None and session_manager.customer_cpf:
+        rejection = _take("cpf", session_manager.customer_cpf)
+    if rejection is None:
+        rejection = _take("global", "all")
+    return rejection
+
+
+def check_auth_attempt(cpf: str) -> Optional[Rejection]:
+    """Count one authentication attempt for a CPF across every session"""
+    cpf_clean = "".join(filter(str.isdigit, str(cpf or "")))
+    if not cpf_clean:
+        return None
+    return _take("auth", cpf_clean)
+
+
+class BulkheadFull(Exception):
+    """No slot freed up within the bulkhead's queue timeout"""
+
+    def __init__(self, name: str):
+        super().__init__(f"Bulkhead '{name}' is full")
+        self.name = name
+        self.message = MESSAGES["bulkhead"]
+
+
+class Bulkhead:
+    """Caps concurrent calls into one agent or tool within this process"""
+
+    def __init__(self, name: str, limit: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.waited_ms = 0.0
+
+    def __enter__(self) -> "Bulkhead":
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            print(f"[Admission] Bulkhead '{self.name}' full ({self.limit} in flight)")
+            raise BulkheadFull(self.name)
+        with self._lock:
+            self.active += 1
+            self.admitted += 1
+            self.waited_ms += (time.perf_counter() - start) * 1000
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+        return False
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.waited_ms / self.admitted if self.admitted else 0.0,
+            }
+
+
+_bulkheads: Dict[str, Bulkhead] = {}
+_bulkheads_lock = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """Process-wide bulkhead for an agent ('agent.<name>') or tool ('tool.<name>')"""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _bulkheads_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                limit = BULKHEAD_LIMITS.get(name, BULKHEAD_DEFAULT_LIMIT)
+                bulkhead = Bulkhead(name, limit, BULKHEAD_QUEUE_TIMEOUT_SECONDS)
+                _bulkheads[name] = bulkhead
+    return bulkhead
+
+
+def bulkheaded(name: str, rejection: Optional[Callable[[], str]] = None) -> Callable:
+    """
+    Decorator running a tool inside its bulkhead. When the bulkhead is full
+    the tool returns `rejection()` (default: a JSON error, like the tools'
+    own failures) so the calling agent answers with its usual error path.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                with get_bulkhead(name):
+                    return fn(*args, **kwargs)
+            except BulkheadFull as e:
+                return rejection() if rejection else json.dumps({"error": e.message}, ensure_ascii=False)
+        return wrapper
+
+    return decorator
+
+
+def get_admission_stats() -> dict:
+    """Rate limit decisions per scope and per-bulkhead occupancy"""
+    with _bulkheads_lock:
+        bulkheads = {name: b.stats() for name, b in _bulkheads.items()}
+    return {"rate_limits": ADMISSION_STATS.summary(), "bulkheads": bulkheads}
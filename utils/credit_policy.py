@@ -0,0 +1,53 @@
+"""
+Credit policy table (score_limite.csv) compiled for constant-time approval checks
+"""
+
+import bisect
+from typing import List
+
+
+class CreditPolicy:
+    """
+    A request is approved when some policy tier has score_minimo <= score and
+    limite_maximo >= requested limit. Sorting tiers by score_minimo and taking
+    the running maximum of limite_maximo turns that scan into a binary search
+    for the highest limit the score unlocks.
+    """
+
+    def __init__(self, min_scores: List[float], max_limits: List[float]):
+        self.min_scores = min_scores
+        self.max_limits = max_limits
+
+    @classmethod
+    def from_csv(cls, path: str) -> "CreditPolicy":
+        import pandas as pd
+
+        df = pd.read_csv(path).dropna(subset=["score_minimo", "limite_maximo"])
+        df = df.sort_values("score_minimo", kind="stable")
+        return cls(
+            df["score_minimo"].astype(float).tolist(),
+            df["limite_maximo"].astype(float).cummax().tolist(),
+        )
+
+    def max_limit(self, score: float) -> float:
+        """Highest limit any tier allows for the score, or -inf when no tier applies"""
+        index = bisect.bisect_right(self.min_scores, score) - 1
+        return self.max_limits[index] if index >= 0 else float("-inf")
+
+    def approves(self, score: float, requested_limit: float) -> bool:
+        return requested_limit <= self.max_limit(score)
+
+    def limits_for(self, scores):
+        """Vectorized max_limit over a NumPy array of scores"""
+        import numpy as np
+
+        index = np.searchsorted(np.asarray(self.min_scores), scores, side="right") - 1
+        # Index -1 (score below every tier) picks the trailing -inf
+        return np.asarray(self.max_limits + [float("-inf")])[index]
+
+    def approves_many(self, scores, requested_limits):
+        """Vectorized approves(); NaN scores (unknown customers) are never approved"""
+        import numpy as np
+
+        scores = np.asarray(scores, dtype=np.float64)
+        return (np.asarray(requested_limits) <= self.limits_for(scores)) & ~np.isnan(scores)
@@ -0,0 +1,195 @@
+"""
+Credit score formula used by the interview, for one answer set or in bulk
+
+calculate_score() scores one interview; score_frame() and score_bulk() apply
+the same formula to whole columns with NumPy so a portfolio can be rescored
+from bulk interview or bureau data. Bulk results are bit-for-bit equal to
+calculate_score() on every row.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from config import BULK_SCORING_WORKERS, BULK_SCORING_CHUNK_ROWS
+
+# Weights
+INCOME_WEIGHT = 30
+EMPLOYMENT_WEIGHTS = {
+    "formal": 300,
+    "autônomo": 200,
+    "desempregado": 0,
+}
+DEPENDENTS_WEIGHTS = {
+    0: 100,
+    1: 80,
+    2: 60,
+    "3+": 30,
+}
+DEBT_WEIGHTS = {
+    "sim": -100,
+    "não": 100,
+}
+
+# Value used for a missing answer, per field
+DEFAULTS = {
+    "renda_mensal": 0,
+    "despesas_fixas": 0,
+    "tipo_emprego": "desempregado",
+    "num_dependentes": 0,
+    "tem_dividas": "sim",
+}
+FIELDS = tuple(DEFAULTS)
+
+
+def calculate_score(data: dict) -> float:
+    """Calculate credit score based on interview data"""
+
+    # Extract data
+    renda = data.get("renda_mensal", 0)
+    despesas = data.get("despesas_fixas", 0)
+    tipo_emprego = data.get("tipo_emprego", "desempregado")
+    num_dependentes = data.get("num_dependentes", 0)
+    tem_dividas = data.get("tem_dividas", "sim")
+
+    # Calculate score
+    score = (
+        (renda / (despesas + 1)) * INCOME_WEIGHT +
+        EMPLOYMENT_WEIGHTS.get(tipo_emprego, 0) +
+        DEPENDENTS_WEIGHTS.get(num_dependentes, 0) +
+        DEBT_WEIGHTS.get(tem_dividas, 0)
+    )
+
+    # Ensure score is between 0 and 1000
+    score = max(0, min(1000, score))
+
+    return round(score, 2)
+
+
+def _lookup(values, weights: dict):
+    """Map a categorical column through a weight dict (unknown or missing -> 0)"""
+    import numpy as np
+    import pandas as pd
+
+    # Hash each distinct value once, then index a small lookup table. The
+    # dict is queried with the original objects, so 1 / 1.0 / True resolve
+    # exactly as dict.get does in calculate_score
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    table = np.array([weights.get(u, 0) for u in uniques] + [0], dtype=np.float64)
+    # Missing values get code -1, i.e. the trailing 0
+    return table[codes]
+
+
+def _round2(scores):
+    """round(x, 2) with Python's correctly rounded semantics, elementwise"""
+    import numpy as np
+
+    scaled = scores * 100
+    rounded = np.round(scaled) / 100
+    # x * 100 can land on (or next to) .5 when the decimal value of x does
+    # not; those rows are re-rounded one by one the way round() does
+    fraction = scaled - np.floor(scaled)
+    for i in np.flatnonzero(np.abs(fraction - 0.5) < 1e-6):
+        rounded[i] = round(float(scores[i]), 2)
+    return rounded
+
+
+def score_columns(renda, despesas, tipo_emprego, num_dependentes, tem_dividas):
+    """
+    Vectorized calculate_score over equal-length columns
+
+    Returns:
+        float64 array of scores. Rows where calculate_score would raise
+        (despesas_fixas == -1, a division by zero) are NaN.
+    """
+    import numpy as np
+
+    renda = np.asarray(renda, dtype=np.float64)
+    divisor = np.asarray(despesas, dtype=np.float64) + 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = (renda / divisor) * INCOME_WEIGHT
+    # Same left-to-right additions as the scalar formula, so every
+    # intermediate rounds identically
+    score = score + _lookup(tipo_emprego, EMPLOYMENT_WEIGHTS)
+    score = score + _lookup(num_dependentes, DEPENDENTS_WEIGHTS)
+    score = score + _lookup(tem_dividas, DEBT_WEIGHTS)
+
+    # max(0, min(1000, s)) as written, including NaN -> 1000
+    score = np.where(score < 1000, score, 1000.0)
+    score = np.where(score > 0, score, 0.0)
+
+    score = _round2(score)
+    score[divisor == 0] = np.nan
+    return score
+
+
+def _score_chunk(columns: tuple):
+    return score_columns(*columns)
+
+
+def _frame_columns(frame) -> list:
+    """Interview columns of a DataFrame; absent columns and empty cells get the field default"""
+    import numpy as np
+
+    columns = []
+    for field in FIELDS:
+        if field in frame:
+            column = frame[field]
+            # An empty cell is an unanswered field, like a missing dict key
+            columns.append(column.where(column.notna(), DEFAULTS[field]).to_numpy())
+        else:
+            columns.append(np.full(len(frame), DEFAULTS[field], dtype=object))
+    return columns
+
+
+def row_answers(row: dict) -> dict:
+    """The dict calculate_score would receive for a bulk row (empty cells dropped)"""
+    return {k: v for k, v in row.items() if k in DEFAULTS and v is not None and v == v}
+
+
+def score_frame(frame):
+    """Score every row of a DataFrame with the interview columns (see FIELDS)"""
+    return score_columns(*_frame_columns(frame))
+
+
+def score_bulk(frame, workers: Optional[int] = None, chunk_rows: int = BULK_SCORING_CHUNK_ROWS):
+    """
+    Score a DataFrame, splitting inputs larger than chunk_rows across a
+    process pool
+
+    Args:
+        frame: DataFrame with the interview columns (see FIELDS)
+        workers: Worker processes (default BULK_SCORING_WORKERS, 0 = one per CPU)
+        chunk_rows: Rows per worker task
+
+    Returns:
+        float64 array of scores aligned with frame's rows
+    """
+    import numpy as np
+    import multiprocessing
+
+    columns = _frame_columns(frame)
+    n = len(frame)
+    if workers is None:
+        workers = BULK_SCORING_WORKERS or os.cpu_count() or 1
+    if workers <= 1 or n <= chunk_rows:
+        return score_columns(*columns)
+
+    chunks = [
+        tuple(column[start:start + chunk_rows] for column in columns)
+        for start in range(0, n, chunk_rows)
+    ]
+    # spawn: forking a process that runs server threads is unsafe
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        return np.concatenate(list(pool.map(_score_chunk, chunks)))
+
+
+def never_lower(current_scores, new_scores):
+    """The interview rule in bulk: keep the new score only where it is higher (NaN keeps the current one)"""
+    import numpy as np
+
+    current_scores = np.asarray(current_scores, dtype=np.float64)
+    new_scores = np.asarray(new_scores, dtype=np.float64)
+    return np.where(new_scores > current_scores, new_scores, current_scores)
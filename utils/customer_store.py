@@ -0,0 +1,197 @@
+"""
+Customer table as a snapshot (clientes.csv) plus a journal of changes
+
+Score and limit changes are appended to the journal (utils/journal.py)
+instead of rewriting clientes.csv. The table every session reads is the last
+snapshot with the active journal segment replayed over it; other processes
+pick up new events by tailing the segment. Every JOURNAL_SNAPSHOT_EVERY
+events the table is compacted into a new snapshot and the journal rotates
+to a fresh segment; older segments stay on disk as the change history.
+
+Events set column values ({"set": {"score": 710.0}}), so replaying an event
+that is already part of the snapshot is harmless; this is what makes a
+crash between writing the snapshot and rotating the journal safe.
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from config import CUSTOMERS_FILE, JOURNAL_DIR, JOURNAL_GROUP_COMMIT_MS, JOURNAL_SNAPSHOT_EVERY, JOURNAL_APPEND_TIMEOUT_SECONDS
+from utils.journal import EventJournal, write_atomic
+from utils.metrics import STORAGE_SECONDS, timer
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def apply_events(table: "pd.DataFrame", events: List[Dict]) -> "pd.DataFrame":
+    """Apply the "set" part of events in place, last write per (cpf, column) wins"""
+    updates: Dict[str, Dict[str, object]] = {}
+    for event in events:
+        for column, value in (event.get("set") or {}).items():
+            updates.setdefault(column, {})[event["cpf"]] = value
+    for column, by_cpf in updates.items():
+        mask = table["cpf"].isin(by_cpf.keys())
+        table.loc[mask, column] = table.loc[mask, "cpf"].map(by_cpf)
+    return table
+
+
+class CustomerStore:
+    """
+    Materialized customer table kept in sync with the snapshot and the journal
+
+    get() returns a shared DataFrame that must be treated as read-only; each
+    change produces a new one, so readers never see a half-applied update.
+    """
+
+    def __init__(self, snapshot_path: str, journal: EventJournal, snapshot_every: int):
+        self.snapshot_path = snapshot_path
+        self.journal = journal
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._table: Optional["pd.DataFrame"] = None
+        self._source: Optional[Tuple] = None
+        self._segment = 0
+        self._offset = 0
+        self._segment_events = 0
+        self._stats = {"hits": 0, "loads": 0, "tails": 0, "replayed": 0, "snapshots": 0}
+
+    def _sources(self) -> Tuple:
+        """What a full reload depends on: the snapshot file and the active segment number"""
+        return _signature(self.snapshot_path), _signature(self.journal.path(EventJournal.META_FILE))
+
+    def get(self) -> "pd.DataFrame":
+        """Current table: reloaded when a new snapshot appears, tailed when the journal grows"""
+        sources = self._sources()
+        table = self._table
+        if table is not None and sources == self._source and self._segment_size() == self._offset:
+            self._stats["hits"] += 1
+            return table
+        with self._lock:
+            if self._table is None or sources != self._source:
+                self._reload(sources)
+            else:
+                self._tail()
+            return self._table
+
+    def get_with_position(self) -> Tuple["pd.DataFrame", Tuple[int, int]]:
+        """
+        Current table and the journal position (segment, byte offset) it
+        includes, for callers that derive a replacement table from it
+        """
+        self.get()
+        with self._lock:
+            self._tail()
+            return self._table, (self._segment, self._offset)
+
+    def _segment_size(self) -> int:
+        signature = _signature(self.journal.segment_path(self._segment))
+        return signature[1] if signature else 0
+
+    def _reload(self, sources: Tuple) -> None:
+        import pandas as pd
+
+        segment = self.journal.read_meta()["segment"]
+        with timer(STORAGE_SECONDS, store="customers", op="read"):
+            table = pd.read_csv(self.snapshot_path, dtype={"cpf": str})
+        with timer(STORAGE_SECONDS, store="journal", op="read"):
+            events, offset = self.journal.read(segment)
+        self._table = apply_events(table, events)
+        self._source = sources
+        self._segment, self._offset, self._segment_events = segment, offset, len(events)
+        self._stats["loads"] += 1
+        self._stats["replayed"] += len(events)
+        print(f"[CustomerStore] Loaded {self.snapshot_path} and replayed {len(events)} journal events")
+
+    def _tail(self) -> None:
+        with timer(STORAGE_SECONDS, store="journal", op="read"):
+            events, offset = self.journal.read(self._segment, self._offset)
+        if events:
+            self._table = apply_events(self._table.copy(), events)
+            self._segment_events += len(events)
+        self._offset = offset
+        self._stats["tails"] += 1
+
+    def record(self, events: List[Dict]) -> "pd.DataFrame":
+        """
+        Make events durable, then return the table including them. Takes a
+        snapshot once the active segment holds JOURNAL_SNAPSHOT_EVERY events.
+        """
+        self.journal.append(events)
+        table = self.get()
+        if self.snapshot_every and self._segment_events >= self.snapshot_every:
+            self.snapshot()
+            table = self.get()
+        return table
+
+    def snapshot(self, table: Optional["pd.DataFrame"] = None, since: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Compact the current table into a new snapshot and rotate the journal
+        to a new segment
+
+        Args:
+            table: Replacement for the current table (e.g. a bulk rescore),
+                derived from the table returned by get_with_position()
+            since: The position get_with_position() returned with it; events
+                journaled after it are replayed over the replacement, so
+                changes made while it was being computed are kept
+        """
+        if table is not None and since is None:
+            raise ValueError("A replacement table needs the journal position it was derived from")
+        with self.journal.locked():
+            segment = self.journal.read_meta()["segment"]
+            if table is None:
+                # Appends are blocked while the lock is held, so this is the final state
+                table = self.get()
+            else:
+                since_segment, since_offset = since
+                events = []
+                for s in range(since_segment, segment + 1):
+                    events.extend(self.journal.read(s, since_offset if s == since_segment else 0)[0])
+                if events:
+                    table = apply_events(table.copy(), events)
+                    print(f"[CustomerStore] Replayed {len(events)} events journaled since the table was read")
+            with timer(STORAGE_SECONDS, store="customers", op="write"):
+                write_atomic(self.snapshot_path, table.to_csv(index=False).encode("utf-8"))
+            self.journal.write_meta({"segment": segment + 1})
+            with self._lock:
+                # The written table is the new state; no need to parse it back
+                self._table = table
+                self._source = self._sources()
+                self._segment, self._offset, self._segment_events = segment + 1, 0, 0
+                self._stats["snapshots"] += 1
+            print(f"[CustomerStore] Snapshot written, journal rotated to segment {segment + 1}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                **self._stats,
+                "rows": 0 if self._table is None else len(self._table),
+                "segment": self._segment,
+                "segment_events": self._segment_events,
+                "journal": self.journal.stats(),
+            }
+
+
+def read_customers(path: str) -> "pd.DataFrame":
+    """Customer table at path: the live store for clientes.csv, a plain read otherwise"""
+    if os.path.abspath(path) == os.path.abspath(CUSTOMER_STORE.snapshot_path):
+        return CUSTOMER_STORE.get()
+    import pandas as pd
+
+    return pd.read_csv(path, dtype={"cpf": str})
+
+
+CUSTOMER_STORE = CustomerStore(
+    CUSTOMERS_FILE,
+    EventJournal(JOURNAL_DIR, group_commit_ms=JOURNAL_GROUP_COMMIT_MS, append_timeout=JOURNAL_APPEND_TIMEOUT_SECONDS),
+    JOURNAL_SNAPSHOT_EVERY,
+)
@@ -0,0 +1,60 @@
+"""
+Process-wide cache of parsed data files, reloaded when the file changes on disk
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Tuple
+from utils.metrics import STORAGE_SECONDS, timer
+
+
+class FileBackedCache:
+    """
+    Caches loader(path) per absolute path and reuses it while the file's
+    (mtime, size) signature is unchanged. Writers in this process call
+    invalidate() after writing; external edits are picked up by the signature.
+
+    Cached values are shared between sessions and must be treated as
+    read-only; callers that modify them work on a copy.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], name: str = "data_cache"):
+        self.loader = loader
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._stats = {"hits": 0, "loads": 0}
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path: str) -> Any:
+        """Return the parsed file, loading it on first use or after it changed"""
+        key = os.path.abspath(path)
+        signature = self._signature(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            self._stats["hits"] += 1
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._stats["hits"] += 1
+                return entry[1]
+            with timer(STORAGE_SECONDS, store=self.name, op="read"):
+                value = self.loader(key)
+            self._entries[key] = (signature, value)
+            self._stats["loads"] += 1
+            print(f"[{self.name}] Loaded {path}")
+            return value
+
+    def invalidate(self, path: str) -> None:
+        """Drop the cached copy of a file this process just wrote"""
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
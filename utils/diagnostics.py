@@ -0,0 +1,280 @@
+"""
+Operator diagnostics: live sessions and memory, cache statistics, slowest
+recent turns and an in-process sampling CPU profiler
+
+Used by the operator page (pages/) and GET /diagnostics in the API. Nothing
+here runs unless an operator asks for it; tracemalloc in particular is only
+started on demand, since it slows every allocation while active.
+"""
+
+import os
+import sys
+import time
+import threading
+import sysconfig
+import functools
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STDLIB = os.path.realpath(sysconfig.get_paths()["stdlib"])
+
+# Standard library modules a thread's innermost Python frame is in while it
+# waits rather than works (locks and conditions, queues, selectors, sockets,
+# idle pool workers). Classified by file, not function name: the app's own
+# get() or wait() methods are real work and must show up in the profile
+IDLE_MODULES = {
+    "threading.py",
+    "queue.py",
+    "selectors.py",
+    "socket.py",
+    "ssl.py",
+    "socketserver.py",
+    "concurrent/futures/thread.py",
+}
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Size and hit counters of every process-wide cache, by name"""
+    from tools.credit_tools import POLICY_CACHE, REQUEST_INDEX
+    from tools.exchange_tools import get_rate_cache_stats
+    from utils.customer_store import CUSTOMER_STORE
+    from utils.faq_cache import FAQ_CACHE
+    from utils.idempotency import IDEMPOTENCY_INDEX
+    from utils.http_client import get_http_pool_stats
+    from utils.llm_client import TIER_STATS
+    from utils.admission import get_admission_stats
+
+    return {
+        "customers": CUSTOMER_STORE.stats(),
+        "credit_policy": POLICY_CACHE.stats(),
+        "request_index": REQUEST_INDEX.stats(),
+        "exchange_rates": get_rate_cache_stats(),
+        "faq": FAQ_CACHE.stats(),
+        "idempotency": IDEMPOTENCY_INDEX.stats(),
+        "http_pool": get_http_pool_stats(),
+        "llm_tiers": TIER_STATS.summary(),
+        "admission": get_admission_stats(),
+    }
+
+
+def _session_row(session) -> Dict:
+    return {
+        "session_id": session.session_id,
+        "agent": session.current_agent,
+        "authenticated": session.authenticated,
+        "messages": len(session.history),
+        "turns": session.usage.turn,
+        "idle_seconds": round(session.idle_seconds(), 1),
+        "memory_kb": round(session.memory_footprint() / 1024, 1),
+    }
+
+
+def live_sessions(registry) -> List[Dict]:
+    """Sessions held in memory with their approximate retained size, largest first"""
+    rows = [_session_row(session) for session in registry.live_sessions()]
+    return sorted(rows, key=lambda r: r["memory_kb"], reverse=True)
+
+
+def active_sessions(store, within_seconds: float, limit: int = 50) -> List[Dict]:
+    """
+    Sessions of a store active in the last within_seconds, most recent first,
+    with the size they take once loaded. For processes that load sessions
+    per request (the API) instead of keeping them in the registry.
+    """
+    from utils.session_manager import SessionManager
+
+    rows = []
+    for session_id in store.active_ids(time.time() - within_seconds, limit):
+        session = SessionManager.load(store, session_id)
+        if session is not None:
+            rows.append(_session_row(session))
+    return rows
+
+
+class MemoryTracker:
+    """tracemalloc on demand: top allocation sites and growth between snapshots"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            print("[Diagnostics] tracemalloc started")
+
+    def stop(self) -> None:
+        with self._lock:
+            self._previous = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            print("[Diagnostics] tracemalloc stopped")
+
+    def snapshot(self, limit: int = 20, app_only: bool = False) -> Dict:
+        """
+        Top allocation sites by size, and by growth since the previous
+        snapshot. Only allocations made since start() are visible.
+        """
+        if not tracemalloc.is_tracing():
+            return {"active": False}
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        if app_only:
+            snapshot = snapshot.filter_traces([tracemalloc.Filter(True, os.path.join(ROOT, "*"))])
+
+        def _site(stat) -> str:
+            frame = stat.traceback[0]
+            return f"{os.path.relpath(frame.filename, ROOT) if frame.filename.startswith(ROOT) else frame.filename}:{frame.lineno}"
+
+        top = [
+            {"site": _site(s), "size_kb": round(s.size / 1024, 1), "count": s.count}
+            for s in snapshot.statistics("lineno")[:limit]
+        ]
+        with self._lock:
+            growth = []
+            if self._previous is not None:
+                growth = [
+                    {"site": _site(s), "growth_kb": round(s.size_diff / 1024, 1), "count_diff": s.count_diff}
+                    for s in snapshot.compare_to(self._previous, "lineno")[:limit]
+                    if s.size_diff > 0
+                ]
+            self._previous = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "active": True,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": top,
+            "growth": growth,
+        }
+
+
+MEMORY_TRACKER = MemoryTracker()
+
+
+def slowest_turns(limit: int = 10) -> List[Dict]:
+    """Slowest sampled turns still in memory, each with its span tree"""
+    from utils.tracing import recent_traces
+
+    turns = []
+    for spans in recent_traces():
+        root = spans[-1]
+        if root.name != "turn":
+            continue
+        turns.append((root.end_ns - root.start_ns, root, spans))
+    turns.sort(key=lambda t: t[0], reverse=True)
+
+    result = []
+    for duration_ns, root, spans in turns[:limit]:
+        result.append({
+            "trace_id": root.trace_id,
+            "session_id": root.attributes.get("session.id"),
+            "agent": f"{root.attributes.get('agent.entry')} -> {root.attributes.get('agent.exit')}",
+            "duration_ms": round(duration_ns / 1e6, 1),
+            "llm_calls": root.attributes.get("llm.calls"),
+            "spans": _span_tree(root, spans),
+        })
+    return result
+
+
+def _span_tree(root, spans) -> List[Dict]:
+    """Spans in start order with their depth, offset from the turn start and duration"""
+    children: Dict[str, list] = {}
+    for s in spans:
+        if s.parent is not None:
+            children.setdefault(s.parent.span_id, []).append(s)
+
+    rows = []
+
+    def walk(s, depth: int) -> None:
+        rows.append({
+            "span": s.name,
+            "depth": depth,
+            "offset_ms": round((s.start_ns - root.start_ns) / 1e6, 1),
+            "duration_ms": round((s.end_ns - s.start_ns) / 1e6, 1),
+            "error": s.status_message or None,
+        })
+        for child in sorted(children.get(s.span_id, []), key=lambda c: c.start_ns):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return rows
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_idle_file(filename: str) -> bool:
+    path = os.path.realpath(filename)
+    if not path.startswith(STDLIB + os.sep):
+        return False
+    return os.path.relpath(path, STDLIB).replace(os.sep, "/") in IDLE_MODULES
+
+
+def _is_idle(frame) -> bool:
+    """Whether the innermost frame of a thread is a standard library wait"""
+    return _is_idle_file(frame.f_code.co_filename)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(ROOT):
+        filename = os.path.relpath(filename, ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def sample_cpu(seconds: float, interval: float = 0.005, include_idle: bool = False) -> Tuple[str, Dict]:
+    """
+    Sample every other thread's stack for `seconds` and aggregate them
+
+    Returns:
+        (collapsed stacks, one "thread;outer;...;inner count" line each, the
+        format of flamegraph.pl and speedscope; summary with the top
+        functions by samples where they were on CPU)
+    """
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    stacks: Counter = Counter()
+    leaves: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if not include_idle and _is_idle(frame):
+                continue
+            leaf = _frame_label(frame)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(labels))] += 1
+            leaves[leaf] += 1
+        samples += 1
+        time.sleep(interval)
+
+    collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+    total = sum(leaves.values()) or 1
+    summary = {
+        "seconds": seconds,
+        "samples": samples,
+        "top_functions": [
+            {"function": fn, "samples": n, "share": round(n / total, 3)}
+            for fn, n in leaves.most_common(20)
+        ],
+    }
+    print(f"[Diagnostics] CPU profile: {samples} samples over {seconds:.0f}s")
+    return collapsed, summary
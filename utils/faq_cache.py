@@ -0,0 +1,320 @@
+"""
+Local FAQ layer answering generic questions without any LLM call
+
+Messages are normalized (lowercase, accents and punctuation stripped) and
+compared by Jaccard similarity of their character trigrams. Candidates come
+from a MinHash/LSH index, so a lookup only scores the few entries sharing a
+band with the message, not the whole FAQ.
+
+Only questions are looked up (a "?" or a question opener such as "como" or
+"o que"): requests like "quero pedir aumento de limite" always reach the
+agents, however close they are to a FAQ question. The orchestrator consults
+the cache only in triage before authentication.
+
+Entries come from two places:
+    FAQ_FILE          curated questions and answers, always kept
+    FAQ_LEARNED_FILE  LLM answers approved by an operator
+                      (scripts/faq_review.py), bounded by FAQ_MAX_ENTRIES
+                      with LRU eviction; the file is compacted to the kept
+                      entries once it holds twice that many lines
+
+Direct LLM answers to generic questions are proposed to FAQ_PENDING_FILE
+(at most FAQ_MAX_ENTRIES awaiting review); nothing the model says is served
+from the cache until approved.
+"""
+
+import os
+import re
+import json
+import random
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from config import (
+    FAQ_ENABLED,
+    FAQ_FILE,
+    FAQ_LEARNED_FILE,
+    FAQ_PENDING_FILE,
+    FAQ_MAX_ENTRIES,
+    FAQ_MATCH_THRESHOLD,
+)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240607)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+_DIGIT = re.compile(r"\d")
+_QUESTION_OPENERS = (
+    "como ", "o que ", "qual ", "quais ", "quando ", "onde ", "por que ", "porque ",
+    "quanto ", "quantos ", "quantas ", "quem ", "posso ", "pode ", "voces ", "voce ",
+    "existe ", "e possivel ", "ha ",
+)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text)).strip()
+
+
+def shingles(normalized: str) -> Set[str]:
+    """Character trigrams of the normalized text, padded so short words still count"""
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def minhash(grams: Set[str]) -> Tuple[int, ...]:
+    hashes = [zlib.crc32(g.encode("utf-8")) for g in grams]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def is_transactional(message: str) -> bool:
+    """Messages carrying digits (CPF, amounts, dates) always go to the agents"""
+    return bool(_DIGIT.search(message))
+
+
+def is_question(message: str) -> bool:
+    """A question mark or a question opener; statements and requests are not looked up"""
+    if message.strip().endswith("?"):
+        return True
+    return f"{normalize(message)} ".startswith(_QUESTION_OPENERS)
+
+
+class FAQHit(NamedTuple):
+    question: str
+    answer: str
+    similarity: float
+
+
+class _Entry:
+    __slots__ = ("question", "answer", "grams", "bands", "pinned")
+
+    def __init__(self, question: str, answer: str, pinned: bool):
+        self.question = question
+        self.answer = answer
+        self.grams = shingles(normalize(question))
+        signature = minhash(self.grams)
+        self.bands = [(i, signature[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+        self.pinned = pinned
+
+
+class FAQCache:
+    """Curated plus learned question/answer pairs behind an LSH index"""
+
+    def __init__(self, faq_file: str, learned_file: str, pending_file: str, max_entries: int, threshold: float):
+        self.faq_file = faq_file
+        self.learned_file = learned_file
+        self.pending_file = pending_file
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, tuple], Set[str]] = {}
+        self._learned = 0
+        self._learned_lines = 0
+        self._sources: Optional[tuple] = None
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0, "learned": 0, "evicted": 0, "proposed": 0}
+
+    # -- index ----------------------------------------------------------
+
+    def _add(self, question: str, answer: str, pinned: bool) -> None:
+        key = normalize(question)
+        if not key:
+            return
+        if key in self._entries:
+            self._remove(key)
+        entry = _Entry(question, answer, pinned)
+        self._entries[key] = entry
+        for band in entry.bands:
+            self._buckets.setdefault(band, set()).add(key)
+        if not pinned:
+            self._learned += 1
+            while self._learned > self.max_entries:
+                self._evict_oldest_learned()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for band in entry.bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+        if not entry.pinned:
+            self._learned -= 1
+
+    def _evict_oldest_learned(self) -> None:
+        for key, entry in self._entries.items():
+            if not entry.pinned:
+                self._remove(key)
+                self._stats["evicted"] += 1
+                return
+
+    # -- loading --------------------------------------------------------
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self) -> None:
+        """(Re)build the index when the curated or learned file changed on disk"""
+        sources = (self._signature(self.faq_file), self._signature(self.learned_file))
+        if sources == self._sources:
+            return
+        with self._lock:
+            if sources == self._sources:
+                return
+            self._entries.clear()
+            self._buckets.clear()
+            self._learned = 0
+            for item in self._read_faq():
+                for question in item["questions"]:
+                    self._add(question, item["answer"], pinned=True)
+            learned = self._read_jsonl(self.learned_file)
+            for item in learned:
+                self._add(item["question"], item["answer"], pinned=False)
+            self._learned_lines = len(learned)
+            self._sources = sources
+            print(f"[FAQCache] Indexed {len(self._entries)} questions ({self._learned} learned)")
+
+    def _read_faq(self) -> List[Dict]:
+        try:
+            with open(self.faq_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _read_jsonl(path: str) -> List[Dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    # -- lookups --------------------------------------------------------
+
+    def _best(self, message: str) -> Optional[Tuple[float, str]]:
+        """(similarity, key) of the closest entry at or above the threshold; caller holds the lock"""
+        normalized = normalize(message)
+        if not normalized:
+            return None
+        grams = shingles(normalized)
+        signature = minhash(grams)
+        candidates: Set[str] = set()
+        for i in range(BANDS):
+            candidates |= self._buckets.get((i, signature[i * ROWS:(i + 1) * ROWS]), set())
+
+        best: Optional[Tuple[float, str]] = None
+        for key in candidates:
+            entry = self._entries[key]
+            similarity = len(grams & entry.grams) / len(grams | entry.grams)
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, key)
+        return best
+
+    def lookup(self, message: str) -> Optional[FAQHit]:
+        """Answer for a generic question, or None to let the agents handle it"""
+        if is_transactional(message) or not is_question(message):
+            self._stats["skipped"] += 1
+            return None
+        self._refresh()
+        with self._lock:
+            best = self._best(message)
+            if best is None:
+                self._stats["misses"] += 1
+                return None
+            entry = self._entries[best[1]]
+            self._entries.move_to_end(best[1])
+            self._stats["hits"] += 1
+            return FAQHit(entry.question, entry.answer, best[0])
+
+    # -- learning -------------------------------------------------------
+
+    def propose(self, question: str, answer: str) -> bool:
+        """
+        Queue an LLM answer to a generic question for operator review.
+        Answers carrying digits may hold customer data and are never proposed.
+        """
+        if is_transactional(question) or is_transactional(answer) or not is_question(question):
+            return False
+        self._refresh()
+        with self._lock:
+            if self._best(question) is not None:
+                return False
+        pending = self.pending()
+        if len(pending) >= self.max_entries or any(normalize(p["question"]) == normalize(question) for p in pending):
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.pending_file) or ".", exist_ok=True)
+            with open(self.pending_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"question": question, "answer": answer}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[FAQCache] Could not record proposal: {e}")
+            return False
+        self._stats["proposed"] += 1
+        return True
+
+    def learn(self, question: str, answer: str) -> None:
+        """Persist an approved answer and serve it from now on"""
+        self._refresh()
+        os.makedirs(os.path.dirname(self.learned_file) or ".", exist_ok=True)
+        with self._lock:
+            with open(self.learned_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"question": question, "answer": answer}, ensure_ascii=False) + "\n")
+            # Index it in place instead of rebuilding, so LRU order is kept
+            self._add(question, answer, pinned=False)
+            self._learned_lines += 1
+            if self._learned_lines > 2 * self.max_entries:
+                self._compact_learned()
+            self._sources = (self._signature(self.faq_file), self._signature(self.learned_file))
+            self._stats["learned"] += 1
+
+    def _compact_learned(self) -> None:
+        """Rewrite the learned file with only the entries still indexed (caller holds the lock)"""
+        from utils.journal import write_atomic
+
+        kept = [entry for entry in self._entries.values() if not entry.pinned]
+        write_atomic(self.learned_file, "".join(
+            json.dumps({"question": e.question, "answer": e.answer}, ensure_ascii=False) + "\n" for e in kept
+        ).encode("utf-8"))
+        self._learned_lines = len(kept)
+        print(f"[FAQCache] Compacted {self.learned_file} to {len(kept)} entries")
+
+    def pending(self) -> List[Dict]:
+        return self._read_jsonl(self.pending_file)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "learned_entries": self._learned,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+
+FAQ_CACHE = FAQCache(FAQ_FILE, FAQ_LEARNED_FILE, FAQ_PENDING_FILE, FAQ_MAX_ENTRIES, FAQ_MATCH_THRESHOLD)
+
+
+def faq_lookup(message: str) -> Optional[FAQHit]:
+    """FAQ_CACHE.lookup, or None when the FAQ layer is disabled"""
+    return FAQ_CACHE.lookup(message) if FAQ_ENABLED else None
+
+
+def faq_propose(question: str, answer: str) -> bool:
+    """FAQ_CACHE.propose, or False when the FAQ layer is disabled"""
+    return FAQ_CACHE.propose(question, answer) if FAQ_ENABLED else False
@@ -0,0 +1,71 @@
+"""
+Bounded conversation history shared by the UI and the agents
+"""
+
+import os
+import json
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+class MessageHistory:
+    """
+    Ring buffer of (role, content) pairs. Once full, the oldest message is
+    dropped, or appended to a JSONL audit archive when archive_path is set.
+    """
+
+    __slots__ = ("_messages", "archive_path", "archived_count")
+
+    def __init__(self, max_messages: int, archive_path: Optional[str] = None):
+        self._messages: deque = deque(maxlen=max_messages)
+        self.archive_path = archive_path
+        self.archived_count = 0
+
+    def append(self, role: str, content: str) -> None:
+        """Add a message, spilling the evicted one to the archive if configured"""
+        if len(self._messages) == self._messages.maxlen and self.archive_path:
+            self._spill(self._messages[0])
+        self._messages.append((role, content))
+
+    def _spill(self, message: tuple) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.archive_path) or ".", exist_ok=True)
+            with open(self.archive_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "role": message[0],
+                    "content": message[1],
+                    "archived_at": datetime.now().isoformat(),
+                }, ensure_ascii=False) + "\n")
+            self.archived_count += 1
+        except OSError as e:
+            print(f"[MessageHistory] Archive write failed: {e}")
+
+    def to_list(self) -> List[Dict[str, str]]:
+        """Messages in the {"role", "content"} shape the agents and UI consume"""
+        return [{"role": role, "content": content} for role, content in self._messages]
+
+    def to_state(self) -> Dict:
+        """Plain representation for serialization"""
+        return {
+            "max_messages": self._messages.maxlen,
+            "archive_path": self.archive_path,
+            "archived_count": self.archived_count,
+            "messages": [list(m) for m in self._messages],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "MessageHistory":
+        history = cls(state["max_messages"], state.get("archive_path"))
+        history.archived_count = state.get("archived_count", 0)
+        history._messages.extend(tuple(m) for m in state.get("messages", []))
+        return history
+
+    def clear(self) -> None:
+        self._messages.clear()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self.to_list())
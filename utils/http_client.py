@@ -0,0 +1,195 @@
+"""
+Shared HTTP clients with connection pooling and keep-alive for outbound calls
+"""
+
+import weakref
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_POOL_BLOCK,
+    HTTP_MAX_RETRIES,
+    HTTP_TIMEOUT_SECONDS,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS,
+)
+
+# requests and httpx are imported when the first client is built
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+
+class PoolStats:
+    """In-flight, saturation and connection reuse counters for outbound HTTP"""
+
+    def __init__(self, pool_maxsize: int):
+        self._lock = threading.Lock()
+        self.pool_maxsize = pool_maxsize
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated_requests = 0
+        self.new_connections = 0
+        self._last_pool_total = 0
+
+    def start(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self.in_flight > self.pool_maxsize:
+                self.saturated_requests += 1
+
+    def finish(self, ok: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if not ok:
+                self.errors += 1
+
+    def connection_opened(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def observe_pool_total(self, total: int) -> None:
+        """Account for connections opened since the last observed pool-wide total"""
+        with self._lock:
+            if total > self._last_pool_total:
+                self.new_connections += total - self._last_pool_total
+            self._last_pool_total = total
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "pool_maxsize": self.pool_maxsize,
+                "saturation": self.in_flight / self.pool_maxsize,
+                "saturated_requests": self.saturated_requests,
+                "new_connections": self.new_connections,
+                "connection_reuse_ratio": (
+                    1 - self.new_connections / self.requests if self.requests else 0.0
+                ),
+            }
+
+
+SYNC_STATS = PoolStats(HTTP_POOL_MAXSIZE)
+ASYNC_STATS = PoolStats(HTTP_POOL_MAXSIZE)
+
+_session: Optional["requests.Session"] = None
+# Keyed by the loop itself: a client goes away with its loop, and a new loop
+# can never pick up a client bound to a finished one
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _count_pool_connections(session: "requests.Session") -> int:
+    """Total connections opened so far by the session's urllib3 pools"""
+    total = 0
+    # http:// and https:// are mounted on the same adapter; count its pools once
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+    return total
+
+
+def get_http_session() -> "requests.Session":
+    """Process-wide requests session with a tuned keep-alive connection pool"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=HTTP_POOL_BLOCK,
+                    max_retries=Retry(
+                        total=HTTP_MAX_RETRIES,
+                        backoff_factor=0.2,
+                        status_forcelist=(502, 503, 504),
+                        allowed_methods=("GET",),
+                    ),
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def http_get(url: str, timeout: float = HTTP_TIMEOUT_SECONDS, **kwargs) -> "requests.Response":
+    """GET through the shared pooled session, recording pool metrics"""
+    session = get_http_session()
+    SYNC_STATS.start()
+    ok = False
+    try:
+        response = session.get(url, timeout=timeout, **kwargs)
+        SYNC_STATS.observe_pool_total(_count_pool_connections(session))
+        ok = True
+        return response
+    finally:
+        SYNC_STATS.finish(ok)
+
+
+def get_async_http_client() -> "httpx.AsyncClient":
+    """Pooled async client for the running event loop (httpx clients are loop-bound)"""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=HTTP_MAX_RETRIES),
+        )
+        with _lock:
+            _async_clients[loop] = client
+    return client
+
+
+async def close_async_http_client() -> None:
+    """Close the running loop's client; call before the loop finishes"""
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _trace(event_name: str, info: dict) -> None:
+    """httpcore trace hook: count every new TCP connection"""
+    if event_name == "connection.connect_tcp.complete":
+        ASYNC_STATS.connection_opened()
+
+
+async def async_http_get(url: str, timeout: float = HTTP_TIMEOUT_SECONDS, **kwargs) -> "httpx.Response":
+    """GET through the pooled async client, recording pool metrics"""
+    client = get_async_http_client()
+    ASYNC_STATS.start()
+    ok = False
+    try:
+        response = await client.get(url, timeout=timeout, extensions={"trace": _trace}, **kwargs)
+        ok = True
+        return response
+    finally:
+        ASYNC_STATS.finish(ok)
+
+
+def get_http_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Pool saturation and connection reuse metrics for the sync and async clients"""
+    return {"sync": SYNC_STATS.summary(), "async": ASYNC_STATS.summary()}
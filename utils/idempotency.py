@@ -0,0 +1,107 @@
+"""
+Idempotency keys and a bounded TTL dedup index for side-effecting tools
+
+The orchestrator opens a turn scope (session id + turn id) around every
+turn. Inside it, a tool derives a key from the scope, its name and its
+arguments; a repeated call with the same key (a duplicate tool call from
+the model, a retried turn carrying the same turn id) gets the stored result
+back without touching storage. Outside a turn scope no key is produced and
+tools run normally.
+
+Without a client-supplied turn id (default_turn_id), a message identical to
+the previous turn's message is taken as a retry of that turn and reuses its
+id, whatever the previous turn answered (agents report most failures as a
+normal reply). This covers a UI resend after an error, a timeout or an
+interrupted run. Not covered: a retry with a different wording or after
+another message, a retry served by another process (the index is per
+process) and a retry after IDEMPOTENCY_TTL_SECONDS. Conversely, sending the
+same message twice in a row on purpose is treated as a retry.
+"""
+
+import json
+import time
+import uuid
+import hashlib
+import threading
+import contextlib
+import contextvars
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config import IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_TTL_SECONDS
+
+_scope: contextvars.ContextVar = contextvars.ContextVar("idempotency_scope", default=None)
+
+
+@contextlib.contextmanager
+def turn_scope(session_id: str, turn_id: Any):
+    """Mark the calls made inside as belonging to one turn of one session"""
+    token = _scope.set((session_id, str(turn_id)))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def default_turn_id(message: str, last_turn_key: list) -> Tuple[str, list]:
+    """
+    Turn id for a message without a client-supplied one, and the new value of
+    the session's last_turn_key: the previous turn's id for a resend of its
+    message, a fresh id otherwise
+    """
+    digest = hashlib.sha256(" ".join(message.split()).lower().encode("utf-8")).hexdigest()[:32]
+    if len(last_turn_key) == 2 and last_turn_key[0] == digest:
+        return last_turn_key[1], last_turn_key
+    turn_id = uuid.uuid4().hex
+    return turn_id, [digest, turn_id]
+
+
+def idempotency_key(operation: str, *args: Any) -> Optional[str]:
+    """Key for an operation and its arguments in the current turn, or None outside a turn"""
+    scope = _scope.get()
+    if scope is None:
+        return None
+    payload = json.dumps([*scope, operation, *args], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IdempotencyIndex:
+    """Results by idempotency key, bounded in size (LRU) and age (TTL)"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._stats = {"replays": 0, "stored": 0, "expired": 0, "evicted": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        """Stored result for key, if recorded within the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            result, stored_at = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["replays"] += 1
+            return result
+
+    def put(self, key: str, result: str) -> None:
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            self._stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+IDEMPOTENCY_INDEX = IdempotencyIndex(IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_TTL_SECONDS)
@@ -0,0 +1,235 @@
+"""
+Append-only event journal with group commit
+
+Events are JSON lines appended to the active segment file of a journal
+directory. Callers block in append() until their events are durable; a
+single writer thread gathers everything queued meanwhile (plus up to
+JOURNAL_GROUP_COMMIT_MS more) and makes it durable with one write() and one
+fsync() per batch, so concurrent writers share the cost of a flush.
+
+Layout of the journal directory:
+    meta.json            {"segment": n}: the segment new events go to
+    events-<n>.jsonl     one segment per snapshot generation, never rewritten
+    journal.lock         cross-process lock held while appending or rotating
+
+Segments are rotated by the owner of the snapshot (utils/customer_store.py)
+and kept as history.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import contextlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.metrics import STORAGE_SECONDS, timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are serialized within the process only
+    fcntl = None
+
+
+class EventJournal:
+    """Durable, batched appends of JSON events to the active segment"""
+
+    META_FILE = "meta.json"
+    LOCK_FILE = "journal.lock"
+
+    def __init__(self, directory: str, group_commit_ms: float = 2.0, max_batch: int = 512, append_timeout: float = 10.0):
+        self.directory = directory
+        self.group_commit_seconds = group_commit_ms / 1000
+        self.max_batch = max_batch
+        self.append_timeout = append_timeout
+        self._queue: "queue.Queue[Tuple[bytes, int, threading.Event, list]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stats = {"events": 0, "batches": 0, "fsyncs": 0, "errors": 0, "timeouts": 0, "restarts": 0}
+
+    # -- layout ---------------------------------------------------------
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def segment_path(self, segment: int) -> str:
+        return self.path(f"events-{segment:06d}.jsonl")
+
+    def read_meta(self) -> Dict:
+        try:
+            with open(self.path(self.META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"segment": 1}
+
+    def write_meta(self, meta: Dict) -> None:
+        """Atomically replace meta.json (caller holds locked())"""
+        write_atomic(self.path(self.META_FILE), json.dumps(meta).encode("utf-8"))
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Exclusive access to the journal across threads and processes"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._write_lock:
+            with open(self.path(self.LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # -- writing --------------------------------------------------------
+
+    def append(self, events: List[Dict]) -> None:
+        """
+        Append events as one unit and return once they are on disk
+
+        Raises:
+            OSError: the batch holding these events could not be written
+            TimeoutError: the events were not durable within append_timeout;
+                they may still be written later
+        """
+        if not events:
+            return
+        stamp = datetime.now().isoformat()
+        data = b"".join(
+            json.dumps({"ts": stamp, **event}, ensure_ascii=False).encode("utf-8") + b"\n"
+            for event in events
+        )
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        done = threading.Event()
+        outcome: list = []
+        self._queue.put((data, len(events), done, outcome))
+        if not done.wait(self.append_timeout):
+            self._stats["timeouts"] += 1
+            raise TimeoutError(f"Journal append not durable after {self.append_timeout:g}s")
+        if outcome:
+            raise outcome[0]
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    print("[Journal] Writer thread died, restarting it")
+                    self._stats["restarts"] += 1
+                self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.group_commit_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            error = None
+            try:
+                self._write(b"".join(item[0] for item in batch))
+                self._stats["batches"] += 1
+                self._stats["fsyncs"] += 1
+                self._stats["events"] += sum(item[1] for item in batch)
+            except Exception as e:
+                # Any failure (e.g. a corrupt meta.json) fails this batch only;
+                # the writer keeps serving later appends
+                print(f"[Journal] Batch of {len(batch)} appends failed: {e}")
+                self._stats["errors"] += 1
+                error = e if isinstance(e, OSError) else OSError(f"Journal write failed: {e}")
+            finally:
+                for _, _, done, outcome in batch:
+                    if error is not None:
+                        outcome.append(error)
+                    done.set()
+
+    @timed(STORAGE_SECONDS, store="journal", op="write")
+    def _write(self, data: bytes) -> None:
+        with self.locked():
+            path = self.segment_path(self.read_meta()["segment"])
+            fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                _drop_torn_tail(fd, path)
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    # -- reading --------------------------------------------------------
+
+    def read(self, segment: int, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Events of a segment from a byte offset, up to the last complete line
+
+        Returns:
+            (events, offset just past the last complete line read)
+        """
+        try:
+            with open(self.segment_path(segment), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                print(f"[Journal] Skipping unreadable event in segment {segment}")
+        return events, offset + end
+
+    def iter_events(self) -> Iterator[Dict]:
+        """Every event of every segment, oldest first"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith("events-") and name.endswith(".jsonl"):
+                yield from self.read(int(name[7:-6]))[0]
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self._stats)
+        stats["avg_batch_events"] = stats["events"] / stats["batches"] if stats["batches"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+def _drop_torn_tail(fd: int, path: str) -> None:
+    """Cut a partial last line left by a writer that crashed mid-append"""
+    size = os.fstat(fd).st_size
+    if size == 0:
+        return
+    os.lseek(fd, size - 1, os.SEEK_SET)
+    if os.read(fd, 1) == b"\n":
+        return
+    os.lseek(fd, 0, os.SEEK_SET)
+    keep = os.read(fd, size).rfind(b"\n") + 1
+    os.ftruncate(fd, keep)
+    print(f"[Journal] Dropped {size - keep} bytes of a torn append in {path}")
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write through a temporary file, fsync it and rename it into place"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path) or ".")
+
+
+def _fsync_dir(directory: str) -> None:
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
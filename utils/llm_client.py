@@ -0,0 +1,225 @@
+"""
+Shared LLM client construction, tier routing and accounted invocation
+"""
+
+import time
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+from config import (
+    require_groq_api_key,
+    LLM_TEMPERATURE,
+    LLM_MAX_TOKENS,
+    LLM_CALL_SITE_MAX_TOKENS,
+    LLM_TIER_MODELS,
+    LLM_DEFAULT_TIER,
+    LLM_CALL_SITE_TIERS,
+    TRACE_CAPTURE_LLM_CONTENT,
+)
+from utils.usage_ledger import GLOBAL_USAGE
+from utils.tracing import span
+from utils.metrics import LLM_SECONDS, LLM_TOKENS, LLM_ERRORS
+
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+
+class TierStats:
+    """Latency, error and validity counters per model tier"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_tier: Dict[str, Dict[str, float]] = {}
+
+    def record(self, tier: str, latency_ms: float, ok: bool, valid: bool, fallback: bool) -> None:
+        with self._lock:
+            stats = self.by_tier.setdefault(tier, {
+                "calls": 0,
+                "errors": 0,
+                "invalid": 0,
+                "fallbacks": 0,
+                "latency_ms": 0.0,
+            })
+            stats["calls"] += 1
+            stats["latency_ms"] += latency_ms
+            stats["errors"] += 0 if ok else 1
+            stats["invalid"] += 1 if ok and not valid else 0
+            stats["fallbacks"] += 1 if fallback else 0
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per tier totals plus average latency and accuracy (valid answers / calls)"""
+        with self._lock:
+            out = {}
+            for tier, stats in self.by_tier.items():
+                calls = stats["calls"] or 1
+                out[tier] = {
+                    **stats,
+                    "avg_latency_ms": stats["latency_ms"] / calls,
+                    "accuracy": (stats["calls"] - stats["errors"] - stats["invalid"]) / calls,
+                }
+            return out
+
+
+TIER_STATS = TierStats()
+
+_models: Dict[str, "ChatGroq"] = {}
+_runnables: Dict[tuple, object] = {}
+_models_lock = threading.Lock()
+_model_factory: Optional[Callable[[str], object]] = None
+
+
+def build_chat_model(tier: str = LLM_DEFAULT_TIER) -> "ChatGroq":
+    """Build a ChatGroq client for a tier with the configured temperature and global output cap"""
+    # Imported on first use: langchain_groq is the slowest import in the app
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        api_key=require_groq_api_key(),
+        model_name=LLM_TIER_MODELS[tier],
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS,
+    )
+
+
+def set_chat_model_factory(factory: Optional[Callable[[str], object]]) -> None:
+    """
+    Replace how per-tier chat models are built (e.g. a fake model for load
+    tests). The factory receives the tier name and must return an object with
+    bind_tools() and invoke(). Pass None to restore ChatGroq.
+    """
+    global _model_factory
+    with _models_lock:
+        _model_factory = factory
+        _models.clear()
+        _runnables.clear()
+
+
+def get_runnable(tier: str, tools: Optional[list] = None):
+    """Return the cached client for a tier, bound to the given tools if any"""
+    key = (tier, tuple(t.name for t in tools or []))
+    runnable = _runnables.get(key)
+    if runnable is not None:
+        return runnable
+    with _models_lock:
+        if tier not in _models:
+            _models[tier] = (_model_factory or build_chat_model)(tier)
+        runnable = _models[tier].bind_tools(tools) if tools else _models[tier]
+        _runnables[key] = runnable
+    return runnable
+
+
+def get_tier(call_site: str) -> str:
+    """Configured model tier for a call site"""
+    return LLM_CALL_SITE_TIERS.get(call_site, LLM_DEFAULT_TIER)
+
+
+def get_max_tokens(call_site: str) -> int:
+    """Output cap for a call site, never above LLM_MAX_TOKENS"""
+    return min(LLM_CALL_SITE_MAX_TOKENS.get(call_site, LLM_MAX_TOKENS), LLM_MAX_TOKENS)
+
+
+def _extract_usage(result) -> tuple[int, int]:
+    """Read (prompt_tokens, completion_tokens) from an AIMessage"""
+    usage = getattr(result, "usage_metadata", None) or {}
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (getattr(result, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+def invoke_llm(
+    call_site: str,
+    llm_input,
+    session_manager=None,
+    tools: Optional[list] = None,
+    validate: Optional[Callable] = None,
+):
+    """
+    Invoke the model tier configured for a call site with its output cap,
+    falling back to the other tier on errors or invalid answers, and record
+    tokens and latency in the session and process-wide ledgers
+
+    Args:
+        call_site: Identifier in the form '<agent>.<site>', e.g. 'credit.tools'
+        llm_input: Messages or prompt string
+        session_manager: Session whose ledger receives the call, if any
+        tools: Tools to bind for tool-calling sites
+        validate: Optional check on the AIMessage; a False result counts as
+            an inaccurate answer and triggers the fallback tier
+
+    Returns:
+        The model's AIMessage
+    """
+    max_tokens = get_max_tokens(call_site)
+    primary = get_tier(call_site)
+    tiers = [primary] + [t for t in LLM_TIER_MODELS if t != primary]
+
+    result = None
+    last_error: Optional[Exception] = None
+    for attempt, tier in enumerate(tiers):
+        is_last = attempt == len(tiers) - 1
+        with span("llm.invoke", **{
+            "llm.call_site": call_site,
+            "llm.tier": tier,
+            "llm.max_tokens": max_tokens,
+            "llm.fallback": attempt > 0,
+        }) as llm_span:
+            if TRACE_CAPTURE_LLM_CONTENT:
+                llm_span.set_attribute("llm.input", lambda: repr(llm_input))
+            start = time.perf_counter()
+            try:
+                result = get_runnable(tier, tools).invoke(llm_input, max_tokens=max_tokens)
+            except Exception as e:
+                latency_ms = (time.perf_counter() - start) * 1000
+                TIER_STATS.record(tier, latency_ms, ok=False, valid=False, fallback=attempt > 0)
+                LLM_ERRORS.labels(call_site=call_site, tier=tier).inc()
+                print(f"[LLM] {call_site} failed on tier '{tier}': {e}")
+                llm_span.set_attributes(**{"error": True, "exception.message": str(e)})
+                last_error = e
+                continue
+            latency_ms = (time.perf_counter() - start) * 1000
+
+            valid = True
+            if validate is not None:
+                try:
+                    valid = bool(validate(result))
+                except Exception:
+                    valid = False
+            TIER_STATS.record(tier, latency_ms, ok=True, valid=valid, fallback=attempt > 0)
+
+            prompt_tokens, completion_tokens = _extract_usage(result)
+            finish_reason = (getattr(result, "response_metadata", None) or {}).get("finish_reason")
+            truncated = finish_reason == "length"
+            if truncated:
+                print(f"[LLM] {call_site} hit output cap of {max_tokens} tokens")
+
+            GLOBAL_USAGE.record(call_site, prompt_tokens, completion_tokens, latency_ms, truncated)
+            LLM_SECONDS.labels(call_site=call_site, tier=tier).observe(latency_ms / 1000)
+            LLM_TOKENS.labels(call_site=call_site, kind="prompt").observe(prompt_tokens)
+            LLM_TOKENS.labels(call_site=call_site, kind="completion").observe(completion_tokens)
+            ledger = getattr(session_manager, "usage", None)
+            if ledger is not None:
+                ledger.record(call_site, prompt_tokens, completion_tokens, latency_ms, truncated)
+
+            output = result
+            llm_span.set_attributes(**{
+                "llm.prompt_tokens": prompt_tokens,
+                "llm.completion_tokens": completion_tokens,
+                "llm.finish_reason": finish_reason,
+                "llm.valid": valid,
+            })
+            if TRACE_CAPTURE_LLM_CONTENT:
+                llm_span.set_attribute(
+                    "llm.output", lambda: repr(output.content or output.additional_kwargs.get("tool_calls"))
+                )
+            print(
+                f"[LLM] {call_site} [{tier}]: prompt={prompt_tokens} completion={completion_tokens} "
+                f"latency={latency_ms:.0f}ms cap={max_tokens}"
+            )
+
+        if valid or is_last:
+            return result
+        print(f"[LLM] {call_site} invalid answer on tier '{tier}', falling back")
+
+    if result is not None:
+        return result
+    raise last_error
@@ -0,0 +1,265 @@
+"""
+Process-wide counters and histograms in the Prometheus text format
+
+Recording takes no lock on the hot path: every thread adds to its own shard
+of a metric's values and only a scrape sums the shards. A lock is taken only
+the first time a thread or a label combination is seen. Thread ids are
+reused by the OS, so shards stay bounded by the peak number of threads.
+
+Exposed by GET /metrics in the API and, for the Streamlit app, by a small
+HTTP server on METRICS_PORT.
+
+Usage:
+    TOOL_SECONDS.labels(tool="check_credit_limit").observe(0.012)
+
+    with timer(STORAGE_SECONDS, store="journal", op="write"):
+        ...
+"""
+
+import time
+import bisect
+import threading
+import functools
+import contextlib
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STORAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class _Child:
+    """Values of one label combination, one shard per recording thread"""
+
+    __slots__ = ("_shards", "_lock", "_width")
+
+    def __init__(self, width: int):
+        self._shards: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+        self._width = width
+
+    def _shard(self) -> List[float]:
+        shard = self._shards.get(threading.get_ident())
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(threading.get_ident(), [0] * self._width)
+        return shard
+
+    def values(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards.values())
+        totals = [0] * self._width
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class CounterChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount: float = 1) -> None:
+        self._shard()[0] += amount
+
+
+class HistogramChild(_Child):
+    """Shard layout: one count per bucket (the last one is +Inf), then the sum"""
+
+    __slots__ = ("_bounds",)
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        super().__init__(len(bounds) + 2)
+        self._bounds = bounds
+
+    def observe(self, value: float) -> None:
+        shard = self._shard()
+        shard[bisect.bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _Child] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        REGISTRY.append(self)
+
+    def _new_child(self) -> _Child:
+        raise NotImplementedError
+
+    def labels(self, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], _Child]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def _label_text(self, key: Tuple[str, ...], **extra: str) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra.items())
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(child.values()[0])}" for key, child in self._items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in self._items():
+            values = child.values()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(float(bound))
+                lines.append(f"{self.name}_bucket{self._label_text(key, le=le)} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {_number(cumulative)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in list(REGISTRY):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def timer(histogram: Histogram, **labels: str):
+    """Observe the duration of the block in seconds, whether it raises or not"""
+    child = histogram.labels(**labels)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        child.observe(time.perf_counter() - start)
+
+
+def timed(histogram: Histogram, **labels: str) -> Callable:
+    """Decorator observing the duration of every call in seconds"""
+
+    def decorator(fn: Callable) -> Callable:
+        child = histogram.labels(**labels)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> None:
+    """Serve GET /metrics on a background thread; idempotent within a process"""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _server_lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            # Another process (e.g. a second Streamlit instance) owns the port
+            print(f"[Metrics] Could not listen on port {port}: {e}")
+            return
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"[Metrics] Serving /metrics on port {port}")
+
+
+# -- metrics -------------------------------------------------------------
+
+TURNS = Counter("banco_agil_turns_total", "Turns processed, by the agent the turn was dispatched to", ["agent"])
+TURN_SECONDS = Histogram("banco_agil_turn_duration_seconds", "Turn duration, by the agent the turn was dispatched to", ["agent"])
+AGENT_TRANSITIONS = Counter("banco_agil_agent_transitions_total", "Agent switches within a session", ["from_agent", "to_agent"])
+
+LLM_SECONDS = Histogram("banco_agil_llm_request_duration_seconds", "LLM call latency per call site and tier", ["call_site", "tier"])
+LLM_TOKENS = Histogram("banco_agil_llm_tokens", "Tokens per LLM call, by call site and kind (prompt or completion)", ["call_site", "kind"], buckets=TOKEN_BUCKETS)
+LLM_ERRORS = Counter("banco_agil_llm_errors_total", "LLM calls that raised, per call site and tier", ["call_site", "tier"])
+
+TOOL_SECONDS = Histogram("banco_agil_tool_duration_seconds", "Tool call latency, including the bulkhead wait", ["tool"])
+
+STORAGE_SECONDS = Histogram("banco_agil_storage_duration_seconds", "Data file and store read/write durations", ["store", "op"], buckets=STORAGE_BUCKETS)
+
+EXCHANGE_API_SECONDS = Histogram("banco_agil_exchange_api_duration_seconds", "Frankfurter API request latency", ["endpoint"])
+EXCHANGE_API_ERRORS = Counter("banco_agil_exchange_api_errors_total", "Failed Frankfurter API requests", ["endpoint", "reason"])
+
+AUTH_ATTEMPTS = Counter("banco_agil_auth_attempts_total", "Authentication attempts by outcome", ["outcome"])
@@ -0,0 +1,201 @@
+"""
+Local time-series store of daily exchange rates (BRL per unit of currency)
+
+Each currency is kept in memory as two parallel arrays (day ordinals and
+rates) and persisted to data/rates/<CODE>.bin as fixed 12-byte records
+(int32 day ordinal + float64 rate), so loading is a single read and new
+days are a single append. Days older than the last stored one (a history
+backfill) need a rewrite of the currency's file, so a backfill is merged and
+written once per currency (record_snapshots).
+"""
+
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.metrics import STORAGE_SECONDS, timed
+
+RECORD = struct.Struct("<id")
+
+
+class _Series:
+    """Sorted daily rates for one currency"""
+
+    def __init__(self):
+        self.days = array("i")
+        self.rates = array("d")
+
+
+class RateHistoryStore:
+    """Array-backed, file-persisted daily rate history with in-memory range queries"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._series: Dict[str, _Series] = {}
+        self._loaded = False
+
+    def _path(self, code: str) -> str:
+        return os.path.join(self.directory, f"{code}.bin")
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if not name.endswith(".bin"):
+                    continue
+                series = _Series()
+                path = os.path.join(self.directory, name)
+                with open(path, "rb") as f:
+                    raw = f.read()
+                usable = len(raw) - len(raw) % RECORD.size
+                if usable < len(raw):
+                    # A torn append: cut it so later appends stay record-aligned
+                    with open(path, "r+b") as f:
+                        f.truncate(usable)
+                    print(f"[RateHistory] Dropped {len(raw) - usable} bytes of a partial record in {path}")
+                for day, rate in RECORD.iter_unpack(raw[:usable]):
+                    series.days.append(day)
+                    series.rates.append(rate)
+                self._series[name[:-4]] = series
+        self._loaded = True
+
+    @timed(STORAGE_SECONDS, store="rate_history", op="write")
+    def _write(self, code: str, series: _Series, overwritten: List[int], append_from: Optional[int]) -> None:
+        """
+        Persist changes to a series: overwrite the records at the given
+        indexes in place and append those from append_from on, or rewrite the
+        whole file when append_from is None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(code)
+        if append_from is None:
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(b"".join(RECORD.pack(day, rate) for day, rate in zip(series.days, series.rates)))
+            os.replace(tmp, path)
+            return
+        if overwritten:
+            with open(path, "r+b") as f:
+                for index in overwritten:
+                    f.seek(index * RECORD.size)
+                    f.write(RECORD.pack(series.days[index], series.rates[index]))
+        if append_from < len(series.days):
+            with open(path, "ab") as f:
+                f.write(b"".join(
+                    RECORD.pack(series.days[i], series.rates[i]) for i in range(append_from, len(series.days))
+                ))
+
+    def record(self, code: str, day: date, rate: float) -> None:
+        """Store the rate of one currency for one day, replacing any existing value"""
+        self.record_many(code, [(day, rate)])
+
+    def record_many(self, code: str, points: Iterable[Tuple[date, float]]) -> None:
+        """Store several days of one currency, replacing existing values, with one write"""
+        updates = {day.toordinal(): rate for day, rate in points}
+        with self._lock:
+            self._ensure_loaded()
+            series = self._series.setdefault(code, _Series())
+            overwritten = []
+            for ordinal in list(updates):
+                i = bisect_left(series.days, ordinal)
+                if i < len(series.days) and series.days[i] == ordinal:
+                    rate = updates.pop(ordinal)
+                    if series.rates[i] != rate:
+                        series.rates[i] = rate
+                        overwritten.append(i)
+            if not updates and not overwritten:
+                return
+
+            if not updates or not len(series.days) or min(updates) > series.days[-1]:
+                # Only changed and/or newer days: in place and append
+                append_from = len(series.days)
+                for ordinal in sorted(updates):
+                    series.days.append(ordinal)
+                    series.rates.append(updates[ordinal])
+                self._write(code, series, overwritten, append_from)
+                return
+
+            merged = dict(zip(series.days, series.rates))
+            merged.update(updates)
+            ordered = sorted(merged)
+            series.days = array("i", ordered)
+            series.rates = array("d", (merged[ordinal] for ordinal in ordered))
+            self._write(code, series, [], None)
+
+    def record_snapshot(self, day: date, brl_per_unit: Dict[str, float]) -> None:
+        """Store every currency of a snapshot for its day"""
+        self.record_snapshots({day: brl_per_unit})
+
+    def record_snapshots(self, snapshots: Dict[date, Dict[str, float]]) -> None:
+        """Store several days of snapshots (e.g. a backfill) with one write per currency"""
+        by_code: Dict[str, List[Tuple[date, float]]] = {}
+        for day, brl_per_unit in snapshots.items():
+            for code, rate in brl_per_unit.items():
+                if code != "BRL":
+                    by_code.setdefault(code, []).append((day, rate))
+        for code, points in by_code.items():
+            self.record_many(code, points)
+
+    def range(self, code: str, start: date, end: date) -> List[Tuple[date, float]]:
+        """Daily rates of a currency between start and end (inclusive)"""
+        with self._lock:
+            self._ensure_loaded()
+            series = self._series.get(code)
+            if series is None:
+                return []
+            lo = bisect_left(series.days, start.toordinal())
+            hi = bisect_right(series.days, end.toordinal())
+            return [
+                (date.fromordinal(series.days[i]), series.rates[i])
+                for i in range(lo, hi)
+            ]
+
+    def stats(self, code: str, start: date, end: date) -> Optional[Dict]:
+        """Min, max, average and variation of a currency over a date range"""
+        points = self.range(code, start, end)
+        if not points:
+            return None
+        rates = [rate for _, rate in points]
+        min_i = min(range(len(rates)), key=rates.__getitem__)
+        max_i = max(range(len(rates)), key=rates.__getitem__)
+        first_day, first = points[0]
+        last_day, last = points[-1]
+        return {
+            "currency": code,
+            "start": first_day.isoformat(),
+            "end": last_day.isoformat(),
+            "count": len(points),
+            "first": first,
+            "last": last,
+            "min": rates[min_i],
+            "min_date": points[min_i][0].isoformat(),
+            "max": rates[max_i],
+            "max_date": points[max_i][0].isoformat(),
+            "avg": sum(rates) / len(rates),
+            "change_pct": (last / first - 1) * 100 if first else 0.0,
+        }
+
+    def latest(self) -> Optional[Tuple[date, Dict[str, float]]]:
+        """Most recent stored day and the rate of every currency known on that day"""
+        with self._lock:
+            self._ensure_loaded()
+            last_day = max((s.days[-1] for s in self._series.values() if len(s.days)), default=None)
+            if last_day is None:
+                return None
+            rates = {}
+            for code, series in self._series.items():
+                i = bisect_right(series.days, last_day) - 1
+                if i >= 0:
+                    rates[code] = series.rates[i]
+            return date.fromordinal(last_day), rates
+
+    def size(self) -> Dict[str, int]:
+        """Number of stored days per currency"""
+        with self._lock:
+            self._ensure_loaded()
+            return {code: len(series.days) for code, series in self._series.items()}
@@ -0,0 +1,179 @@
+"""
+Token-bucket rate limiting over a shared store
+
+Buckets hold up to `capacity` tokens and refill at `refill_per_second`; each
+admitted call takes one. Bucket state lives in the same kind of backend as
+the sessions (memory, sqlite or redis) so every worker and replica enforces
+the same limits, and idle buckets expire once they would be full again.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Tuple
+from config import RATE_LIMIT_BACKEND, SESSION_STORE_PATH, SESSION_STORE_URL
+from utils.resp_client import RespClient
+
+
+class RateLimitStore:
+    """Interface for bucket storage backends"""
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens from the bucket if available
+
+        Returns:
+            0 when admitted, otherwise the seconds until enough tokens refill
+        """
+        raise NotImplementedError
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _ttl(tokens: float, capacity: float, rate: float) -> float:
+    """Seconds until the bucket is full again, after which it can be forgotten"""
+    return (capacity - tokens) / rate if rate > 0 else 86400.0
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Process-local buckets"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (tokens, updated_at, expires_at)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._ops = 0
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = time.time()
+        with self._lock:
+            self._ops += 1
+            if self._ops % self.PURGE_EVERY == 0:
+                self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, 0.0))
+            tokens = _refill(tokens, updated, now, capacity, refill_per_second)
+            if tokens < cost:
+                self._buckets[key] = (tokens, now, now + _ttl(tokens, capacity, refill_per_second))
+                return (cost - tokens) / refill_per_second if refill_per_second > 0 else 86400.0
+            tokens -= cost
+            self._buckets[key] = (tokens, now, now + _ttl(tokens, capacity, refill_per_second))
+            return 0.0
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """Buckets in a table of the sessions SQLite file, updated in one write transaction per call"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._ops = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                " key TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        conn = self._conn()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._ops += 1
+            if self._ops % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE expires_at < ?", (now,))
+            row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, capacity, refill_per_second) if row else capacity
+            wait = 0.0
+            if tokens < cost:
+                wait = (cost - tokens) / refill_per_second if refill_per_second > 0 else 86400.0
+            else:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + _ttl(tokens, capacity, refill_per_second)),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Sliding-window counter on a Redis-protocol server
+
+    Without server-side scripting a bucket cannot be refilled atomically, so
+    the bucket is approximated with INCR counters per refill period
+    (capacity / refill_per_second): the previous period's count, weighted by
+    how much of it still overlaps the window, plus the current count must
+    stay within capacity. Counters expire after two periods. Rejected calls
+    are counted too, so a client that keeps flooding stays throttled.
+    """
+
+    KEY_PREFIX = "ratelimit:"
+
+    def __init__(self, url: str):
+        self.client = RespClient(url)
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0) -> float:
+        now = time.time()
+        period = capacity / refill_per_second if refill_per_second > 0 else 86400.0
+        window = int(now // period)
+        current_key = f"{self.KEY_PREFIX}{key}:{window}"
+
+        # Not retried: an INCRBY applied before a dropped connection would be
+        # charged twice; a failure fails open in utils/admission.py instead
+        count = self.client.execute("INCRBY", current_key, int(cost), retry=False)
+        if count == int(cost):
+            self.client.execute("PEXPIRE", current_key, int(period * 2000))
+        previous = int(self.client.execute("GET", f"{self.KEY_PREFIX}{key}:{window - 1}") or 0)
+
+        overlap = 1 - (now - window * period) / period
+        used = previous * overlap + count
+        if used <= capacity:
+            return 0.0
+        return (used - capacity) / refill_per_second if refill_per_second > 0 else period
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_rate_limit_store() -> RateLimitStore:
+    """Process-wide bucket store for the configured backend"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if RATE_LIMIT_BACKEND == "sqlite":
+                    _store = SQLiteRateLimitStore(SESSION_STORE_PATH)
+                elif RATE_LIMIT_BACKEND == "redis":
+                    _store = RedisRateLimitStore(SESSION_STORE_URL)
+                else:
+                    _store = InMemoryRateLimitStore()
+                print(f"[RateLimit] Using {type(_store).__name__}")
+    return _store
@@ -0,0 +1,121 @@
+"""
+Per-CPF index of byte offsets into the limit-increase request log
+
+solicitacoes_aumento_limite.csv only grows, so the index only ever reads the
+bytes appended since it last looked: appends made by this process are
+indexed as they are written (record()), and appends from other processes
+(API workers) are picked up by reading the file's new tail on the next
+query. A customer's k most recent requests then cost k seeks, whatever the
+size of the log. The first query of a process scans the file once.
+"""
+
+import os
+import csv
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+from utils.metrics import STORAGE_SECONDS, timer
+
+
+class RequestLogIndex:
+    """CPF -> byte offsets of that customer's rows, oldest first"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, array] = {}
+        self._columns: List[str] = []
+        self._identity: Optional[Tuple] = None
+        self._size = 0
+        self._rows = 0
+        self._stats = {"builds": 0, "tails": 0, "appends": 0, "queries": 0}
+
+    def _reset(self, identity: Optional[Tuple]) -> None:
+        self._offsets = {}
+        self._columns = []
+        self._identity = identity
+        self._size = 0
+        self._rows = 0
+
+    def _catch_up(self) -> None:
+        """Index rows appended since the last look (caller holds the lock)"""
+        path = os.path.abspath(self.path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._reset(None)
+            return
+        identity = (path, st.st_dev, st.st_ino)
+        if identity != self._identity or st.st_size < self._size:
+            # A different or rewritten file: start over
+            self._reset(identity)
+            self._stats["builds"] += 1
+        if st.st_size == self._size:
+            return
+
+        with timer(STORAGE_SECONDS, store="requests_index", op="read"), open(path, "rb") as f:
+            f.seek(self._size)
+            data = f.read(st.st_size - self._size)
+        # Only complete lines; a row still being written is indexed next time
+        end = data.rfind(b"\n") + 1
+        position = self._size
+        for line in data[:end].split(b"\n")[:-1]:
+            self._index_line(line, position)
+            position += len(line) + 1
+        self._size = position
+        self._stats["tails"] += 1
+
+    def _index_line(self, line: bytes, offset: int) -> None:
+        if offset == 0:
+            self._columns = next(csv.reader([line.decode("utf-8").strip()]))
+            return
+        cpf = line.split(b",", 1)[0].decode("utf-8").strip()
+        if not cpf:
+            return
+        offsets = self._offsets.get(cpf)
+        if offsets is None:
+            offsets = self._offsets[cpf] = array("q")
+        offsets.append(offset)
+        self._rows += 1
+
+    def record(self, offset: int, end: int, row: bytes) -> None:
+        """
+        Index one row this process just appended at [offset, end). Rows that
+        do not continue the indexed prefix are left for the next catch-up.
+        """
+        with self._lock:
+            if self._identity is None or offset == 0 or offset != self._size:
+                return
+            self._index_line(row, offset)
+            self._size = end
+            self._stats["appends"] += 1
+
+    def recent(self, cpf: str, limit: int = 5) -> List[Dict[str, str]]:
+        """The customer's `limit` most recent requests, newest first"""
+        cpf_clean = "".join(filter(str.isdigit, str(cpf or "")))
+        with self._lock:
+            self._catch_up()
+            self._stats["queries"] += 1
+            offsets = self._offsets.get(cpf_clean)
+            if not offsets or limit <= 0:
+                return []
+            wanted = list(reversed(offsets[-limit:]))
+            columns = self._columns
+            path = self._identity[0]
+
+        rows = []
+        with timer(STORAGE_SECONDS, store="requests_index", op="read"), open(path, "rb") as f:
+            for offset in wanted:
+                f.seek(offset)
+                values = next(csv.reader([f.readline().decode("utf-8").strip()]))
+                rows.append(dict(zip(columns, values)))
+        return rows
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._stats,
+                "customers": len(self._offsets),
+                "rows": self._rows,
+                "indexed_bytes": self._size,
+            }
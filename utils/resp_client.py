@@ -0,0 +1,100 @@
+"""
+Minimal client for the Redis serialization protocol (RESP2)
+
+Only what the session store and shared counters need; works against Redis
+or the local stand-in in scripts/resp_server.py.
+"""
+
+import socket
+import threading
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """Error reply returned by the server"""
+
+
+class RespClient:
+    """Single-connection, thread-safe RESP client with reconnect on failure"""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+        if self.db:
+            self._send(("SELECT", self.db))
+            self._read()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sock is not None:
+                try:
+                    self._sock.close()
+                finally:
+                    self._sock = None
+                    self._file = None
+
+    def _send(self, args: tuple) -> None:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(f"${len(data)}\r\n".encode())
+            parts.append(data)
+            parts.append(b"\r\n")
+        self._sock.sendall(b"".join(parts))
+
+    def _read(self) -> Any:
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            if count < 0:
+                return None
+            return [self._read() for _ in range(count)]
+        raise RespError(f"Unknown reply type: {line!r}")
+
+    def execute(self, *args, retry: bool = True) -> Any:
+        """
+        Send one command and return its decoded reply
+
+        A dropped connection is retried once on a new one. Pass retry=False
+        for commands that must not run twice (e.g. INCRBY): the first attempt
+        may have been applied before the connection dropped.
+        """
+        with self._lock:
+            for attempt in range(2 if retry else 1):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._send(args)
+                    return self._read()
+                except (OSError, ConnectionError):
+                    self._sock = None
+                    self._file = None
+                    if attempt or not retry:
+                        raise
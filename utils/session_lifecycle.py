@@ -0,0 +1,235 @@
+"""
+Session lifecycle: live-session cache with idle eviction, LRU caps and archival
+"""
+
+import os
+import hmac
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import ormsgpack
+from config import (
+    SESSION_IDLE_TIMEOUT_SECONDS,
+    SESSION_ENDED_TTL_SECONDS,
+    SESSION_ARCHIVE_AFTER_SECONDS,
+    SESSION_MAX_LIVE,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+    SESSION_ARCHIVE_DIR,
+    SESSION_RESUME_SECRET,
+    SESSION_RESUME_TTL_SECONDS,
+)
+from utils.session_manager import SessionManager
+from utils.session_store import SessionStore, get_session_store
+
+
+class SessionRegistry:
+    """
+    Keeps recently used sessions in memory, backed by a SessionStore.
+
+    - Sessions idle longer than idle_timeout are saved and dropped from memory
+      (they can still be resumed from the store)
+    - Ended sessions idle longer than ended_ttl, and stored sessions idle
+      longer than archive_after, are archived to disk and deleted from the store
+    - At most max_live sessions stay in memory; the least recently used is evicted
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT_SECONDS,
+        ended_ttl: float = SESSION_ENDED_TTL_SECONDS,
+        archive_after: float = SESSION_ARCHIVE_AFTER_SECONDS,
+        max_live: int = SESSION_MAX_LIVE,
+        archive_dir: str = SESSION_ARCHIVE_DIR,
+    ):
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.ended_ttl = ended_ttl
+        self.archive_after = archive_after
+        self.max_live = max_live
+        self.archive_dir = archive_dir
+
+        self._lock = threading.RLock()
+        self._live: "OrderedDict[str, SessionManager]" = OrderedDict()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        self.counters: Dict[str, int] = {
+            "created": 0,
+            "resumed": 0,
+            "evicted_idle": 0,
+            "evicted_lru": 0,
+            "archived": 0,
+        }
+
+    def get_or_create(self, session_id: Optional[str] = None) -> SessionManager:
+        """Return the live session, resume it from the store, or start a new one"""
+        with self._lock:
+            if session_id and session_id in self._live:
+                self._live.move_to_end(session_id)
+                return self._live[session_id]
+
+        session = SessionManager.load(self.store, session_id) if session_id else None
+        with self._lock:
+            if session is not None:
+                self.counters["resumed"] += 1
+            else:
+                session = SessionManager(session_id)
+                self.counters["created"] += 1
+            # Another thread may have resumed it meanwhile; keep the first one
+            session = self._live.setdefault(session.session_id, session)
+            self._live.move_to_end(session.session_id)
+            self._enforce_cap()
+        return session
+
+    def save(self, session: SessionManager) -> None:
+        """Persist the session's changed fields"""
+        session.save(self.store)
+
+    def discard(self, session_id: str) -> None:
+        """Drop a session from memory and the store without archiving"""
+        with self._lock:
+            self._live.pop(session_id, None)
+        self.store.delete(session_id)
+
+    def _enforce_cap(self) -> None:
+        while len(self._live) > self.max_live:
+            _, session = self._live.popitem(last=False)
+            session.save(self.store)
+            self.counters["evicted_lru"] += 1
+
+    def _archive(self, session_id: str, fields: Dict[str, bytes]) -> None:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{session_id}.msgpack")
+        with open(path, "wb") as f:
+            f.write(ormsgpack.packb(fields))
+        self.store.delete(session_id)
+        self.counters["archived"] += 1
+
+    def sweep(self, include_store: bool = True) -> Dict[str, int]:
+        """Evict idle live sessions and archive expired ones. Returns the counters"""
+        now = time.time()
+        with self._lock:
+            candidates = list(self._live.items())
+
+        for session_id, session in candidates:
+            idle = session.idle_seconds(now)
+            if session.session_ended and idle >= self.ended_ttl:
+                with self._lock:
+                    self._live.pop(session_id, None)
+                self._archive(session_id, session.dump_fields(only_changed=False))
+            elif idle >= self.idle_timeout:
+                session.save(self.store)
+                with self._lock:
+                    self._live.pop(session_id, None)
+                    self.counters["evicted_idle"] += 1
+
+        if include_store:
+            with self._lock:
+                live_ids = set(self._live)
+            # Only the ids the store's expiry index reports; each is re-checked
+            # against its stored fields in case it was saved meanwhile
+            for session_id in self.store.expired_ids(now - self.archive_after, now - self.ended_ttl):
+                if session_id in live_ids:
+                    continue
+                fields = self.store.load(session_id)
+                if not fields:
+                    # Index entry of a session whose fields are gone
+                    self.store.delete(session_id)
+                    continue
+                last_activity = ormsgpack.unpackb(fields["last_activity"]) if "last_activity" in fields else 0
+                ended = ormsgpack.unpackb(fields["session_ended"]) if "session_ended" in fields else False
+                idle = now - last_activity
+                if idle >= self.archive_after or (ended and idle >= self.ended_ttl):
+                    self._archive(session_id, fields)
+
+        return self.stats()
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[SessionRegistry] Sweep failed: {e}")
+
+    def start(self, interval: float = SESSION_SWEEP_INTERVAL_SECONDS) -> None:
+        """Start the background sweeper thread (idempotent)"""
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop.clear()
+            self._sweeper = threading.Thread(
+                target=self._run, args=(interval,), name="session-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Live, created, resumed, evicted and archived session counters"""
+        with self._lock:
+            return {"live": len(self._live), **self.counters}
+
+    def live_sessions(self) -> list:
+        """Snapshot of the sessions currently held in memory"""
+        with self._lock:
+            return list(self._live.values())
+
+
+_registry: Optional[SessionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionRegistry:
+    """Process-wide registry over the configured session store, with its sweeper running"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SessionRegistry(get_session_store())
+                _registry.start()
+    return _registry
+
+
+_RESUME_KEY = SESSION_RESUME_SECRET.encode("utf-8") or os.urandom(32)
+
+
+def _resume_signature(session_id: str, expires: int) -> str:
+    message = f"{session_id}.{expires}".encode("utf-8")
+    return hmac.new(_RESUME_KEY, message, hashlib.sha256).hexdigest()[:32]
+
+
+def resume_token(session_id: str) -> str:
+    """Signed token letting a link resume the session for SESSION_RESUME_TTL_SECONDS"""
+    expires = int(time.time()) + SESSION_RESUME_TTL_SECONDS
+    return f"{session_id}.{expires}.{_resume_signature(session_id, expires)}"
+
+
+def confirm_resume(session: SessionManager, birthdate: str) -> bool:
+    """
+    Whether birthdate is the authenticated customer's: resuming a logged-in
+    session from a link asks for it again, so the link alone is not enough
+    """
+    import json
+    from tools.customer_tools import authenticate_customer
+
+    if not session.authenticated or not session.customer_cpf or not (birthdate or "").strip():
+        return False
+    result = json.loads(authenticate_customer.invoke({"cpf": session.customer_cpf, "birthdate": birthdate}))
+    return result.get("status") == "success"
+
+
+def session_id_from_resume_token(token: Optional[str]) -> Optional[str]:
+    """Session id of a valid, unexpired resume token; None for anything else"""
+    try:
+        session_id, expires, signature = (token or "").rsplit(".", 2)
+        expires_at = int(expires)
+    except ValueError:
+        return None
+    if expires_at < time.time():
+        return None
+    if not hmac.compare_digest(signature, _resume_signature(session_id, expires_at)):
+        return None
+    return session_id
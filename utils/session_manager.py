@@ -2,13 +2,71 @@
 Manages session state and customer data
 """
 
+import os
+import sys
+import time
+import uuid
+import hashlib
+import ormsgpack
 from typing import Optional, Dict, Any
 from datetime import datetime
+from utils.usage_ledger import UsageLedger
+from utils.history_store import MessageHistory
+from utils.metrics import AGENT_TRANSITIONS, STORAGE_SECONDS, timer
+from config import HISTORY_MAX_MESSAGES, HISTORY_ARCHIVE_DIR
+
+
+def _deep_sizeof(obj: Any, seen: set) -> int:
+    """Approximate retained size of an object graph in bytes"""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == "deque":
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    else:
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                size += _deep_sizeof(getattr(obj, slot), seen)
+        if hasattr(obj, "__dict__"):
+            size += _deep_sizeof(obj.__dict__, seen)
+    return size
+
 
 class SessionManager:
     """Manages session state across agent interactions"""
-    
-    def __init__(self):
+
+    __slots__ = (
+        "session_id",
+        "authenticated",
+        "customer_cpf",
+        "customer_data",
+        "auth_attempts",
+        "max_auth_attempts",
+        "history",
+        "current_agent",
+        "agent_history",
+        "session_start",
+        "session_ended",
+        "last_activity",
+        "usage",
+        "last_turn_usage",
+        "last_turn_key",
+        "interview_data",
+        "interview_step",
+        "interview_attempts",
+        "interview_examples_shown",
+        "_saved_digests",
+    )
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id: str = session_id or uuid.uuid4().hex
+
+        # Digest of each field as last written to a session store
+        self._saved_digests: Dict[str, bytes] = {}
+
         # Authentication state
         self.authenticated: bool = False
         self.customer_cpf: Optional[str] = None
@@ -16,8 +74,11 @@ class SessionManager:
         self.auth_attempts: int = 0
         self.max_auth_attempts = 3
 
-        # History
-        self.messages: list = []
+        # History: bounded ring buffer shared by the UI and the agents
+        archive_path = (
+            os.path.join(HISTORY_ARCHIVE_DIR, f"{self.session_id}.jsonl") if HISTORY_ARCHIVE_DIR else None
+        )
+        self.history = MessageHistory(HISTORY_MAX_MESSAGES, archive_path)
 
         # Agent routing
         self.current_agent: str = "triagem"
@@ -26,6 +87,14 @@ class SessionManager:
         # Session timing
         self.session_start = datetime.now()
         self.session_ended = False
+        self.last_activity: float = time.time()
+
+        # LLM token and latency accounting
+        self.usage = UsageLedger()
+        self.last_turn_usage: Dict = {}
+        # [message digest, turn id] of the previous turn; a resend of the same
+        # message reuses its turn id (utils/idempotency.py default_turn_id)
+        self.last_turn_key: list = []
 
         # Interview state
         self.interview_data: Dict = {}
@@ -41,7 +110,7 @@ class SessionManager:
 
     def reset(self):
         """Reset session to initial state"""
-        self.__init__()
+        self.__init__(self.session_id)
     
     def set_customer_data(self, cpf: str, data: str) -> None:
         """Set authenticated customer data"""
@@ -74,6 +143,7 @@ class SessionManager:
         """Switch to a different agent"""
         if self.current_agent != agent_name:
             print(f"[SessionManager] Transition: {self.current_agent} -> {agent_name}")
+            AGENT_TRANSITIONS.labels(from_agent=self.current_agent, to_agent=agent_name).inc()
             self.current_agent = agent_name
             self.agent_history.append(agent_name)
     
@@ -113,10 +183,83 @@ class SessionManager:
         session_duration = datetime.now() - self.session_start
         print(f"[SessionManager] Session ended. Duration: {session_duration}")
 
+    def touch(self) -> None:
+        """Mark the session as active now"""
+        self.last_activity = time.time()
+
+    def idle_seconds(self, now: Optional[float] = None) -> float:
+        """Seconds since the last activity"""
+        return (now or time.time()) - self.last_activity
+
     def add_message(self, role: str, content: str) -> None:
         """Add a message to the session history"""
-        self.messages.append({"role": role, "content": content})
+        self.history.append(role, content)
+        self.last_activity = time.time()
 
     def get_session_history(self) -> list:
         """Return the session history"""
-        return self.messages
+        return self.history.to_list()
+
+    @property
+    def messages(self) -> list:
+        """Read-only view of the session history"""
+        return self.history.to_list()
+
+    def memory_footprint(self) -> int:
+        """Approximate bytes retained by this session"""
+        return _deep_sizeof(self, set())
+
+    def _persisted_fields(self) -> list:
+        return [name for name in self.__slots__ if not name.startswith("_")]
+
+    def _encode_field(self, name: str) -> bytes:
+        value = getattr(self, name)
+        if name == "history":
+            value = value.to_state()
+        elif name == "usage":
+            value = value.to_state()
+        elif name == "session_start":
+            value = value.isoformat()
+        return ormsgpack.packb(value)
+
+    def dump_fields(self, only_changed: bool = True) -> Dict[str, bytes]:
+        """Encode session fields with msgpack, by default only those changed since the last save"""
+        fields = {}
+        for name in self._persisted_fields():
+            data = self._encode_field(name)
+            digest = hashlib.blake2b(data, digest_size=8).digest()
+            if not only_changed or self._saved_digests.get(name) != digest:
+                fields[name] = data
+        return fields
+
+    def save(self, store) -> int:
+        """Write the changed fields to a session store. Returns how many fields were written"""
+        fields = self.dump_fields()
+        if fields:
+            with timer(STORAGE_SECONDS, store="sessions", op="write"):
+                store.save(self.session_id, fields)
+            for name, data in fields.items():
+                self._saved_digests[name] = hashlib.blake2b(data, digest_size=8).digest()
+        return len(fields)
+
+    @classmethod
+    def load(cls, store, session_id: str) -> Optional["SessionManager"]:
+        """Rebuild a session from a store, or None if it is not there"""
+        with timer(STORAGE_SECONDS, store="sessions", op="read"):
+            fields = store.load(session_id)
+        if not fields:
+            return None
+        session = cls(session_id)
+        for name, data in fields.items():
+            if name not in session._persisted_fields():
+                continue
+            value = ormsgpack.unpackb(data)
+            if name == "history":
+                value = MessageHistory.from_state(value)
+            elif name == "usage":
+                value = UsageLedger.from_state(value)
+            elif name == "session_start":
+                value = datetime.fromisoformat(value)
+            setattr(session, name, value)
+            session._saved_digests[name] = hashlib.blake2b(data, digest_size=8).digest()
+        return session
@@ -0,0 +1,407 @@
+"""
+Pluggable storage for SessionManager state
+
+Sessions are stored as a map of field name -> msgpack bytes, so a turn only
+writes the fields that changed and any app replica can resume any session.
+
+Each backend also holds per-session turn locks (leases with an owner and an
+expiry), so workers sharing the store never interleave a session's load and
+save and the last writer cannot overwrite a turn it did not see.
+
+Each backend also keeps an expiry index (last activity and whether the session
+ended) updated on save, so the lifecycle sweep asks for the expired ids
+instead of loading every stored session.
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import threading
+import contextlib
+from typing import Dict, Iterator, List, Optional, Tuple
+import ormsgpack
+from config import (
+    SESSION_STORE_BACKEND,
+    SESSION_STORE_PATH,
+    SESSION_STORE_URL,
+    SESSION_LOCK_TTL_SECONDS,
+    SESSION_LOCK_WAIT_SECONDS,
+)
+from utils.resp_client import RespClient
+
+
+class SessionBusy(Exception):
+    """The session's turn lock is held elsewhere and was not released in time"""
+
+
+class SessionStore:
+    """Interface for session storage backends"""
+
+    def load(self, session_id: str) -> Optional[Dict[str, bytes]]:
+        """Return every stored field of a session, or None if it does not exist"""
+        raise NotImplementedError
+
+    def save(self, session_id: str, fields: Dict[str, bytes]) -> None:
+        """Write (upsert) the given fields of a session"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session"""
+        raise NotImplementedError
+
+    def session_ids(self) -> List[str]:
+        """Ids of every stored session"""
+        raise NotImplementedError
+
+    def expired_ids(self, idle_before: float, ended_before: float) -> List[str]:
+        """
+        Ids of sessions inactive since idle_before, plus ended sessions
+        inactive since ended_before, read from the expiry index
+        """
+        raise NotImplementedError
+
+    def active_ids(self, since: float, limit: int) -> List[str]:
+        """Ids of up to limit sessions active since `since`, most recent first"""
+        raise NotImplementedError
+
+    def try_lock(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Take the session's lock for owner unless another owner holds an unexpired lease"""
+        raise NotImplementedError
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        """Release the session's lock if owner still holds it"""
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def locked(
+        self,
+        session_id: str,
+        ttl_seconds: float = SESSION_LOCK_TTL_SECONDS,
+        wait_seconds: float = SESSION_LOCK_WAIT_SECONDS,
+    ) -> Iterator[None]:
+        """Hold the session's lock for the block; raises SessionBusy after wait_seconds"""
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + wait_seconds
+        delay = 0.01
+        while not self.try_lock(session_id, owner, ttl_seconds):
+            if time.monotonic() >= deadline:
+                raise SessionBusy(session_id)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+        try:
+            yield
+        finally:
+            self.unlock(session_id, owner)
+
+
+def _activity(fields: Dict[str, bytes]) -> Tuple[Optional[float], Optional[bool]]:
+    """Expiry-index values carried by a save: (last_activity, session_ended), None if absent"""
+    last_activity = ormsgpack.unpackb(fields["last_activity"]) if "last_activity" in fields else None
+    ended = bool(ormsgpack.unpackb(fields["session_ended"])) if "session_ended" in fields else None
+    return last_activity, ended
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store; state is lost on restart"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict[str, bytes]] = {}
+        self._activity: Dict[str, Tuple[float, bool]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    def load(self, session_id: str) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            fields = self._sessions.get(session_id)
+            return dict(fields) if fields is not None else None
+
+    def save(self, session_id: str, fields: Dict[str, bytes]) -> None:
+        last_activity, ended = _activity(fields)
+        with self._lock:
+            self._sessions.setdefault(session_id, {}).update(fields)
+            previous = self._activity.get(session_id, (0.0, False))
+            self._activity[session_id] = (
+                previous[0] if last_activity is None else last_activity,
+                previous[1] if ended is None else ended,
+            )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._activity.pop(session_id, None)
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions)
+
+    def expired_ids(self, idle_before: float, ended_before: float) -> List[str]:
+        with self._lock:
+            return [
+                session_id
+                for session_id, (last_activity, ended) in self._activity.items()
+                if last_activity < idle_before or (ended and last_activity < ended_before)
+            ]
+
+    def active_ids(self, since: float, limit: int) -> List[str]:
+        with self._lock:
+            recent = [(last_activity, session_id) for session_id, (last_activity, _) in self._activity.items() if last_activity >= since]
+        return [session_id for _, session_id in sorted(recent, reverse=True)[:limit]]
+
+    def try_lock(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            holder = self._locks.get(session_id)
+            if holder is not None and holder[0] != owner and holder[1] > now:
+                return False
+            self._locks[session_id] = (owner, now + ttl_seconds)
+            return True
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        with self._lock:
+            if self._locks.get(session_id, ("",))[0] == owner:
+                del self._locks[session_id]
+
+
+class SQLiteSessionStore(SessionStore):
+    """One row per (session, field) in a local SQLite file shared by replicas on the same host/volume"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_fields ("
+                " session_id TEXT NOT NULL,"
+                " field TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " PRIMARY KEY (session_id, field)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_activity ("
+                " session_id TEXT PRIMARY KEY,"
+                " last_activity REAL NOT NULL,"
+                " ended INTEGER NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS session_activity_by_time"
+                " ON session_activity (last_activity)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_locks ("
+                " session_id TEXT PRIMARY KEY,"
+                " owner TEXT NOT NULL,"
+                " expires_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._backfill_activity(conn)
+
+    def _backfill_activity(self, conn: sqlite3.Connection) -> None:
+        """Index sessions stored before the expiry index existed"""
+        rows = conn.execute(
+            "SELECT session_id, field, value FROM session_fields"
+            " WHERE field IN ('last_activity', 'session_ended')"
+            " AND session_id NOT IN (SELECT session_id FROM session_activity)"
+        ).fetchall()
+        pending: Dict[str, Dict[str, bytes]] = {}
+        for session_id, field, value in rows:
+            pending.setdefault(session_id, {})[field] = bytes(value)
+        for session_id, fields in pending.items():
+            last_activity, ended = _activity(fields)
+            conn.execute(
+                "INSERT OR IGNORE INTO session_activity (session_id, last_activity, ended) VALUES (?, ?, ?)",
+                (session_id, last_activity or 0.0, int(bool(ended))),
+            )
+        if pending:
+            print(f"[SessionStore] Indexed {len(pending)} stored sessions for expiry")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Optional[Dict[str, bytes]]:
+        rows = self._conn().execute(
+            "SELECT field, value FROM session_fields WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        return {field: bytes(value) for field, value in rows} if rows else None
+
+    def save(self, session_id: str, fields: Dict[str, bytes]) -> None:
+        last_activity, ended = _activity(fields)
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_fields (session_id, field, value) VALUES (?, ?, ?)",
+                [(session_id, field, value) for field, value in fields.items()],
+            )
+            ended_flag = None if ended is None else int(ended)
+            conn.execute(
+                "INSERT INTO session_activity (session_id, last_activity, ended)"
+                " VALUES (?, COALESCE(?, 0), COALESCE(?, 0))"
+                " ON CONFLICT (session_id) DO UPDATE SET"
+                " last_activity = COALESCE(?, last_activity), ended = COALESCE(?, ended)",
+                (session_id, last_activity, ended_flag, last_activity, ended_flag),
+            )
+
+    def delete(self, session_id: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM session_fields WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM session_activity WHERE session_id = ?", (session_id,))
+
+    def session_ids(self) -> List[str]:
+        rows = self._conn().execute("SELECT DISTINCT session_id FROM session_fields").fetchall()
+        return [row[0] for row in rows]
+
+    def expired_ids(self, idle_before: float, ended_before: float) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT session_id FROM session_activity"
+            " WHERE last_activity < ? OR (ended = 1 AND last_activity < ?)",
+            (idle_before, ended_before),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def active_ids(self, since: float, limit: int) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT session_id FROM session_activity WHERE last_activity >= ?"
+            " ORDER BY last_activity DESC LIMIT ?",
+            (since, limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def try_lock(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._conn() as conn:
+            # Takes a free or expired lease; a live one held by someone else is left as is
+            conn.execute(
+                "INSERT INTO session_locks (session_id, owner, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (session_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+                " WHERE session_locks.expires_at < ? OR session_locks.owner = excluded.owner",
+                (session_id, owner, now + ttl_seconds, now),
+            )
+            row = conn.execute("SELECT owner FROM session_locks WHERE session_id = ?", (session_id,)).fetchone()
+        return row is not None and row[0] == owner
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM session_locks WHERE session_id = ? AND owner = ?", (session_id, owner))
+
+
+class RedisSessionStore(SessionStore):
+    """
+    One hash per session (session:<id>) on a Redis-protocol server, with the
+    expiry index in two sorted sets scored by last activity: every session in
+    sessions:activity, ended ones also in sessions:ended
+    """
+
+    KEY_PREFIX = "session:"
+    LOCK_PREFIX = "session_lock:"
+    ACTIVITY_KEY = "sessions:activity"
+    ENDED_KEY = "sessions:ended"
+
+    def __init__(self, url: str):
+        self.client = RespClient(url)
+        if not self.client.execute("ZCARD", self.ACTIVITY_KEY):
+            self._backfill_activity()
+
+    def _backfill_activity(self) -> None:
+        """Index sessions stored before the expiry index existed"""
+        count = 0
+        for session_id in self.session_ids():
+            reply = self.client.execute("HMGET", self._key(session_id), "last_activity", "session_ended")
+            fields = {name: value for name, value in zip(("last_activity", "session_ended"), reply) if value is not None}
+            last_activity, ended = _activity(fields)
+            self._index(session_id, last_activity or 0.0, ended)
+            count += 1
+        if count:
+            print(f"[SessionStore] Indexed {count} stored sessions for expiry")
+
+    def _index(self, session_id: str, last_activity: Optional[float], ended: Optional[bool]) -> None:
+        if last_activity is not None:
+            self.client.execute("ZADD", self.ACTIVITY_KEY, repr(last_activity), session_id)
+        if ended:
+            score = repr(last_activity) if last_activity is not None else self.client.execute("ZSCORE", self.ACTIVITY_KEY, session_id) or 0
+            self.client.execute("ZADD", self.ENDED_KEY, score, session_id)
+        elif ended is False:
+            self.client.execute("ZREM", self.ENDED_KEY, session_id)
+        elif last_activity is not None:
+            # Keep an ended session's score current without reading its state
+            self.client.execute("ZADD", self.ENDED_KEY, "XX", repr(last_activity), session_id)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.KEY_PREFIX}{session_id}"
+
+    def load(self, session_id: str) -> Optional[Dict[str, bytes]]:
+        reply = self.client.execute("HGETALL", self._key(session_id))
+        if not reply:
+            return None
+        return {reply[i].decode(): reply[i + 1] for i in range(0, len(reply), 2)}
+
+    def save(self, session_id: str, fields: Dict[str, bytes]) -> None:
+        args = []
+        for field, value in fields.items():
+            args.extend((field, value))
+        self.client.execute("HSET", self._key(session_id), *args)
+        self._index(session_id, *_activity(fields))
+
+    def delete(self, session_id: str) -> None:
+        self.client.execute("DEL", self._key(session_id))
+        self.client.execute("ZREM", self.ACTIVITY_KEY, session_id)
+        self.client.execute("ZREM", self.ENDED_KEY, session_id)
+
+    def session_ids(self) -> List[str]:
+        # SCAN walks the keyspace in small steps; KEYS would block the server
+        ids = []
+        cursor = b"0"
+        while True:
+            cursor, keys = self.client.execute("SCAN", cursor, "MATCH", f"{self.KEY_PREFIX}*", "COUNT", 500)
+            ids.extend(key.decode()[len(self.KEY_PREFIX):] for key in keys)
+            if cursor == b"0":
+                return ids
+
+    def expired_ids(self, idle_before: float, ended_before: float) -> List[str]:
+        idle = self.client.execute("ZRANGEBYSCORE", self.ACTIVITY_KEY, "-inf", f"({idle_before!r}") or []
+        ended = self.client.execute("ZRANGEBYSCORE", self.ENDED_KEY, "-inf", f"({ended_before!r}") or []
+        return list(dict.fromkeys(member.decode() for member in idle + ended))
+
+    def active_ids(self, since: float, limit: int) -> List[str]:
+        members = self.client.execute("ZREVRANGEBYSCORE", self.ACTIVITY_KEY, "+inf", repr(since), "LIMIT", 0, limit) or []
+        return [member.decode() for member in members]
+
+    def try_lock(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        key = f"{self.LOCK_PREFIX}{session_id}"
+        if self.client.execute("SET", key, owner, "NX", "PX", max(1, int(ttl_seconds * 1000))) == "OK":
+            return True
+        # The client retries once on a dropped connection: a SET that landed
+        # before the drop answers nil on the retry, but the lock is ours
+        return self.client.execute("GET", key) == owner.encode()
+
+    def unlock(self, session_id: str, owner: str) -> None:
+        key = f"{self.LOCK_PREFIX}{session_id}"
+        if self.client.execute("GET", key) == owner.encode():
+            self.client.execute("DEL", key)
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide session store for the configured backend"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if SESSION_STORE_BACKEND == "sqlite":
+                    _store = SQLiteSessionStore(SESSION_STORE_PATH)
+                elif SESSION_STORE_BACKEND == "redis":
+                    _store = RedisSessionStore(SESSION_STORE_URL)
+                else:
+                    _store = InMemorySessionStore()
+                print(f"[SessionStore] Using {type(_store).__name__}")
+    return _store
@@ -0,0 +1,320 @@
+"""
+Lightweight tracing: timed spans per turn, agent, LLM call and tool call
+
+Spans are sampled per trace (the root span decides) and exported as
+OTLP/JSON lines (one ExportTraceServiceRequest per trace), readable by the
+OpenTelemetry Collector's file receiver and most trace viewers. Attribute
+values may be callables; they are only evaluated when the span is sampled,
+so expensive formatting (message histories, LLM inputs) costs nothing on
+unsampled turns.
+
+Customer data stays out of the trace file: captured tool arguments have
+CPFs replaced by a keyed hash and birthdates removed, and LLM prompts and
+outputs are only recorded when TRACE_CAPTURE_LLM_CONTENT is enabled.
+
+Usage:
+    with span("credit.process", session_id=session.session_id) as s:
+        s.set_attribute("agent.history_length", lambda: len(history))
+
+    @traced("tool.check_credit_limit", capture_args=True)
+    def check_credit_limit(cpf): ...
+"""
+
+import os
+import hmac
+import json
+import inspect
+import hashlib
+import time
+import queue
+import random
+import threading
+import functools
+import contextvars
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from config import TRACE_SAMPLE_RATE, TRACE_EXPORT_PATH, TRACE_MAX_ATTRIBUTE_LENGTH, TRACE_RECENT_TRACES
+
+SERVICE_NAME = "banco_agil"
+
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class _NoopSpan:
+    """Returned for spans inside an unsampled trace; every method is a no-op"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _UnsampledRoot(_NoopSpan):
+    """Root of an unsampled trace: marks the context so children skip sampling"""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self) -> "_UnsampledRoot":
+        self._token = _current.set(_NOOP_SPAN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current.reset(self._token)
+        return False
+
+
+class Span:
+    """A timed, sampled span. Collected on its trace and exported when the root ends"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent", "attributes",
+        "start_ns", "end_ns", "status", "status_message", "_token", "_finished",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.status = STATUS_OK
+        self.status_message = ""
+        # Finished spans of the whole trace, owned by the root
+        self._finished: List["Span"] = parent._finished if parent else []
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute; callables are evaluated when the span ends"""
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+        if exc is not None:
+            self.status = STATUS_ERROR
+            self.status_message = str(exc)[:TRACE_MAX_ATTRIBUTE_LENGTH]
+            self.attributes["exception.type"] = type(exc).__name__
+        self._resolve_attributes()
+        self._finished.append(self)
+        if self.parent is None:
+            _recent.append(self._finished)
+            _exporter.submit(self._finished)
+        return False
+
+    def _resolve_attributes(self) -> None:
+        for key, value in list(self.attributes.items()):
+            if callable(value):
+                try:
+                    value = value()
+                except Exception as e:
+                    value = f"<error: {e}>"
+            if not isinstance(value, (str, bool, int, float)) and value is not None:
+                value = repr(value)
+            if isinstance(value, str) and len(value) > TRACE_MAX_ATTRIBUTE_LENGTH:
+                value = value[:TRACE_MAX_ATTRIBUTE_LENGTH] + "…"
+            self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent.span_id if self.parent else "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class FileSpanExporter:
+    """Appends finished traces as OTLP/JSON lines from a background thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=10_000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def submit(self, spans: List[Span]) -> None:
+        if not self.path:
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while not self._queue.empty() and len(batch) < 100:
+                batch.append(self._queue.get_nowait())
+            try:
+                self._write(batch)
+            except OSError as e:
+                print(f"[Tracing] Export failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, traces: List[List[Span]]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for spans in traces:
+                f.write(json.dumps({
+                    "resourceSpans": [{
+                        "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                        "scopeSpans": [{
+                            "scope": {"name": "utils.tracing"},
+                            "spans": [s.to_otlp() for s in spans],
+                        }],
+                    }],
+                }, ensure_ascii=False) + "\n")
+                self.exported += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until queued traces are written (used by scripts before exiting)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+_exporter = FileSpanExporter(TRACE_EXPORT_PATH)
+_sample_rate = TRACE_SAMPLE_RATE
+# Last sampled traces kept in memory for the diagnostics page
+_recent: "deque[List[Span]]" = deque(maxlen=TRACE_RECENT_TRACES)
+
+
+def set_sample_rate(rate: float) -> None:
+    """Change the fraction of traces recorded (0 disables tracing)"""
+    global _sample_rate
+    _sample_rate = max(0.0, min(1.0, rate))
+
+
+def get_sample_rate() -> float:
+    return _sample_rate
+
+
+def recent_traces() -> List[List[Span]]:
+    """The most recent sampled traces, oldest first; each is its spans in end order"""
+    return list(_recent)
+
+
+def get_exporter() -> FileSpanExporter:
+    return _exporter
+
+
+def span(name: str, **attributes: Any):
+    """
+    Start a span as a context manager. A span without a parent starts a new
+    trace and decides sampling for everything under it.
+    """
+    parent = _current.get()
+    if parent is None:
+        if _sample_rate <= 0:
+            return _NOOP_SPAN
+        if _sample_rate < 1 and random.random() >= _sample_rate:
+            return _UnsampledRoot()
+        return Span(name, None, attributes)
+    if parent is _NOOP_SPAN:
+        return _NOOP_SPAN
+    return Span(name, parent, attributes)
+
+
+def current_span():
+    """The active span, or a no-op span outside sampled traces"""
+    return _current.get() or _NOOP_SPAN
+
+
+# Argument names never written as-is: hashed ones stay correlatable within
+# this process's traces, redacted ones are dropped
+HASHED_ARGS = {"cpf", "cpf_cliente"}
+REDACTED_ARGS = {"birthdate", "data_nascimento"}
+_REDACTION_KEY = os.urandom(16)
+
+
+def redact_args(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Arguments safe to record: CPFs as a keyed hash, credentials removed"""
+    safe = {}
+    for key, value in arguments.items():
+        if key in REDACTED_ARGS:
+            safe[key] = "<redacted>"
+        elif key in HASHED_ARGS and value is not None:
+            digits = "".join(filter(str.isdigit, str(value)))
+            safe[key] = "cpf:" + hmac.new(_REDACTION_KEY, digits.encode(), hashlib.sha256).hexdigest()[:12]
+        else:
+            safe[key] = value
+    return safe
+
+
+def traced(name: str, capture_args: bool = False, **static_attributes: Any) -> Callable:
+    """
+    Decorator wrapping every call of a function in a span. With capture_args,
+    the call arguments are recorded (lazily, through redact_args) as the
+    'code.args' attribute.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        def _arguments(args, kwargs) -> Dict[str, Any]:
+            try:
+                return dict(signature.bind_partial(*args, **kwargs).arguments)
+            except TypeError:
+                return {"args": args, **kwargs}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **static_attributes) as s:
+                if capture_args:
+                    s.set_attribute("code.args", lambda: repr(redact_args(_arguments(args, kwargs))))
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,163 @@
+"""
+Process-wide TTL cache with stale-while-revalidate and deduplicated loads
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Flight:
+    """A load in progress that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+    Caches loader results per key for ttl_seconds.
+
+    - Fresh entries are returned directly (hit)
+    - Stale entries younger than max_stale_seconds are returned immediately
+      while a background thread refreshes them (stale hit)
+    - Missing or too old entries are loaded synchronously (miss)
+    - Concurrent loads of the same key share a single loader call
+    - A failed load is remembered for error_ttl_seconds: meanwhile callers
+      without a usable entry get the same error at once (negative hit) and
+      stale entries are served without retrying the refresh
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Any],
+        ttl_seconds: float,
+        max_stale_seconds: float,
+        name: str = "cache",
+        error_ttl_seconds: float = 0.0,
+    ):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.error_ttl_seconds = error_ttl_seconds
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, tuple[Any, float]] = {}
+        self._errors: Dict[Hashable, tuple[BaseException, float]] = {}
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "deduplicated": 0,
+            "load_errors": 0,
+            "negative_hits": 0,
+        }
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for key, loading or refreshing it as needed"""
+        now = time.monotonic()
+        with self._lock:
+            failed = self._errors.get(key)
+            if failed is not None and now - failed[1] >= self.error_ttl_seconds:
+                del self._errors[key]
+                failed = None
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl_seconds:
+                    self._stats["hits"] += 1
+                    return value
+                if age < self.max_stale_seconds:
+                    self._stats["stale_hits"] += 1
+                    refresh = failed is None and key not in self._inflight
+                    if refresh:
+                        self._inflight[key] = _Flight()
+                else:
+                    entry = None
+            if entry is None:
+                if failed is not None:
+                    self._stats["negative_hits"] += 1
+                    # Drop the traceback of earlier raises so it does not grow per caller
+                    raise failed[0].with_traceback(None)
+                self._stats["misses"] += 1
+
+        if entry is not None:
+            if refresh:
+                threading.Thread(
+                    target=self._run_flight, args=(key,), name=f"{self.name}-refresh", daemon=True
+                ).start()
+            return value
+
+        return self._load(key)
+
+    def _load(self, key: Hashable) -> Any:
+        """Load key synchronously, joining an in-flight load if there is one"""
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._stats["deduplicated"] += 1
+
+        if leader:
+            self._run_flight(key)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _run_flight(self, key: Hashable) -> None:
+        """Call the loader for key and publish the result to waiters"""
+        with self._lock:
+            flight = self._inflight[key]
+            self._stats["loads"] += 1
+        try:
+            value = self.loader(key)
+            with self._lock:
+                self._entries[key] = (value, time.monotonic())
+                self._errors.pop(key, None)
+            flight.value = value
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._stats["load_errors"] += 1
+                if self.error_ttl_seconds > 0 and isinstance(e, Exception):
+                    self._errors[key] = (e, time.monotonic())
+            print(f"[{self.name}] load failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every key when none is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._errors.clear()
+            else:
+                self._entries.pop(key, None)
+                self._errors.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and staleness counters plus current size"""
+        now = time.monotonic()
+        with self._lock:
+            stale = sum(1 for _, fetched_at in self._entries.values() if now - fetched_at >= self.ttl_seconds)
+            lookups = self._stats["hits"] + self._stats["stale_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "cached_errors": len(self._errors),
+                "stale_entries": stale,
+                "hit_ratio": (self._stats["hits"] + self._stats["stale_hits"]) / lookups if lookups else 0.0,
+            }
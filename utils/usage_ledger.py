@@ -0,0 +1,106 @@
+"""
+Token and latency accounting for LLM calls
+"""
+
+import threading
+from typing import Dict, List
+
+
+class UsageLedger:
+    """Accumulates prompt tokens, completion tokens and latency per agent and call site"""
+
+    __slots__ = ("_lock", "by_agent", "by_call_site", "turn", "turn_calls")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_agent: Dict[str, Dict[str, float]] = {}
+        self.by_call_site: Dict[str, Dict[str, float]] = {}
+        self.turn: int = 0
+        self.turn_calls: List[Dict] = []
+
+    @staticmethod
+    def _empty_totals() -> Dict[str, float]:
+        return {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency_ms": 0.0,
+            "truncated": 0,
+        }
+
+    @staticmethod
+    def _accumulate(totals: Dict[str, float], call: Dict) -> None:
+        totals["calls"] += 1
+        totals["prompt_tokens"] += call["prompt_tokens"]
+        totals["completion_tokens"] += call["completion_tokens"]
+        totals["latency_ms"] += call["latency_ms"]
+        totals["truncated"] += 1 if call["truncated"] else 0
+
+    def record(
+        self,
+        call_site: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency_ms: float,
+        truncated: bool = False,
+    ) -> None:
+        """Record a single LLM call. The agent is the call site prefix (e.g. 'credit' for 'credit.tools')"""
+        agent = call_site.split(".", 1)[0]
+        call = {
+            "call_site": call_site,
+            "prompt_tokens": int(prompt_tokens or 0),
+            "completion_tokens": int(completion_tokens or 0),
+            "latency_ms": float(latency_ms),
+            "truncated": bool(truncated),
+        }
+        with self._lock:
+            self._accumulate(self.by_agent.setdefault(agent, self._empty_totals()), call)
+            self._accumulate(self.by_call_site.setdefault(call_site, self._empty_totals()), call)
+            self.turn_calls.append(call)
+
+    def start_turn(self) -> None:
+        """Start a new turn, discarding the previous turn's call list"""
+        with self._lock:
+            self.turn += 1
+            self.turn_calls = []
+
+    def turn_summary(self) -> Dict:
+        """Return totals and per call site figures for the current turn"""
+        with self._lock:
+            calls = list(self.turn_calls)
+            turn = self.turn
+        totals = self._empty_totals()
+        for call in calls:
+            self._accumulate(totals, call)
+        return {"turn": turn, **totals, "calls_detail": calls}
+
+    def to_state(self) -> Dict:
+        """Plain representation for serialization"""
+        with self._lock:
+            return {
+                "by_agent": self.by_agent,
+                "by_call_site": self.by_call_site,
+                "turn": self.turn,
+                "turn_calls": self.turn_calls,
+            }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "UsageLedger":
+        ledger = cls()
+        ledger.by_agent = state.get("by_agent", {})
+        ledger.by_call_site = state.get("by_call_site", {})
+        ledger.turn = state.get("turn", 0)
+        ledger.turn_calls = state.get("turn_calls", [])
+        return ledger
+
+    def summary(self) -> Dict:
+        """Return cumulative totals per agent and per call site"""
+        with self._lock:
+            return {
+                "by_agent": {k: dict(v) for k, v in self.by_agent.items()},
+                "by_call_site": {k: dict(v) for k, v in self.by_call_site.items()},
+            }
+
+
+# Process-wide ledger shared by every session
+GLOBAL_USAGE = UsageLedger()
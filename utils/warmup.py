@@ -0,0 +1,84 @@
+"""
+Optional warm-up phase run once per process before serving the first user
+
+Startup imports stay light (pandas, langchain_groq, requests and httpx load
+on first use). When WARMUP_ON_START is set, the app and the API call
+warm_up() so that first use happens at boot instead of on a customer's first
+message: heavy imports, the parsed data files, the compiled credit policy,
+the per-tier LLM clients with their tool bindings and the HTTP pool.
+"""
+
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _import_heavy_modules() -> None:
+    import pandas  # noqa: F401
+    import langchain_groq  # noqa: F401
+    import requests  # noqa: F401
+
+
+def _load_data_files() -> None:
+    from config import SCORE_LIMIT_FILE
+    from utils.customer_store import CUSTOMER_STORE
+    from tools.credit_tools import POLICY_CACHE
+
+    # Also replays the journal over the last snapshot
+    CUSTOMER_STORE.get()
+    POLICY_CACHE.get(SCORE_LIMIT_FILE)
+
+
+def _build_llm_clients(orchestrator) -> None:
+    from config import LLM_TIER_MODELS
+    from utils.llm_client import get_runnable, get_tier
+
+    bindings: List[Tuple[str, list]] = []
+    if orchestrator is not None:
+        bindings = [
+            ("triage.auth", orchestrator.triage_agent.tools),
+            ("triage.routing", orchestrator.triage_agent.routing_tools),
+            ("credit.tools", orchestrator.credit_agent.tools),
+            ("exchange.tools", orchestrator.exchange_agent.tools),
+        ]
+    for tier in LLM_TIER_MODELS:
+        get_runnable(tier)
+    for call_site, tools in bindings:
+        # Bind on every tier: a failed call falls back to the other one
+        for tier in [get_tier(call_site)] + [t for t in LLM_TIER_MODELS if t != get_tier(call_site)]:
+            get_runnable(tier, tools)
+
+
+def _connect_http() -> None:
+    from tools.exchange_tools import get_rate_snapshot
+
+    # Opens the pooled keep-alive connection and fills the rate cache
+    get_rate_snapshot()
+
+
+def warm_up(orchestrator=None) -> Dict[str, Optional[float]]:
+    """
+    Run every warm-up step, timing each one. A failing step is logged and
+    skipped (e.g. no network at boot); the app still works, that resource is
+    just loaded on first use.
+
+    Returns:
+        Milliseconds per step, None for steps that failed
+    """
+    steps: List[Tuple[str, Callable[[], None]]] = [
+        ("imports", _import_heavy_modules),
+        ("data_files", _load_data_files),
+        ("llm_clients", lambda: _build_llm_clients(orchestrator)),
+        ("http_pool", _connect_http),
+    ]
+    timings: Dict[str, Optional[float]] = {}
+    total_start = time.perf_counter()
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            timings[name] = None
+            print(f"[Warmup] {name} failed: {e}")
+    print(f"[Warmup] Done in {(time.perf_counter() - total_start) * 1000:.0f}ms: {timings}")
+    return timings